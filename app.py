@@ -1,23 +1,23 @@
 import streamlit as st
-import openai, pymongo
 import math
 import sys
 import os
 import json
 from pathlib import Path
-from pymongo import MongoClient
-from rag.query_engine import query_index
 from datetime import datetime, timedelta
-from utils.patient_utils import parse_patient_documents as parse_patient_docs_llm
+from utils.patient_context_cache import get_patient_context, invalidate_patient_context, get_patient_context_cache
 
 # Add parent directory to path for imports
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
-# Import our intelligent conversation manager
-from knowledge.intelligent_conversation_manager import IntelligentConversationManager
-
-# Import our intelligent conversation manager
-from knowledge.intelligent_conversation_manager import IntelligentConversationManager
+# Heavy subsystems (OpenAI SDK, MongoDB, llama_index, Qdrant, bs4) are loaded on first use
+from utils.lazy_services import (
+    LazyProxy,
+    create_openai_client,
+    create_knowledge_collection,
+    create_conversation_manager,
+    query_index,
+)
 
 # Add Google authentication import
 from auth.google_auth import authenticate_user, logout_user, get_user_id
@@ -26,16 +26,35 @@ from auth.google_auth import authenticate_user, logout_user, get_user_id
 MAX_CHAT_HISTORY = 25
 MAX_HISTORY_TOKENS = 8000
 
-# ---- keys & db
-client = openai.OpenAI(api_key=st.secrets["OPENAI_API_KEY"])
-mongo = MongoClient("mongodb://localhost:27017/")["autism_ai"]["knowledge"]
+# ---- keys & db (built lazily so the login screen does not pay for them)
+client = LazyProxy(create_openai_client, "OpenAI client")
+mongo = LazyProxy(create_knowledge_collection, "MongoDB knowledge collection")
 
 # Initialize the conversation manager
 @st.cache_resource
 def get_conversation_manager():
-    return IntelligentConversationManager()
+    return create_conversation_manager()
+
+manager = LazyProxy(get_conversation_manager, "conversation manager")
 
-manager = get_conversation_manager()
+@st.cache_resource
+def start_memory_compaction():
+    """Start the periodic memory compaction job once per process (if MEMORY_COMPACTION_HOURS is set)."""
+    from rag.memory_compaction import start_compaction_scheduler
+    return start_compaction_scheduler()
+
+@st.cache_resource
+def start_trace_metrics():
+    """Serve per-stage latency percentiles on /metrics once per process (if TRACE_METRICS_PORT is set)."""
+    from utils.tracing import start_metrics_server
+    return start_metrics_server()
+
+def get_conversation_session():
+    """This browser session's conversation state; the manager itself is shared by all sessions."""
+    if st.session_state.get("conversation_session") is None:
+        from knowledge.conversation_session import ConversationSession
+        st.session_state.conversation_session = ConversationSession(st.session_state.get("user_profile"))
+    return st.session_state.conversation_session
 
 def ensure_consistent_user_id():
     """Ensure user ID is consistent across the application."""
@@ -67,28 +86,14 @@ def check_authentication():
 # ---- helper functions (define these first)
 def load_previous_chat_history(user_id: str, limit: int = 25):
     try:
-        from rag.qdrant_client import search_conversation_memory, ensure_memory_collections
-        ensure_memory_collections(user_id)
-
-        results = search_conversation_memory(
-            user_id,
-            query="recent conversation context",
-            memory_type="chat_history",
-            limit=limit
-        )
-
-        messages = []
-        for r in results or []:
-            p = r.get("payload", {}) or {}
-            data = p.get("data", {}) or {}
-            role = data.get("role", "assistant")
-            content = data.get("content") or ""
-            ts = p.get("timestamp", "")
-            if content:
-                messages.append({"role": role, "content": content, "timestamp": ts})
-
-        messages.sort(key=lambda x: x.get("timestamp", ""))
-        st.session_state.chat_history = [{"role": m["role"], "content": m["content"]} for m in messages]
+        from knowledge.conversation_memory_manager import ConversationMemoryManager
+        
+        # Most recent messages by timestamp - no embedding call or vector search
+        messages = ConversationMemoryManager(user_id).get_recent_messages(limit)
+        st.session_state.chat_history = [
+            {"role": m.get("role", "assistant"), "content": m["content"]}
+            for m in messages if m.get("content")
+        ]
         print(f"✅ Loaded {len(st.session_state.chat_history)} previous messages")
     except Exception as e:
         print(f"⚠️ Could not load previous chat history: {e}")
@@ -142,7 +147,7 @@ def show_topic_information_with_rag(context_path):
             # Combine MongoDB and RAG for response
             base_response = doc["response"]
             tone = doc.get("tone", "supportive")
-            answer = llm_synthesize(user_prompt, base_response, user_rag_chunks, tone)
+            answer = st.write_stream(llm_synthesize(user_prompt, base_response, user_rag_chunks, tone, stream=True))
             
             st.session_state.chat_history.append({"role": "assistant", "content": answer})
             st.rerun()
@@ -243,6 +248,7 @@ def delete_document_from_vector_store(filename: str, user_id: str = "default"):
             if file_path.exists():
                 file_path.unlink()
             
+            invalidate_patient_context(user_id, documents_removed=True)
             st.success(f"✅ {filename} removed from knowledge base")
             print(f"🗑️ Deleted {filename} from vector store and disk")
             
@@ -326,7 +332,8 @@ def apply_temporal_weighting(rag_chunks, decay_days=365):
     
     return weighted_chunks
 
-def llm_synthesize(user_msg, base_resp, rag_chunks, tone):
+def llm_synthesize(user_msg, base_resp, rag_chunks, tone, stream=False):
+    """Answer a follow-up question; with stream=True returns a generator of text deltas."""
     # Use user profile from session state if available
     profile_str = ""
     if st.session_state.user_profile:
@@ -351,10 +358,20 @@ Tone: {tone}
         {"role": "system", "content": sys.strip()},
         {"role": "user", "content": user_msg}
     ]
+    if stream:
+        return _stream_deltas(client.chat.completions.create(
+            model="gpt-4o-mini", messages=messages, temperature=0.7, stream=True
+        ))
     return client.chat.completions.create(
         model="gpt-4o-mini", messages=messages, temperature=0.7
     ).choices[0].message.content.strip()
 
+def _stream_deltas(stream):
+    """Yield the text deltas of a streaming chat completion."""
+    for chunk in stream:
+        if chunk.choices and chunk.choices[0].delta.content:
+            yield chunk.choices[0].delta.content
+
 def collect_user_profile():
     """Start with true conversational AI that leverages RAG for personalized responses."""
     
@@ -470,7 +487,7 @@ def collect_user_profile():
                         enhanced_query = enhance_user_query_with_patient_context(user_input, patient_info)
                         
                         # Use the intelligent conversation manager
-                        response = manager.process_user_response(enhanced_query)
+                        response = manager.process_user_response(enhanced_query, session=get_conversation_session())
                         
                         # Extract the actual response text from the response object
                         if isinstance(response, dict) and 'response' in response:
@@ -487,7 +504,9 @@ def collect_user_profile():
                         add_message_to_history({
                             "role": "assistant", 
                             "content": response_text,
-                            "conversation_type": "rag_response"
+                            "conversation_type": "rag_response",
+                            "mode": response.get("mode") if isinstance(response, dict) else None,
+                            "trace": response.get("trace") if isinstance(response, dict) else None
                         })
                         
                     except Exception as e:
@@ -571,8 +590,9 @@ def start_unified_conversation(add_default_message=True):
     if not st.session_state.user_profile:
         return
     
-    # Get conversation start from manager
-    start_result = manager.start_conversation(st.session_state.user_profile)
+    # Get conversation start from manager with fresh state for this session
+    st.session_state.conversation_session = None
+    start_result = manager.start_conversation(st.session_state.user_profile, session=get_conversation_session())
     
     # Initialize conversation state
     st.session_state.conversation_id = start_result["conversation_id"]
@@ -611,6 +631,7 @@ def show_unified_conversation_interface():
             st.session_state.chat_history = []
             st.session_state.user_profile = None
             st.session_state.conversation_id = None
+            st.session_state.conversation_session = None
             st.session_state.browse_mode = False
             st.session_state.browse_selections = {}
             st.session_state.screening_questions = []
@@ -626,18 +647,18 @@ def show_unified_conversation_interface():
         
         # Add patient context cache management
         st.markdown("### 🧠 Patient Context Cache")
+        cache_user_id = st.session_state.user_profile.get("user_id", "default")
         if st.button("🔄 Refresh Patient Context"):
-            st.session_state.patient_context_cache = None
-            st.session_state.patient_context_timestamp = None
+            invalidate_patient_context(cache_user_id)
             st.success("Patient context cache cleared. Will refresh on next interaction.")
         
-        if st.session_state.patient_context_cache:
-            cache_age = datetime.now() - st.session_state.patient_context_timestamp
-            st.info(f"Cache age: {cache_age.seconds // 60} minutes")
-            if st.session_state.patient_context_cache.get('name'):
-                st.write(f"Patient: {st.session_state.patient_context_cache.get('name')}")
-            if st.session_state.patient_context_cache.get('age'):
-                st.write(f"Age: {st.session_state.patient_context_cache.get('age')} years")
+        cached_context, cache_age_seconds = get_patient_context_cache().peek(cache_user_id)
+        if cached_context:
+            st.info(f"Cache age: {int(cache_age_seconds // 60)} minutes")
+            if cached_context.get('name'):
+                st.write(f"Patient: {cached_context.get('name')}")
+            if cached_context.get('age'):
+                st.write(f"Age: {cached_context.get('age')} years")
         
         if st.button("📚 View My Documents"):
             show_user_documents()
@@ -735,6 +756,12 @@ def show_unified_conversation_interface():
                         context_path = message["context_path"]
                         context_label = get_user_friendly_context_label(context_path)
                         st.markdown(f"**📍 Current Topic:** {context_label}")
+                    
+                    # Show where the turn's time went
+                    if message.get("trace"):
+                        st.markdown("**⏱️ Timing:**")
+                        from utils.tracing import format_trace_waterfall
+                        st.code(format_trace_waterfall(message["trace"]), language=None)
             
             if message.get("context_path"):
                 st.caption(f"Context: {message['context_path']}")
@@ -820,8 +847,18 @@ def process_unified_input(user_input):
         handle_screening_response(user_input)
         return
     
-    # Regular conversation processing
-    response_result = manager.process_user_response(user_input)
+    # Regular conversation processing - render tokens as they arrive, keep the final frame
+    response_result = {}
+    
+    def token_stream():
+        for frame in manager.process_user_response_stream(user_input, session=get_conversation_session()):
+            if frame["type"] == "token":
+                yield frame["content"]
+            else:
+                response_result.update(frame)
+    
+    st.markdown("**🤖 AI Assistant:**")
+    st.write_stream(token_stream())
     
     # Determine conversation type based on response characteristics
     conversation_type = "guided" if response_result.get("next_suggestions") else "free_form"
@@ -834,7 +871,9 @@ def process_unified_input(user_input):
         "conversation_type": conversation_type,
         "next_suggestions": response_result.get("next_suggestions"),
         "confidence": response_result.get("confidence", 0.0),
-        "sources": response_result.get("sources", [])
+        "sources": response_result.get("sources", []),
+        "mode": response_result.get("mode"),
+        "trace": response_result.get("trace")
     })
     
     # Show safety alert if present
@@ -1166,7 +1205,7 @@ def show_conversation_summary():
         st.warning("No active conversation to summarize.")
         return
     
-    summary = manager.get_conversation_summary()
+    summary = manager.get_conversation_summary(session=get_conversation_session())
     
     # Improve the summary display
     improved_summary = improve_conversation_summary_display(summary)
@@ -1432,6 +1471,8 @@ def clear_user_documents():
                 if file_path.is_file():
                     file_path.unlink()
         
+        invalidate_patient_context(user_id, documents_removed=True)
+        
         # Clear session state
         if st.session_state.get("uploaded_documents"):
             st.session_state.uploaded_documents = []
@@ -1773,8 +1814,7 @@ def check_system_status():
     
     # Check OpenAI connection
     try:
-        import openai
-        client = openai.OpenAI(api_key=st.secrets.get("OPENAI_API_KEY"))
+        client = create_openai_client()
         # Test with a simple call
         response = client.chat.completions.create(
             model="gpt-4o-mini",
@@ -1889,7 +1929,8 @@ def test_rag_functionality():
             st.code(traceback.format_exc())
 
 def parse_patient_documents(user_id: str = "default") -> dict:
-    return parse_patient_docs_llm(user_id)
+    # Served from the process-wide cache shared by every session
+    return get_patient_context(user_id)
 
 def create_patient_summary(patient_info: dict) -> str:
     """Create a human-readable summary of patient information."""
@@ -1950,6 +1991,8 @@ if "user_profile" not in st.session_state:
     st.session_state.user_profile = None
 if "conversation_id" not in st.session_state:
     st.session_state.conversation_id = None
+if "conversation_session" not in st.session_state:
+    st.session_state.conversation_session = None
 if "conversation_mode" not in st.session_state:
     st.session_state.conversation_mode = "adaptive"  # New unified mode
 if "uploaded_documents" not in st.session_state:
@@ -1989,39 +2032,14 @@ if "onboarding_step" not in st.session_state:
 if "onboarding_data" not in st.session_state:
     st.session_state.onboarding_data = {}
 
-# Add these session state variables in the session state section (around line 1850)
-if "patient_context_cache" not in st.session_state:
-    st.session_state.patient_context_cache = None
-if "patient_context_timestamp" not in st.session_state:
-    st.session_state.patient_context_timestamp = None
-if "patient_context_ttl" not in st.session_state:
-    st.session_state.patient_context_ttl = 3600  # 1 hour cache
-
 # Add these functions after the existing functions (around line 450)
 def get_cached_patient_context(user_id, force_refresh=False):
-    """Get patient context with intelligent caching."""
-    current_time = datetime.now()
-    
-    # Check if we have valid cached data
-    if (not force_refresh and 
-        st.session_state.patient_context_cache and 
-        st.session_state.patient_context_timestamp and
-        (current_time - st.session_state.patient_context_timestamp).seconds < st.session_state.patient_context_ttl):
-        
-        print(f"🔍 Using cached patient context (age: {st.session_state.patient_context_cache.get('age', 'NOT_FOUND')})")
-        return st.session_state.patient_context_cache
-    
-    # Extract fresh patient context
-    print(f"🔍 Extracting fresh patient context for user: {user_id}")
+    """Get patient context from the process-wide cache (shared across sessions and tabs)."""
     try:
-        from utils.patient_utils import parse_patient_documents
-        patient_info = parse_patient_documents(user_id)
+        patient_info = get_patient_context(user_id, force_refresh=force_refresh)
         
         if patient_info and patient_info.get('name') and patient_info.get('age'):
-            # Cache the successful extraction
-            st.session_state.patient_context_cache = patient_info
-            st.session_state.patient_context_timestamp = current_time
-            print(f"✅ Cached patient context: {patient_info.get('name')} ({patient_info.get('age')} years old)")
+            print(f"🔍 Using patient context: {patient_info.get('name')} ({patient_info.get('age')} years old)")
             return patient_info
         else:
             print(f"⚠️ Patient context extraction failed or incomplete: {patient_info}")
@@ -2077,32 +2095,26 @@ def manage_chat_history():
             # Extract insights from old messages before trimming
             old_messages = st.session_state.chat_history[:-20]
             
-            # Try to extract insights using memory manager
+            # Fold the trimmed messages into the user's running insights in the background
             try:
                 user_id = ensure_consistent_user_id()
-                from knowledge.conversation_memory_manager import ConversationMemoryManager
-                memory_manager = ConversationMemoryManager(user_id)
-                insights = memory_manager.extract_and_store_insights(old_messages)
+                from knowledge.insight_extractor import submit_insight_messages
+                submit_insight_messages(user_id, old_messages, emit=True)
                 
-                if insights:
-                    # Create summary marker
-                    summary_marker = {
-                        "role": "system",
-                        "content": f"Previous conversation insights stored: {len(insights.get('topics_discussed', []))} topics, {len(insights.get('user_concerns', []))} concerns",
-                        "type": "memory_summary",
-                        "timestamp": datetime.now().isoformat()
-                    }
-                    
-                    # Keep only recent messages and add summary
-                    st.session_state.chat_history = [summary_marker] + st.session_state.chat_history[-20:]
-                    print(f"✅ Chat history trimmed to {len(st.session_state.chat_history)} messages, insights extracted")
-                else:
-                    # Simple trim without insights
-                    st.session_state.chat_history = st.session_state.chat_history[-20:]
-                    print(f"✅ Chat history trimmed to {len(st.session_state.chat_history)} messages")
+                # Create summary marker
+                summary_marker = {
+                    "role": "system",
+                    "content": f"Previous conversation insights stored from {len(old_messages)} earlier messages",
+                    "type": "memory_summary",
+                    "timestamp": datetime.now().isoformat()
+                }
+                
+                # Keep only recent messages and add summary
+                st.session_state.chat_history = [summary_marker] + st.session_state.chat_history[-20:]
+                print(f"✅ Chat history trimmed to {len(st.session_state.chat_history)} messages, insights queued")
                     
             except Exception as e:
-                print(f"⚠️ Could not extract insights, simple trim: {e}")
+                print(f"⚠️ Could not queue insights, simple trim: {e}")
                 st.session_state.chat_history = st.session_state.chat_history[-20:]
                 
     except Exception as e:
@@ -2122,6 +2134,9 @@ st.title("Autism Support Assistant")
 if not check_authentication():
     st.stop()  # Stop execution if not authenticated
 
+start_memory_compaction()
+start_trace_metrics()
+
 # Always initialize a conversation and render the unified UI after auth
 if not st.session_state.get("conversation_id"):
     start_unified_conversation(add_default_message=False)
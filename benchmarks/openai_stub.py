@@ -0,0 +1,350 @@
+"""
+OpenAI-Compatible Stub Server for Autism Support App
+Local /v1/chat/completions (plain, streaming, web_search_options) and /v1/embeddings with deterministic output and injectable latency and faults.
+
+Point the app, ingestion scripts or benchmarks at it with OPENAI_BASE_URL (env or
+.streamlit/secrets.toml) so they run offline without API quota:
+
+Usage:
+    python -m benchmarks.openai_stub --port 8900
+    python -m benchmarks.openai_stub --port 8900 --llm-latency-ms 400 --latency-jitter 0.5 --error-rate 0.01 --rate-limit-rate 0.05
+    OPENAI_BASE_URL=http://127.0.0.1:8900/v1 OPENAI_API_KEY=stub streamlit run app.py
+
+GET /v1/models lists the stub models and GET /stats returns request and fault counts.
+"""
+
+import argparse
+import hashlib
+import json
+import random
+import sys
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+EMBEDDING_DIMENSIONS = {"text-embedding-3-small": 1536, "text-embedding-3-large": 3072, "text-embedding-ada-002": 1536}
+CHAT_MODELS = ["gpt-4o-mini", "gpt-4o", "gpt-4o-search-preview"]
+
+
+class StubConfig:
+    """
+    Latencies (milliseconds, the median when jittered), answer size and fault rates for the stub.
+
+    latency_jitter is the sigma of a lognormal multiplier on every latency (0 keeps
+    them fixed); error_rate and rate_limit_rate are the fractions of requests
+    answered with a 500 and a 429 (with Retry-After: retry_after_s). seed makes
+    the latency and fault draws repeatable.
+    """
+
+    def __init__(self, llm_latency_ms: float = 300, embed_latency_ms: float = 50, token_delay_ms: float = 5, answer_words: int = 120,
+                 latency_jitter: float = 0.0, error_rate: float = 0.0, rate_limit_rate: float = 0.0, retry_after_s: float = 1.0, seed: Optional[int] = None):
+        self.llm_latency_ms = llm_latency_ms
+        self.embed_latency_ms = embed_latency_ms
+        self.token_delay_ms = token_delay_ms
+        self.answer_words = answer_words
+        self.latency_jitter = latency_jitter
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after_s = retry_after_s
+        self.seed = seed
+
+
+def hash_embedding(text: str, dimensions: int = 1536) -> List[float]:
+    """Unit vector seeded by the text's hash: identical texts embed identically, different texts are near-orthogonal."""
+    seed = int.from_bytes(hashlib.sha256((text or "").encode("utf-8")).digest()[:8], "little")
+    vector = np.random.default_rng(seed).standard_normal(dimensions)
+    return (vector / np.linalg.norm(vector)).tolist()
+
+
+def _message_text(message: Dict) -> str:
+    content = message.get("content") or ""
+    if isinstance(content, list):
+        content = " ".join(part.get("text", "") for part in content if isinstance(part, dict))
+    return content
+
+
+def stub_answer(messages: List[Dict], words: int) -> str:
+    """Deterministic answer text for a conversation (depends only on the last user message)."""
+    last = next((_message_text(m) for m in reversed(messages or []) if m.get("role") == "user"), "")
+    digest = hashlib.sha256(last.encode("utf-8")).hexdigest()
+    vocabulary = ["support", "routine", "therapy", "school", "communication", "sensory", "family", "progress", "plan", "resources"]
+    body = " ".join(vocabulary[int(digest[i % 64], 16) % len(vocabulary)] for i in range(max(words - 4, 0)))
+    return f"Stub answer {digest[:8]}: {body}".strip()
+
+
+def wants_json(body: Dict) -> bool:
+    """Whether the caller asked for a JSON object (response_format, or a system prompt demanding JSON)."""
+    if (body.get("response_format") or {}).get("type") in ("json_object", "json_schema"):
+        return True
+    return any(m.get("role") == "system" and "JSON" in _message_text(m) for m in body.get("messages") or [])
+
+
+def search_citation(query: str) -> Dict:
+    """A deterministic url_citation annotation, as search models attach to web_search_options answers."""
+    digest = hashlib.sha256(query.encode("utf-8")).hexdigest()[:12]
+    return {"type": "url_citation", "url_citation": {"url": f"https://stub.invalid/search/{digest}", "title": f"Stub search result {digest}"}}
+
+
+def _count_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+class StubState:
+    """Seeded random source for latency and fault draws plus request counters, shared by handler threads."""
+
+    def __init__(self, config: StubConfig):
+        self.config = config
+        self._random = random.Random(config.seed)
+        self._lock = threading.Lock()
+        self.counts: Dict[str, int] = {"requests": 0, "chat": 0, "stream": 0, "web_search": 0, "embeddings": 0, "errors": 0, "rate_limited": 0}
+
+    def count(self, key: str):
+        with self._lock:
+            self.counts[key] = self.counts.get(key, 0) + 1
+
+    def latency(self, milliseconds: float) -> float:
+        """A latency draw in seconds: milliseconds scaled by a lognormal multiplier with median 1."""
+        if milliseconds <= 0:
+            return 0.0
+        if self.config.latency_jitter <= 0:
+            return milliseconds / 1000
+        with self._lock:
+            return milliseconds * self._random.lognormvariate(0, self.config.latency_jitter) / 1000
+
+    def fault(self) -> Optional[int]:
+        """429, 500 or None for the next request, drawn from the configured rates."""
+        with self._lock:
+            draw = self._random.random()
+        if draw < self.config.rate_limit_rate:
+            return 429
+        if draw < self.config.rate_limit_rate + self.config.error_rate:
+            return 500
+        return None
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return dict(self.counts)
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    state: StubState = None
+
+    @property
+    def config(self) -> StubConfig:
+        return self.state.config
+
+    def do_GET(self):
+        path = self.path.split("?")[0].rstrip("/")
+        if path.endswith("/models"):
+            models = CHAT_MODELS + list(EMBEDDING_DIMENSIONS)
+            self._json(200, {"object": "list", "data": [{"id": m, "object": "model", "created": 0, "owned_by": "stub"} for m in models]})
+        elif path.endswith("/stats"):
+            self._json(200, self.state.get_stats())
+        else:
+            self._json(404, {"error": {"message": f"Unknown endpoint {self.path}", "type": "invalid_request_error"}})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            body = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            self._json(400, {"error": {"message": "Invalid JSON body", "type": "invalid_request_error"}})
+            return
+
+        path = self.path.split("?")[0].rstrip("/")
+        if not (path.endswith("/chat/completions") or path.endswith("/embeddings")):
+            self._json(404, {"error": {"message": f"Unknown endpoint {self.path}", "type": "invalid_request_error"}})
+            return
+
+        self.state.count("requests")
+        if self._inject_fault():
+            return
+        if path.endswith("/chat/completions"):
+            self._chat(body)
+        else:
+            self._embeddings(body)
+
+    def _inject_fault(self) -> bool:
+        """Answer with a drawn 429/500 instead of the real response; True if one was sent."""
+        status = self.state.fault()
+        if status == 429:
+            self.state.count("rate_limited")
+            self._json(429, {"error": {"message": "Rate limit reached (stub)", "type": "requests", "code": "rate_limit_exceeded"}},
+                       headers={"Retry-After": f"{self.config.retry_after_s:g}"})
+            return True
+        if status == 500:
+            self.state.count("errors")
+            self._json(500, {"error": {"message": "The server had an error while processing your request (stub)", "type": "server_error"}})
+            return True
+        return False
+
+    def _chat(self, body: Dict):
+        self.state.count("chat")
+        time.sleep(self.state.latency(self.config.llm_latency_ms))
+        model = body.get("model", "gpt-4o-mini")
+        annotations = []
+        if wants_json(body):
+            answer = "{}"
+        else:
+            answer = stub_answer(body.get("messages"), self.config.answer_words)
+        if body.get("web_search_options") is not None:
+            self.state.count("web_search")
+            last = next((_message_text(m) for m in reversed(body.get("messages") or []) if m.get("role") == "user"), "")
+            citation = search_citation(last)
+            answer = f"{answer} (Source: {citation['url_citation']['url']})"
+            citation["url_citation"].update(start_index=answer.index("(Source:"), end_index=len(answer))
+            annotations.append(citation)
+        prompt_tokens = _count_tokens(json.dumps(body.get("messages", [])))
+        usage = {"prompt_tokens": prompt_tokens, "completion_tokens": _count_tokens(answer), "total_tokens": prompt_tokens + _count_tokens(answer)}
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+        created = int(time.time())
+
+        if not body.get("stream"):
+            self._json(200, {
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": answer, "annotations": annotations}, "finish_reason": "stop"}],
+                "usage": usage
+            })
+            return
+
+        self.state.count("stream")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+
+        def chunk(choices: List[Dict], chunk_usage: Dict = None):
+            frame = {"id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model, "choices": choices}
+            if chunk_usage is not None:
+                frame["usage"] = chunk_usage
+            self.wfile.write(f"data: {json.dumps(frame)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+
+        chunk([{"index": 0, "delta": {"role": "assistant", "content": ""}, "finish_reason": None}])
+        for i, word in enumerate(answer.split(" ")):
+            chunk([{"index": 0, "delta": {"content": word if i == 0 else " " + word}, "finish_reason": None}])
+            if self.config.token_delay_ms:
+                time.sleep(self.config.token_delay_ms / 1000)
+        if annotations:
+            chunk([{"index": 0, "delta": {"annotations": annotations}, "finish_reason": None}])
+        chunk([{"index": 0, "delta": {}, "finish_reason": "stop"}])
+        if (body.get("stream_options") or {}).get("include_usage"):
+            chunk([], usage)
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+        self.close_connection = True
+
+    def _embeddings(self, body: Dict):
+        self.state.count("embeddings")
+        time.sleep(self.state.latency(self.config.embed_latency_ms))
+        model = body.get("model", "text-embedding-3-small")
+        inputs = body.get("input", [])
+        if isinstance(inputs, str):
+            inputs = [inputs]
+        dimensions = body.get("dimensions") or EMBEDDING_DIMENSIONS.get(model, 1536)
+        self._json(200, {
+            "object": "list",
+            "model": model,
+            "data": [{"object": "embedding", "index": i, "embedding": hash_embedding(str(text), dimensions)} for i, text in enumerate(inputs)],
+            "usage": {"prompt_tokens": sum(_count_tokens(str(t)) for t in inputs), "total_tokens": sum(_count_tokens(str(t)) for t in inputs)}
+        })
+
+    def _json(self, status: int, payload: Dict, headers: Dict[str, str] = None):
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def create_stub_server(config: StubConfig = None, host: str = "127.0.0.1", port: int = 0) -> ThreadingHTTPServer:
+    """Bind the stub (port=0 picks a free port); the server's .state holds its config and counters."""
+    state = StubState(config or StubConfig())
+    handler = type("StubHandler", (_StubHandler,), {"state": state})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    server.state = state
+    return server
+
+
+def stub_base_url(server: ThreadingHTTPServer) -> str:
+    host, port = server.server_address[:2]
+    return f"http://{'127.0.0.1' if host == '0.0.0.0' else host}:{port}/v1"
+
+
+def start_stub_server(config: StubConfig = None, host: str = "127.0.0.1", port: int = 0) -> Tuple[ThreadingHTTPServer, str]:
+    """Serve the stub from a daemon thread; returns (server, base_url)."""
+    server = create_stub_server(config, host, port)
+    threading.Thread(target=server.serve_forever, name="openai-stub", daemon=True).start()
+    base_url = stub_base_url(server)
+    print(f"🧪 OpenAI stub listening on {base_url}")
+    return server, base_url
+
+
+def add_stub_arguments(parser: argparse.ArgumentParser):
+    """Latency and fault options shared by this CLI and the benchmarks that start a stub."""
+    parser.add_argument("--llm-latency-ms", type=float, default=300, help="Chat completion latency (median when jittered)")
+    parser.add_argument("--embed-latency-ms", type=float, default=50, help="Embedding latency (median when jittered)")
+    parser.add_argument("--token-delay-ms", type=float, default=5, help="Delay between streamed tokens")
+    parser.add_argument("--answer-words", type=int, default=120, help="Words per stub answer")
+    parser.add_argument("--latency-jitter", type=float, default=0.0, help="Lognormal sigma applied to latencies (0 = fixed)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with a 500")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Fraction of requests answered with a 429")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="Retry-After seconds sent with 429s")
+    parser.add_argument("--seed", type=int, default=None, help="Seed for latency and fault draws")
+
+
+def stub_config_from_args(args: argparse.Namespace) -> StubConfig:
+    return StubConfig(
+        llm_latency_ms=args.llm_latency_ms,
+        embed_latency_ms=args.embed_latency_ms,
+        token_delay_ms=args.token_delay_ms,
+        answer_words=args.answer_words,
+        latency_jitter=args.latency_jitter,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        retry_after_s=args.retry_after,
+        seed=args.seed
+    )
+
+
+def main() -> bool:
+    parser = argparse.ArgumentParser(description="Serve an OpenAI-compatible stub for offline runs and load tests.")
+    parser.add_argument("--host", default="127.0.0.1", help="Interface to bind (0.0.0.0 for other machines)")
+    parser.add_argument("--port", type=int, default=8900, help="Port to listen on")
+    add_stub_arguments(parser)
+    args = parser.parse_args()
+
+    try:
+        server = create_stub_server(stub_config_from_args(args), args.host, args.port)
+    except OSError as e:
+        print(f"❌ Could not bind {args.host}:{args.port}: {e}")
+        return False
+    print(f"🧪 OpenAI stub listening on {stub_base_url(server)}")
+    print(f"   export OPENAI_BASE_URL={stub_base_url(server)} OPENAI_API_KEY=stub")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print(f"\n📊 {server.state.get_stats()}")
+    finally:
+        server.server_close()
+    return True
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
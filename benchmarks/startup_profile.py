@@ -0,0 +1,108 @@
+"""
+Startup Import Profile for Autism Support App
+Runs an import under `python -X importtime` and reports where cold-start time goes.
+
+Usage:
+    python -m benchmarks.startup_profile
+    python -m benchmarks.startup_profile --statement "import knowledge.intelligent_conversation_manager"
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+from typing import Dict, List
+
+# What app.py pulls in before the login screen renders
+LOGIN_PATH_STATEMENT = "import streamlit; import utils.patient_context_cache; import utils.lazy_services"
+
+# Subsystems that must NOT be on the login path
+HEAVY_PACKAGES = ["llama_index", "qdrant_client", "bs4", "sentence_transformers", "openai", "pymongo"]
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def run_importtime(statement: str) -> List[Dict]:
+    """Run statement in a fresh interpreter and parse its -X importtime report."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        cwd=PROJECT_ROOT,
+        capture_output=True,
+        text=True,
+    )
+    if proc.returncode != 0:
+        print(f"⚠️ Import statement failed:\n{proc.stderr.splitlines()[-1] if proc.stderr else ''}")
+
+    entries = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        try:
+            parts = line[len("import time:"):].split("|")
+            self_us, cumulative_us, name = int(parts[0]), int(parts[1]), parts[2].rstrip()
+        except (ValueError, IndexError):
+            continue
+        depth = (len(name) - len(name.lstrip())) // 2
+        entries.append({
+            "module": name.strip(),
+            "self_us": self_us,
+            "cumulative_us": cumulative_us,
+            "depth": depth,
+        })
+    return entries
+
+
+def summarize(entries: List[Dict], top: int = 15) -> Dict:
+    """Aggregate per top-level package and flag heavy subsystems."""
+    by_package: Dict[str, int] = {}
+    for entry in entries:
+        package = entry["module"].split(".")[0]
+        by_package[package] = by_package.get(package, 0) + entry["self_us"]
+
+    total_us = sum(entry["self_us"] for entry in entries)
+    heavy_loaded = sorted({
+        entry["module"].split(".")[0] for entry in entries
+        if entry["module"].split(".")[0] in HEAVY_PACKAGES
+    })
+
+    return {
+        "total_ms": total_us / 1000,
+        "module_count": len(entries),
+        "top_packages": sorted(by_package.items(), key=lambda kv: kv[1], reverse=True)[:top],
+        "slowest_modules": sorted(entries, key=lambda e: e["cumulative_us"], reverse=True)[:top],
+        "heavy_loaded": heavy_loaded,
+    }
+
+
+def print_report(statement: str, summary: Dict):
+    print(f"📊 Startup import profile for: {statement}")
+    print("=" * 60)
+    print(f"Total import time: {summary['total_ms']:.1f} ms across {summary['module_count']} modules")
+
+    print("\nTop packages (self time):")
+    for package, self_us in summary["top_packages"]:
+        print(f"  {self_us / 1000:8.1f} ms  {package}")
+
+    print("\nSlowest imports (cumulative):")
+    for entry in summary["slowest_modules"]:
+        print(f"  {entry['cumulative_us'] / 1000:8.1f} ms  {entry['module']}")
+
+    if summary["heavy_loaded"]:
+        print(f"\n❌ Heavy subsystems imported: {', '.join(summary['heavy_loaded'])}")
+    else:
+        print("\n✅ No heavy subsystems imported")
+
+
+def main() -> bool:
+    parser = argparse.ArgumentParser(description="Profile cold-start imports with -X importtime.")
+    parser.add_argument("--statement", default=LOGIN_PATH_STATEMENT, help="Python statement to profile")
+    parser.add_argument("--top", type=int, default=15, help="Rows per table")
+    args = parser.parse_args()
+
+    summary = summarize(run_importtime(args.statement), top=args.top)
+    print_report(args.statement, summary)
+    return not summary["heavy_loaded"]
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
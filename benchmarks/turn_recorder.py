@@ -0,0 +1,74 @@
+"""
+Turn Recorder for Autism Support App
+Appends real conversation turns (input, profile, knowledge node, KB chunks, user documents) to a JSONL fixture for replay.
+
+Recording is off unless BENCHMARK_RECORD_PATH is set, e.g.
+    BENCHMARK_RECORD_PATH=data/benchmarks/turns.jsonl streamlit run app.py
+then replay the file with `python -m benchmarks.turn_replay data/benchmarks/turns.jsonl`.
+"""
+
+import json
+import os
+import threading
+from datetime import datetime
+from typing import Dict, List
+
+_lock = threading.Lock()
+# Users whose documents are already in the fixture (documents are recorded once per user per process)
+_documents_recorded = set()
+
+
+def recording_path() -> str:
+    return os.getenv("BENCHMARK_RECORD_PATH", "")
+
+
+def _kb_chunks(vector_results: List[Dict]) -> List[Dict]:
+    """Shared-KB payloads a turn retrieved (user documents are recorded separately)."""
+    chunks = []
+    for result in vector_results or []:
+        payload = result.get("payload") or {}
+        if payload.get("source") == "user_upload" or payload.get("type") == "user_document":
+            continue
+        if payload.get("content") or payload.get("text"):
+            chunks.append(payload)
+    return chunks
+
+
+def record_turn(session, user_input: str, context_path: str, response: Dict):
+    """Append one turn to the fixture if recording is enabled; never raises."""
+    path = recording_path()
+    if not path:
+        return
+    try:
+        user_id = session.user_id
+        entry = {
+            "session": session.conversation_id or f"session-{id(session)}",
+            "user_id": user_id,
+            "user_profile": dict(session.user_profile),
+            "user_input": user_input,
+            "context_path": context_path,
+            "knowledge": response.get("mongodb_content"),
+            "kb": _kb_chunks(response.get("vector_results")),
+            "recorded_at": datetime.now().isoformat()
+        }
+        with _lock:
+            if user_id not in _documents_recorded:
+                from rag.ingest_user_docs import get_document_chunks
+                entry["documents"] = get_document_chunks(user_id)
+                _documents_recorded.add(user_id)
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            with open(path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry, default=str) + "\n")
+    except Exception as e:
+        print(f"⚠️ Could not record turn for benchmark: {e}")
+
+
+def load_fixture(path: str) -> List[Dict]:
+    """Recorded turns in file order."""
+    turns = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                turns.append(json.loads(line))
+    return turns
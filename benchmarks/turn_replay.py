@@ -0,0 +1,239 @@
+"""
+Turn Replay Benchmark for Autism Support App
+Replays recorded turns through IntelligentConversationManager against local stand-ins and reports per-stage latency.
+
+OpenAI is served by the local stub (benchmarks.openai_stub, or --base-url),
+Qdrant runs in memory and Mongo is mongomock, all seeded from the fixture.
+Runs in a scratch working directory so caches, journals and profiles start empty.
+
+Usage:
+    python -m benchmarks.turn_replay data/benchmarks/turns.jsonl
+    python -m benchmarks.turn_replay turns.jsonl --concurrency 4 --repeat 3 --llm-latency-ms 400
+    python -m benchmarks.turn_replay turns.jsonl --latency-jitter 0.5 --rate-limit-rate 0.05 --seed 7
+    python -m benchmarks.turn_replay turns.jsonl --save-baseline benchmarks/baseline.json
+    python -m benchmarks.turn_replay turns.jsonl --baseline benchmarks/baseline.json --max-regression 0.2
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from benchmarks.openai_stub import add_stub_arguments, start_stub_server, stub_config_from_args
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MONGO_URI = "mongomock://benchmark"
+KB_COLLECTION = "kb_autism_support"
+# Stage p95 changes smaller than this are noise, whatever the ratio
+MIN_REGRESSION_MS = 5.0
+
+
+def prepare_environment(base_url: str = None, stub_config=None) -> Tuple[Optional[object], str]:
+    """Point the app at local stand-ins and move into a scratch directory; returns (stub server or None, OpenAI base URL)."""
+    # The scratch cwd must not hide the project's packages
+    if PROJECT_ROOT not in sys.path:
+        sys.path.insert(0, PROJECT_ROOT)
+    os.chdir(tempfile.mkdtemp(prefix="turn-replay-"))
+
+    server = None
+    if not base_url:
+        server, base_url = start_stub_server(stub_config)
+    os.environ["OPENAI_BASE_URL"] = base_url
+    os.environ["OPENAI_API_KEY"] = os.getenv("BENCHMARK_OPENAI_API_KEY", "benchmark-stub")
+    os.environ["EMBED_PROVIDER"] = "openai"
+    os.environ["QDRANT_LOCATION"] = ":memory:"
+    return server, base_url
+
+
+def seed_stores(turns: List[Dict]) -> Dict[str, int]:
+    """Load the fixture's knowledge nodes into mongomock and its KB chunks and user documents into Qdrant."""
+    from qdrant_client.models import PointStruct
+    from rag.embeddings import embed
+    from rag.qdrant_client import ensure_collection
+    from utils.lazy_services import create_knowledge_collection
+
+    nodes = OrderedDict()
+    kb = OrderedDict()
+    documents: Dict[str, List[Dict]] = {}
+    for turn in turns:
+        if turn.get("knowledge") and turn.get("context_path"):
+            nodes[turn["context_path"]] = dict(turn["knowledge"], context_path=turn["context_path"])
+        for chunk in turn.get("kb") or []:
+            kb[json.dumps(chunk, sort_keys=True, default=str)] = chunk
+        if turn.get("documents"):
+            documents[turn["user_id"]] = turn["documents"]
+
+    collection = create_knowledge_collection(MONGO_URI)
+    if nodes:
+        collection.insert_many(list(nodes.values()))
+
+    def upsert(name: str, payloads: List[Dict]):
+        if not payloads:
+            return
+        qdr = ensure_collection(name, size=1536)
+        vectors = embed([p.get("content") or p.get("text") or "" for p in payloads])
+        qdr.upsert(collection_name=name, points=[
+            PointStruct(id=uuid.uuid4().hex, vector=vector, payload=payload)
+            for payload, vector in zip(payloads, vectors)
+        ])
+
+    upsert(KB_COLLECTION, [dict(p, user_id=p.get("user_id", "public")) for p in kb.values()])
+    for user_id, chunks in documents.items():
+        upsert(f"user_docs_{user_id}", [
+            dict(chunk, type="user_document", source="user_upload", user_id=user_id, total_chunks=len(chunks))
+            for chunk in chunks
+        ])
+    return {"knowledge_nodes": len(nodes), "kb_chunks": len(kb), "document_users": len(documents)}
+
+
+def replay(turns: List[Dict], concurrency: int = 1, repeat: int = 1, stream: bool = False) -> Dict:
+    """Replay every recorded session (in parallel up to concurrency); returns timing and stage stats."""
+    from knowledge.conversation_session import ConversationSession
+    from utils.lazy_services import create_conversation_manager
+    from utils.tracing import get_latency_stats, reset_latency_stats
+
+    manager = create_conversation_manager(MONGO_URI)
+
+    sessions = OrderedDict()
+    for turn in turns:
+        sessions.setdefault(turn.get("session", "default"), []).append(turn)
+    runs = []
+    for round_index in range(repeat):
+        for session_turns in sessions.values():
+            profile = dict(session_turns[0].get("user_profile") or {}, user_id=session_turns[0].get("user_id", "default"))
+            runs.append((ConversationSession(profile), session_turns))
+
+    # Conversation openers are setup, not measured turns
+    for session, _ in runs:
+        manager.start_conversation(dict(session.user_profile), session=session)
+    reset_latency_stats()
+
+    def run_session(run) -> int:
+        session, session_turns = run
+        errors = 0
+        for turn in session_turns:
+            if stream:
+                result = {}
+                for frame in manager.process_user_response_stream(turn["user_input"], selected_path=turn.get("context_path"), session=session):
+                    if frame["type"] == "final":
+                        result = frame
+            else:
+                result = manager.process_user_response(turn["user_input"], selected_path=turn.get("context_path"), session=session)
+            errors += 1 if result.get("mode") == "error" else 0
+        return errors
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+        errors = sum(pool.map(run_session, runs))
+    wall = time.perf_counter() - started
+
+    turn_count = sum(len(t) for _, t in runs)
+    return {
+        "turns": turn_count,
+        "errors": errors,
+        "wall_seconds": wall,
+        "throughput": turn_count / wall if wall else 0.0,
+        "concurrency": concurrency,
+        "stages": get_latency_stats()
+    }
+
+
+def print_report(report: Dict):
+    print(f"\n📊 Replayed {report['turns']} turns in {report['wall_seconds']:.2f}s "
+          f"({report['throughput']:.2f} turns/s at concurrency {report['concurrency']}, {report['errors']} errors)")
+    print("=" * 72)
+    print(f"{'stage':<22}{'count':>8}{'errors':>8}{'p50 ms':>11}{'p95 ms':>11}{'p99 ms':>11}")
+    stages = report["stages"]
+    for stage in ["turn"] + sorted(s for s in stages if s != "turn"):
+        if stage not in stages:
+            continue
+        s = stages[stage]
+        print(f"{stage:<22}{s['count']:>8}{s['errors']:>8}{s['p50'] * 1000:>11.1f}{s['p95'] * 1000:>11.1f}{s['p99'] * 1000:>11.1f}")
+    if report.get("stub"):
+        print(f"🧪 Stub: {report['stub']}")
+
+
+def baseline_from(report: Dict) -> Dict:
+    return {
+        "throughput": report["throughput"],
+        "concurrency": report["concurrency"],
+        "stages": {stage: {"p50": s["p50"], "p95": s["p95"]} for stage, s in report["stages"].items()}
+    }
+
+
+def check_regressions(report: Dict, baseline: Dict, max_regression: float) -> List[str]:
+    """Stages whose p95 (and the throughput) got worse than baseline by more than max_regression."""
+    problems = []
+    for stage, base in baseline.get("stages", {}).items():
+        current = report["stages"].get(stage)
+        if not current or not current["count"]:
+            continue
+        limit = base["p95"] * (1 + max_regression)
+        if current["p95"] > limit and (current["p95"] - base["p95"]) * 1000 > MIN_REGRESSION_MS:
+            problems.append(f"{stage}: p95 {current['p95'] * 1000:.1f} ms vs baseline {base['p95'] * 1000:.1f} ms")
+    base_throughput = baseline.get("throughput") or 0
+    if base_throughput and report["throughput"] < base_throughput * (1 - max_regression):
+        problems.append(f"throughput: {report['throughput']:.2f} turns/s vs baseline {base_throughput:.2f}")
+    return problems
+
+
+def main() -> bool:
+    parser = argparse.ArgumentParser(description="Replay recorded turns against local stand-ins and report per-stage latency.")
+    parser.add_argument("fixture", help="JSONL file written with BENCHMARK_RECORD_PATH")
+    parser.add_argument("--concurrency", type=int, default=1, help="Sessions replayed in parallel")
+    parser.add_argument("--repeat", type=int, default=1, help="Replay every session this many times")
+    parser.add_argument("--stream", action="store_true", help="Use the streaming turn path")
+    parser.add_argument("--base-url", default=None, help="Use an already running OpenAI-compatible server instead of the built-in stub")
+    parser.add_argument("--baseline", default=None, help="Fail if stages regress against this baseline JSON")
+    parser.add_argument("--max-regression", type=float, default=0.2, help="Allowed p95/throughput regression ratio")
+    parser.add_argument("--save-baseline", default=None, help="Write this run as a baseline JSON")
+    parser.add_argument("--output", default=None, help="Write the full report as JSON")
+    add_stub_arguments(parser)
+    args = parser.parse_args()
+
+    # Paths are resolved before moving into the scratch directory
+    fixture, baseline_path, save_path, output_path = (
+        os.path.abspath(p) if p else None for p in (args.fixture, args.baseline, args.save_baseline, args.output)
+    )
+
+    from benchmarks.turn_recorder import load_fixture
+
+    turns = load_fixture(fixture)
+    if not turns:
+        print(f"❌ No turns in {fixture}")
+        return False
+
+    server, _ = prepare_environment(args.base_url, stub_config_from_args(args))
+    print(f"🌱 Seeded stand-ins: {seed_stores(turns)}")
+    report = replay(turns, concurrency=args.concurrency, repeat=args.repeat, stream=args.stream)
+    if server is not None:
+        report["stub"] = server.state.get_stats()
+    print_report(report)
+
+    for path, data in ((output_path, report), (save_path, baseline_from(report))):
+        if path:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(data, f, indent=2)
+            print(f"💾 Wrote {path}")
+
+    if baseline_path:
+        with open(baseline_path, "r", encoding="utf-8") as f:
+            problems = check_regressions(report, json.load(f), args.max_regression)
+        if problems:
+            print(f"\n❌ Regressions beyond {args.max_regression:.0%}:")
+            for problem in problems:
+                print(f"  • {problem}")
+            return False
+        print(f"\n✅ No regressions beyond {args.max_regression:.0%} against {baseline_path}")
+    return report["errors"] == 0
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
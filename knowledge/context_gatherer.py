@@ -0,0 +1,76 @@
+"""
+Context Gatherer for Autism Support App
+Runs independent context fetches (web, memory, patient documents) concurrently under one deadline.
+"""
+
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Tuple
+
+from utils.tracing import run_in_context
+
+DEFAULT_DEADLINE_SECONDS = 8.0
+
+
+class ContextGatherer:
+    """Fan out named context branches on a shared thread pool and collect what finishes in time."""
+
+    def __init__(self, max_workers: int = 8, deadline_seconds: float = DEFAULT_DEADLINE_SECONDS):
+        self.deadline_seconds = deadline_seconds
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="context")
+
+    def gather(
+        self,
+        branches: Dict[str, Callable[[], Any]],
+        deadline_seconds: float = None
+    ) -> Tuple[Dict[str, Any], Dict[str, Dict]]:
+        """
+        Run every branch concurrently and wait at most deadline_seconds in total.
+
+        A branch that raises or misses the deadline contributes None, so the turn
+        degrades to whatever context did arrive. Slow branches keep running in the
+        background; their results are discarded.
+
+        Returns:
+            (results, timings) where timings[name] = {"seconds": float, "status": "ok"|"error"|"timeout"}
+        """
+        deadline = self.deadline_seconds if deadline_seconds is None else deadline_seconds
+        started = time.perf_counter()
+        timings: Dict[str, Dict] = {}
+        lock = threading.Lock()
+
+        def run(name: str, fn: Callable[[], Any]) -> Any:
+            branch_start = time.perf_counter()
+            status = "ok"
+            try:
+                return fn()
+            except Exception as e:
+                status = "error"
+                print(f"⚠️ Context branch '{name}' failed: {e}")
+                return None
+            finally:
+                with lock:
+                    timings[name] = {"seconds": time.perf_counter() - branch_start, "status": status}
+
+        # Branches run in a copy of the caller's context so their spans land in the current turn's trace
+        futures = {name: self._executor.submit(run_in_context(run), name, fn) for name, fn in branches.items()}
+        wait(futures.values(), timeout=deadline)
+
+        results: Dict[str, Any] = {}
+        for name, future in futures.items():
+            if future.done():
+                results[name] = future.result()
+            else:
+                results[name] = None
+                with lock:
+                    timings[name] = {"seconds": time.perf_counter() - started, "status": "timeout"}
+                print(f"⏱️ Context branch '{name}' missed the {deadline:.1f}s deadline - continuing without it")
+
+        # Snapshot so branches finishing after the deadline don't mutate the result
+        with lock:
+            branch_timings = dict(timings)
+        total = time.perf_counter() - started
+        summary = ", ".join(f"{n}={t['seconds']:.2f}s/{t['status']}" for n, t in branch_timings.items())
+        print(f"⏱️ Context gathered in {total:.2f}s ({summary})")
+        return results, branch_timings
@@ -0,0 +1,168 @@
+"""
+Context Prefetcher for Autism Support App
+Opt-in warming of the likely next context nodes (Mongo content, source pages, KB results) during user think time.
+
+Enable with CONTEXT_PREFETCH=1. After each turn the conversation manager
+schedules jobs for the top PREFETCH_TOP_N available paths and suggestions; at
+most PREFETCH_MAX_CONCURRENT run at once, and a session's jobs still waiting
+when its next turn schedules are replaced by that turn's predictions. Waiting
+jobs are started round-robin across sessions. Warmed values are consumed by
+the next lookup or dropped after PREFETCH_TTL_SECONDS.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Hashable, Optional, Tuple
+
+from utils.tracing import span
+
+PREFETCH_TOP_N = int(os.getenv("PREFETCH_TOP_N", "3"))
+MAX_CONCURRENT = int(os.getenv("PREFETCH_MAX_CONCURRENT", "2"))
+TTL_SECONDS = float(os.getenv("PREFETCH_TTL_SECONDS", "300"))
+MAX_ENTRIES = 256
+
+
+def prefetch_enabled() -> bool:
+    return os.getenv("CONTEXT_PREFETCH", "0").lower() in ("1", "true", "yes", "on")
+
+
+class ContextPrefetcher:
+    """
+    Bounded background prefetch plus the buffer its results land in.
+
+    Jobs are keyed callables that put() what they warm; take() hands a warmed
+    value to the request path once, so hits/misses per kind give the prefetch
+    hit rate and entries that expire unused are counted as wasted.
+    """
+
+    def __init__(self, max_concurrent: int = MAX_CONCURRENT, ttl_seconds: float = TTL_SECONDS, max_entries: int = MAX_ENTRIES):
+        self.max_concurrent = max_concurrent
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[str, Hashable], Tuple[object, float]]" = OrderedDict()
+        self._in_flight = set()
+        # owner → its waiting jobs; owners are served round-robin
+        self._pending: "OrderedDict[Hashable, OrderedDict[Hashable, Callable[[], None]]]" = OrderedDict()
+        self._recent: Dict[Hashable, float] = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max(1, max_concurrent), thread_name_prefix="prefetch")
+        self.stats = {"scheduled": 0, "started": 0, "superseded": 0, "skipped_recent": 0, "completed": 0, "errors": 0}
+        self.kind_stats: Dict[str, Dict[str, int]] = {}
+
+    def schedule(self, jobs: Dict[Hashable, Callable[[], None]], owner: Hashable = None) -> int:
+        """
+        Replace owner's waiting jobs with jobs (most likely first) and start as
+        many as the concurrency budget allows; other owners' jobs are untouched.
+        Keys in flight or warmed within the TTL are skipped. Returns how many
+        jobs were accepted.
+        """
+        now = time.time()
+        with self._lock:
+            self._recent = {k: t for k, t in self._recent.items() if now - t < self.ttl_seconds}
+            self.stats["superseded"] += len(self._pending.pop(owner, ()))
+            waiting = OrderedDict()
+            for key, job in jobs.items():
+                if key in self._in_flight or key in self._recent:
+                    self.stats["skipped_recent"] += 1
+                    continue
+                waiting[key] = job
+            if waiting:
+                self._pending[owner] = waiting
+            self.stats["scheduled"] += len(waiting)
+            self._start_pending()
+        return len(waiting)
+
+    def _start_pending(self):
+        """Start waiting jobs up to the concurrency budget, one owner at a time. Caller holds the lock."""
+        while self._pending and len(self._in_flight) < self.max_concurrent:
+            owner, waiting = self._pending.popitem(last=False)
+            key, job = waiting.popitem(last=False)
+            if waiting:
+                self._pending[owner] = waiting
+            # Another owner may have started the same key since this one scheduled it
+            if key in self._in_flight:
+                continue
+            self._in_flight.add(key)
+            self.stats["started"] += 1
+            self._executor.submit(self._run, key, job)
+
+    def _run(self, key: Hashable, job: Callable[[], None]):
+        try:
+            with span("prefetch"):
+                job()
+            with self._lock:
+                self.stats["completed"] += 1
+        except Exception as e:
+            with self._lock:
+                self.stats["errors"] += 1
+            print(f"⚠️ Prefetch {key} failed: {e}")
+        finally:
+            with self._lock:
+                self._in_flight.discard(key)
+                self._recent[key] = time.time()
+                self._start_pending()
+
+    def put(self, kind: str, key: Hashable, value):
+        """Store a warmed value (None is not stored)."""
+        if value is None:
+            return
+        with self._lock:
+            self._kind(kind)["prefetched"] += 1
+            self._entries[(kind, key)] = (value, time.time())
+            self._entries.move_to_end((kind, key))
+            while len(self._entries) > self.max_entries:
+                (old_kind, _), _ = self._entries.popitem(last=False)
+                self._kind(old_kind)["wasted"] += 1
+
+    def take(self, kind: str, key: Hashable):
+        """The warmed value for (kind, key), removed from the buffer; None on a miss."""
+        with self._lock:
+            stats = self._kind(kind)
+            entry = self._entries.pop((kind, key), None)
+            if entry is not None and time.time() - entry[1] > self.ttl_seconds:
+                stats["wasted"] += 1
+                entry = None
+            stats["hits" if entry is not None else "misses"] += 1
+            return entry[0] if entry is not None else None
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self.stats)
+            stats["in_flight"] = len(self._in_flight)
+            stats["waiting"] = sum(len(waiting) for waiting in self._pending.values())
+            stats["buffered"] = len(self._entries)
+            kinds = {kind: dict(s) for kind, s in self.kind_stats.items()}
+        for s in kinds.values():
+            lookups = s["hits"] + s["misses"]
+            s["hit_rate"] = s["hits"] / lookups if lookups else 0.0
+            s["used_rate"] = s["hits"] / s["prefetched"] if s["prefetched"] else 0.0
+        stats["kinds"] = kinds
+        return stats
+
+    def _kind(self, kind: str) -> Dict[str, int]:
+        """Per-kind counters. Caller holds the lock."""
+        return self.kind_stats.setdefault(kind, {"prefetched": 0, "hits": 0, "misses": 0, "wasted": 0})
+
+
+_prefetcher = None
+_prefetcher_lock = threading.Lock()
+
+
+def get_context_prefetcher() -> Optional[ContextPrefetcher]:
+    """Process-wide prefetcher, or None unless CONTEXT_PREFETCH is set."""
+    global _prefetcher
+    if not prefetch_enabled():
+        return None
+    with _prefetcher_lock:
+        if _prefetcher is None:
+            _prefetcher = ContextPrefetcher()
+        return _prefetcher
+
+
+def take_prefetched(kind: str, key: Hashable):
+    """Consume a warmed value if prefetch is on and one is buffered; None otherwise."""
+    prefetcher = get_context_prefetcher()
+    return prefetcher.take(kind, key) if prefetcher else None
@@ -5,13 +5,14 @@ Dynamically navigates the MongoDB knowledge base structure.
 
 import json
 from typing import Dict, List, Optional, Tuple
-from pymongo import MongoClient
 import streamlit as st
+from utils.tracing import span
+from utils.lazy_services import create_mongo_client
 
 class ContextTraversalEngine:
     def __init__(self, mongo_uri: str = "mongodb://localhost:27017/"):
         """Initialize the context traversal engine."""
-        self.client = MongoClient(mongo_uri)
+        self.client = create_mongo_client(mongo_uri)
         self.db = self.client["autism_ai"]
         self.collection = self.db["knowledge"]
         
@@ -37,7 +38,8 @@ class ContextTraversalEngine:
             return self.context_cache[context_path]
         
         # Try MongoDB first
-        doc = self.collection.find_one({"context_path": context_path})
+        with span("mongo_lookup", context_path=context_path):
+            doc = self.collection.find_one({"context_path": context_path})
         if doc:
             self.context_cache[context_path] = doc
             return doc
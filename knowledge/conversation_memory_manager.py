@@ -4,10 +4,19 @@ Manages persistent storage and retrieval of conversation memory, insights, and u
 """
 
 import json
-import re
 from typing import Dict, List, Optional, Set
 from datetime import datetime
-from rag.qdrant_client import store_conversation_memory, search_conversation_memory
+from rag.qdrant_client import search_conversation_memory, get_conversation_memory_doc, get_recent_conversation_memory
+from rag.memory_schema import memory_text, read_memory
+from rag.memory_write_queue import enqueue_conversation_memory
+from .memory_hot_tier import get_hot_memory_tier
+
+# Search phrases for documents stored before merged documents had stable ids
+LEGACY_DOC_QUERIES = {
+    "insights": "conversation insights",
+    "prefs": "user preferences",
+    "learning": "successful strategies"
+}
 
 class ConversationMemoryManager:
     """Manages conversation memory persistence and retrieval."""
@@ -22,7 +31,7 @@ class ConversationMemoryManager:
         ]
     
     def store_chat_message(self, message: Dict) -> bool:
-        """Store a chat message in the chat history collection."""
+        """Queue a chat message for the chat history collection (persisted in the background)."""
         try:
             # Extract key information from message
             memory_data = {
@@ -35,158 +44,58 @@ class ConversationMemoryManager:
                 "next_suggestions": message.get("next_suggestions", [])
             }
             
-            return store_conversation_memory(self.user_id, "chat_history", memory_data)
+            get_hot_memory_tier().record_message(self.user_id, memory_data)
+            return enqueue_conversation_memory(self.user_id, "chat_history", memory_data)
             
         except Exception as e:
             print(f"❌ Error storing chat message: {e}")
             return False
     
+    def get_recent_messages(self, limit: int = 25) -> List[Dict]:
+        """
+        The user's last limit chat messages, oldest first. Served from the hot tier
+        when it holds enough, otherwise merged with a time-ordered read of Qdrant
+        (which may not have the newest, still-queued messages yet).
+        """
+        hot = get_hot_memory_tier().recent(self.user_id, limit) or []
+        if len(hot) >= limit:
+            return hot
+        
+        stored = [read_memory(r.get("payload"))["data"] for r in get_recent_conversation_memory(self.user_id, limit)]
+        merged = {}
+        for message in [m for m in stored if isinstance(m, dict)] + hot:
+            key = (message.get("timestamp", ""), message.get("role"), message.get("content"))
+            merged[key] = message
+        messages = sorted(merged.values(), key=lambda m: m.get("timestamp", ""))
+        return messages[-limit:]
+    
     def extract_and_store_insights(self, conversation: List[Dict]) -> Dict:
-        """Extract insights from conversation and store them."""
+        """
+        Fold messages into this user's running insights and store the merged documents.
+        
+        The merge and storage happen on the insight extractor's background worker;
+        the returned dict covers only the messages passed in.
+        """
         try:
-            insights = {
-                "topics_discussed": self._extract_topics(conversation),
-                "user_concerns": self._extract_concerns(conversation),
-                "successful_strategies": self._extract_strategies(conversation),
-                "patient_progress": self._extract_progress(conversation),
-                "user_preferences": self._extract_preferences(conversation),
-                "extraction_timestamp": datetime.now().isoformat(),
-                "conversation_count": len(conversation)
-            }
+            from knowledge.insight_extractor import InsightAggregate, submit_insight_messages
             
-            # Store insights
-            store_conversation_memory(self.user_id, "insights", insights)
+            submit_insight_messages(self.user_id, conversation, emit=True)
             
-            # Store individual insights in their respective collections
-            if insights["user_preferences"]:
-                store_conversation_memory(self.user_id, "prefs", insights["user_preferences"])
-            
-            if insights["successful_strategies"]:
-                store_conversation_memory(self.user_id, "learning", insights["successful_strategies"])
-            
-            print(f"✅ Extracted and stored insights: {len(insights['topics_discussed'])} topics, {len(insights['user_concerns'])} concerns")
+            preview = InsightAggregate()
+            preview.add(conversation)
+            insights = preview.snapshot()
+            print(f"✅ Queued insight extraction: {len(insights['topics_discussed'])} topics, {len(insights['user_concerns'])} concerns")
             return insights
             
         except Exception as e:
             print(f"❌ Error extracting insights: {e}")
             return {}
     
-    def _extract_topics(self, conversation: List[Dict]) -> List[str]:
-        """Extract main topics discussed in conversation."""
-        topics = set()
-        
-        # Common autism-related topics
-        autism_topics = [
-            "screening", "diagnosis", "therapy", "education", "behavior", 
-            "communication", "social skills", "sensory issues", "medication",
-            "IEP", "school", "family support", "resources", "treatment"
-        ]
-        
-        for message in conversation:
-            content = message.get("content", "").lower()
-            for topic in autism_topics:
-                if topic in content:
-                    topics.add(topic)
-        
-        return list(topics)
-    
-    def _extract_concerns(self, conversation: List[Dict]) -> List[str]:
-        """Extract user concerns and worries."""
-        concerns = []
-        
-        # Look for concern indicators
-        concern_indicators = [
-            "worried", "concerned", "struggling", "difficult", "challenging",
-            "problem", "issue", "trouble", "hard", "frustrated", "overwhelmed"
-        ]
-        
-        for message in conversation:
-            if message.get("role") == "user":
-                content = message.get("content", "").lower()
-                for indicator in concern_indicators:
-                    if indicator in content:
-                        # Extract the sentence containing the concern
-                        sentences = re.split(r'[.!?]', content)
-                        for sentence in sentences:
-                            if indicator in sentence:
-                                concerns.append(sentence.strip())
-                                break
-        
-        return list(set(concerns))[:10]  # Limit to top 10 concerns
-    
-    def _extract_strategies(self, conversation: List[Dict]) -> List[str]:
-        """Extract successful strategies and recommendations."""
-        strategies = []
-        
-        # Look for strategy indicators
-        strategy_indicators = [
-            "worked", "helped", "effective", "successful", "improved",
-            "better", "strategy", "technique", "approach", "method"
-        ]
-        
-        for message in conversation:
-            if message.get("role") == "assistant":
-                content = message.get("content", "").lower()
-                for indicator in strategy_indicators:
-                    if indicator in content:
-                        # Extract the sentence containing the strategy
-                        sentences = re.split(r'[.!?]', content)
-                        for sentence in sentences:
-                            if indicator in sentence:
-                                strategies.append(sentence.strip())
-                                break
-        
-        return list(set(strategies))[:10]  # Limit to top 10 strategies
-    
-    def _extract_progress(self, conversation: List[Dict]) -> Dict:
-        """Extract patient progress information."""
-        progress = {
-            "milestones": [],
-            "improvements": [],
-            "challenges": [],
-            "goals": []
-        }
-        
-        for message in conversation:
-            content = message.get("content", "").lower()
-            
-            # Look for progress indicators
-            if any(word in content for word in ["improved", "better", "progress", "milestone"]):
-                progress["improvements"].append(content[:200])
-            
-            if any(word in content for word in ["goal", "target", "aim", "objective"]):
-                progress["goals"].append(content[:200])
-        
-        return progress
-    
-    def _extract_preferences(self, conversation: List[Dict]) -> Dict:
-        """Extract user preferences and learning patterns."""
-        preferences = {
-            "communication_style": [],
-            "information_format": [],
-            "topic_interests": [],
-            "response_length": []
-        }
-        
-        for message in conversation:
-            if message.get("role") == "user":
-                content = message.get("content", "").lower()
-                
-                # Communication style preferences
-                if any(word in content for word in ["detailed", "simple", "step-by-step", "overview"]):
-                    preferences["communication_style"].append(content[:100])
-                
-                # Information format preferences
-                if any(word in content for word in ["list", "explanation", "example", "resource"]):
-                    preferences["information_format"].append(content[:100])
-        
-        return preferences
-    
     def retrieve_relevant_context(self, query: str, limit: int = 5) -> Dict:
-        """Retrieve relevant context from all memory collections."""
+        """Relevant chat history for query plus the user's merged insights, preferences and learning."""
         try:
-            # Search all memory collections
-            results = search_conversation_memory(self.user_id, query, limit=limit)
+            # Only chat history needs a relevance search
+            results = search_conversation_memory(self.user_id, query, memory_type="chat_history", limit=limit)
             
             # Organize results by type
             context = {
@@ -197,13 +106,23 @@ class ConversationMemoryManager:
             }
             
             for result in results:
-                memory_type = result.get("payload", {}).get("type", "unknown")
-                if memory_type in context:
-                    context[memory_type].append({
-                        "content": result.get("payload", {}).get("content", ""),
-                        "data": result.get("payload", {}).get("data", {}),
-                        "score": result.get("score", 0),
-                        "timestamp": result.get("payload", {}).get("timestamp", "")
+                memory = read_memory(result.get("payload"))
+                context["chat_history"].append({
+                    "content": memory["text"],
+                    "data": memory["data"] or {},
+                    "score": result.get("score", 0),
+                    "timestamp": memory["timestamp"]
+                })
+            
+            # Insights, preferences and learning are one merged document each (hot tier, id lookup on a miss)
+            for memory_type, key in (("insights", "insights"), ("prefs", "preferences"), ("learning", "learning")):
+                doc = self.get_memory_doc(memory_type)
+                if doc:
+                    context[key].append({
+                        "content": memory_text(memory_type, doc),
+                        "data": doc,
+                        "score": 0,
+                        "timestamp": doc.get("extraction_timestamp", "") if isinstance(doc, dict) else ""
                     })
             
             return context
@@ -212,13 +131,23 @@ class ConversationMemoryManager:
             print(f"❌ Error retrieving memory context: {e}")
             return {}
     
+    def get_memory_doc(self, memory_type: str):
+        """The user's merged insights/prefs/learning document from the hot tier, loaded by id on a miss."""
+        return get_hot_memory_tier().get_doc(self.user_id, memory_type, lambda: self._load_memory_doc(memory_type))
+    
+    def _load_memory_doc(self, memory_type: str):
+        payload = get_conversation_memory_doc(self.user_id, memory_type)
+        if payload is not None:
+            return read_memory(payload)["data"]
+        # Fall back to a one-off search for documents written before stable ids
+        results = search_conversation_memory(self.user_id, LEGACY_DOC_QUERIES[memory_type], memory_type=memory_type, limit=1)
+        return read_memory(results[0].get("payload"))["data"] if results else None
+    
     def get_user_preferences(self) -> Dict:
         """Get stored user preferences."""
         try:
-            results = search_conversation_memory(self.user_id, "user preferences", memory_type="prefs", limit=3)
-            if results:
-                return results[0].get("payload", {}).get("data", {})
-            return {}
+            data = self.get_memory_doc("prefs")
+            return data if isinstance(data, dict) else {}
         except Exception as e:
             print(f"❌ Error getting user preferences: {e}")
             return {}
@@ -226,15 +155,12 @@ class ConversationMemoryManager:
     def get_learning_patterns(self) -> List[str]:
         """Get stored learning patterns and successful strategies."""
         try:
-            results = search_conversation_memory(self.user_id, "successful strategies", memory_type="learning", limit=5)
-            strategies = []
-            for result in results:
-                data = result.get("payload", {}).get("data", {})
-                if isinstance(data, list):
-                    strategies.extend(data)
-                elif isinstance(data, str):
-                    strategies.append(data)
-            return strategies[:10]
+            data = self.get_memory_doc("learning")
+            if isinstance(data, list):
+                return data[:10]
+            if isinstance(data, str):
+                return [data]
+            return []
         except Exception as e:
             print(f"❌ Error getting learning patterns: {e}")
             return []
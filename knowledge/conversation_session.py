@@ -0,0 +1,39 @@
+"""
+Conversation Session for Autism Support App
+Per-user conversation state passed into the shared, stateless IntelligentConversationManager.
+"""
+
+import threading
+from typing import Dict
+
+
+class ConversationSession:
+    """Mutable state of one user's conversation; one instance per browser session."""
+
+    def __init__(self, user_profile: Dict = None):
+        self.user_profile = dict(user_profile or {})
+        self.user_profile.setdefault("user_id", "default")
+        self.conversation_id = None
+        self.current_context_path = None
+        self.conversation_history = []
+        self.available_paths = []
+
+        # Conversation memory for context continuity
+        self.conversation_memory = {
+            "patient_info": {},
+            "discussed_topics": set(),
+            "user_concerns": [],
+            "recommendations_given": []
+        }
+
+        # Set by the manager once the user is known
+        self.memory_manager = None
+        # Number of history messages already handed to the insight extractor
+        self.insight_checkpoint = 0
+
+        # Serializes turns within this session only (e.g. a double-submitted message)
+        self.lock = threading.Lock()
+
+    @property
+    def user_id(self) -> str:
+        return self.user_profile.get("user_id", "default")
@@ -9,6 +9,12 @@ import os
 from pymongo import MongoClient
 from typing import Dict, List, Any
 
+# Works both as `python -m knowledge.X` and when run as a script from knowledge/
+try:
+    from knowledge.semantic_response_cache import bump_kb_version
+except ImportError:
+    from semantic_response_cache import bump_kb_version
+
 # Paths
 DIR = os.path.dirname(__file__)
 STRUCTURED_JSON_PATH = os.path.join(DIR, "structured_mongo.json")
@@ -159,6 +165,9 @@ def ingest_to_mongo():
             collection.create_index("tone")
             print("🔍 Created database indexes")
         
+        # Cached answers were synthesized from the old knowledge base
+        bump_kb_version("mongo ingest")
+        
         # Show sample documents
         print("\n📋 Sample documents:")
         sample_docs = list(collection.find().limit(3))
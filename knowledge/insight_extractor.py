@@ -0,0 +1,262 @@
+"""
+Incremental Insight Extractor for Autism Support App
+Keeps running per-user insight aggregates updated from new messages only, on a background worker.
+"""
+
+import atexit
+import hashlib
+import json
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List
+
+from utils.text_analyzer import analyze
+
+DEFAULT_CHECKPOINT_DIR = os.path.join("data", "insight_checkpoints")
+# Emit a merged insight document after this many new messages
+EMIT_EVERY_MESSAGES = 10
+# Most recent entries kept per aggregate list
+MAX_ITEMS = 10
+# In-memory aggregates untouched this long are dropped; their checkpoint reloads them
+IDLE_EVICT_SECONDS = 30 * 60
+# How long shutdown waits for queued jobs
+CLOSE_TIMEOUT_SECONDS = 5.0
+
+
+def _remember(items: List, value: str):
+    """Append value once, keeping the MAX_ITEMS most recent."""
+    if value in items:
+        items.remove(value)
+    items.append(value)
+    del items[:-MAX_ITEMS]
+
+
+class InsightAggregate:
+    """Running insights for one user; add() costs O(new messages) and re-adding a message adds no duplicate entries."""
+
+    def __init__(self, state: Dict = None):
+        state = state or {}
+        self.topics = set(state.get("topics_discussed", []))
+        self.concerns = list(state.get("user_concerns", []))
+        self.strategies = list(state.get("successful_strategies", []))
+        self.progress = state.get("patient_progress") or {"milestones": [], "improvements": [], "challenges": [], "goals": []}
+        self.preferences = state.get("user_preferences") or {
+            "communication_style": [],
+            "information_format": [],
+            "topic_interests": [],
+            "response_length": []
+        }
+        self.message_count = state.get("conversation_count", 0)
+        self.unemitted = state.get("unemitted", 0)
+
+    def add(self, messages: List[Dict]):
+        for message in messages:
+            role = message.get("role")
+            if role not in ("user", "assistant"):
+                continue
+            annotation = analyze(message.get("content") or "")
+            content = annotation.lower
+            self.message_count += 1
+            self.unemitted += 1
+
+            self.topics.update(annotation.found("topic"))
+
+            # First sentence per matched indicator
+            indicators = annotation.found("concern_indicator" if role == "user" else "strategy_indicator")
+            target = self.concerns if role == "user" else self.strategies
+            for indicator in indicators:
+                sentence = annotation.sentence_with(indicator)
+                if sentence:
+                    _remember(target, sentence)
+
+            if annotation.has("progress"):
+                _remember(self.progress["improvements"], content[:200])
+            if annotation.has("goal"):
+                _remember(self.progress["goals"], content[:200])
+
+            if role == "user":
+                if annotation.has("style_preference"):
+                    _remember(self.preferences["communication_style"], content[:100])
+                if annotation.has("format_preference"):
+                    _remember(self.preferences["information_format"], content[:100])
+
+    def snapshot(self) -> Dict:
+        """Insight document in the shape extract_and_store_insights has always stored."""
+        return {
+            "topics_discussed": sorted(self.topics),
+            "user_concerns": list(self.concerns),
+            "successful_strategies": list(self.strategies),
+            "patient_progress": {k: list(v) for k, v in self.progress.items()},
+            "user_preferences": {k: list(v) for k, v in self.preferences.items()},
+            "extraction_timestamp": datetime.now().isoformat(),
+            "conversation_count": self.message_count
+        }
+
+    def has_preferences(self) -> bool:
+        return any(self.preferences.values())
+
+
+def store_insights(user_id: str, aggregate: InsightAggregate) -> Dict:
+    """
+    Queue the merged insight, preference and strategy documents for user_id.
+    Each has a stable id per user, so a newer merge replaces the older one.
+    """
+    from rag.memory_write_queue import enqueue_conversation_memory
+    from rag.qdrant_client import memory_doc_id
+    from knowledge.memory_hot_tier import get_hot_memory_tier
+
+    insights = aggregate.snapshot()
+    docs = [("insights", insights)]
+    if aggregate.has_preferences():
+        docs.append(("prefs", insights["user_preferences"]))
+    if aggregate.strategies:
+        docs.append(("learning", insights["successful_strategies"]))
+
+    # Write through: the hot tier serves reads now, Qdrant catches up in the background
+    tier = get_hot_memory_tier()
+    for memory_type, data in docs:
+        tier.put_doc(user_id, memory_type, data)
+        enqueue_conversation_memory(user_id, memory_type, data, record_id=memory_doc_id(user_id, memory_type))
+    return insights
+
+
+class IncrementalInsightExtractor:
+    """
+    Background worker folding submitted messages into per-user aggregates.
+
+    Each aggregate is checkpointed after every job, so a restart loses at most the
+    jobs still queued; close() drains those at exit. Idle aggregates are evicted.
+    """
+
+    def __init__(self, checkpoint_dir: str = DEFAULT_CHECKPOINT_DIR, emit_every: int = EMIT_EVERY_MESSAGES):
+        self.checkpoint_dir = checkpoint_dir
+        self.emit_every = emit_every
+        self._aggregates: Dict[str, InsightAggregate] = {}
+        self._last_used: Dict[str, float] = {}
+        self._jobs: "queue.Queue" = queue.Queue()
+        self._worker = None
+        self._lock = threading.Lock()
+        self.stats = {"submitted_messages": 0, "processed_messages": 0, "emitted": 0, "errors": 0, "evicted": 0}
+        os.makedirs(checkpoint_dir, exist_ok=True)
+
+    def submit(self, user_id: str, messages: List[Dict], emit: bool = False):
+        """Hand new messages to the worker; returns immediately. emit forces a merged document now."""
+        if not messages and not emit:
+            return
+        with self._lock:
+            self.stats["submitted_messages"] += len(messages)
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name="insight-extractor", daemon=True)
+                self._worker.start()
+        self._jobs.put((user_id, list(messages), emit))
+
+    def wait_idle(self):
+        """Block until every submitted job is processed (for scripts and tests)."""
+        self._jobs.join()
+
+    def close(self, timeout: float = CLOSE_TIMEOUT_SECONDS):
+        """Give queued jobs a chance to be folded and checkpointed (registered with atexit)."""
+        deadline = time.time() + timeout
+        while self._jobs.unfinished_tasks and time.time() < deadline:
+            time.sleep(0.05)
+        if self._jobs.unfinished_tasks:
+            print(f"⚠️ Insight extractor stopped with {self._jobs.unfinished_tasks} jobs unprocessed")
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self.stats)
+            stats["aggregates"] = len(self._aggregates)
+        stats["queued_jobs"] = self._jobs.qsize()
+        return stats
+
+    def _run(self):
+        while True:
+            user_id, messages, emit = self._jobs.get()
+            try:
+                self._process(user_id, messages, emit)
+            except Exception as e:
+                with self._lock:
+                    self.stats["errors"] += 1
+                print(f"⚠️ Insight extraction failed for {user_id}: {e}")
+            finally:
+                self._evict_idle()
+                self._jobs.task_done()
+
+    def _process(self, user_id: str, messages: List[Dict], emit: bool):
+        aggregate = self._aggregates.get(user_id)
+        if aggregate is None:
+            aggregate = InsightAggregate(self._load_checkpoint(user_id))
+            with self._lock:
+                self._aggregates[user_id] = aggregate
+        self._last_used[user_id] = time.time()
+
+        aggregate.add(messages)
+        with self._lock:
+            self.stats["processed_messages"] += len(messages)
+
+        if aggregate.unemitted and (emit or aggregate.unemitted >= self.emit_every):
+            insights = store_insights(user_id, aggregate)
+            aggregate.unemitted = 0
+            with self._lock:
+                self.stats["emitted"] += 1
+            print(f"✅ Merged insights for {user_id}: {len(insights['topics_discussed'])} topics, {len(insights['user_concerns'])} concerns over {aggregate.message_count} messages")
+        self._save_checkpoint(user_id, aggregate)
+
+    def _evict_idle(self):
+        """Drop aggregates idle past IDLE_EVICT_SECONDS; their checkpoints are current. Worker thread only."""
+        cutoff = time.time() - IDLE_EVICT_SECONDS
+        idle = [u for u, used in self._last_used.items() if used < cutoff]
+        if not idle:
+            return
+        with self._lock:
+            for user_id in idle:
+                self._aggregates.pop(user_id, None)
+                self._last_used.pop(user_id, None)
+            self.stats["evicted"] += len(idle)
+
+    def _checkpoint_path(self, user_id: str) -> str:
+        name = hashlib.sha256(user_id.encode("utf-8")).hexdigest()[:32]
+        return os.path.join(self.checkpoint_dir, f"{name}.json")
+
+    def _load_checkpoint(self, user_id: str) -> Dict:
+        try:
+            with open(self._checkpoint_path(user_id), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            print(f"⚠️ Could not read insight checkpoint for {user_id}: {e}")
+            return {}
+
+    def _save_checkpoint(self, user_id: str, aggregate: InsightAggregate):
+        try:
+            state = aggregate.snapshot()
+            state["unemitted"] = aggregate.unemitted
+            path = self._checkpoint_path(user_id)
+            with open(path + ".tmp", "w", encoding="utf-8") as f:
+                json.dump(state, f)
+            os.replace(path + ".tmp", path)
+        except Exception as e:
+            print(f"⚠️ Could not save insight checkpoint for {user_id}: {e}")
+
+
+_extractor = None
+_extractor_lock = threading.Lock()
+
+
+def get_insight_extractor() -> IncrementalInsightExtractor:
+    """Process-wide extractor instance."""
+    global _extractor
+    with _extractor_lock:
+        if _extractor is None:
+            _extractor = IncrementalInsightExtractor()
+            atexit.register(_extractor.close)
+        return _extractor
+
+
+def submit_insight_messages(user_id: str, messages: List[Dict], emit: bool = False):
+    """Fold new messages into user_id's running insights off the request thread."""
+    get_insight_extractor().submit(user_id, messages, emit=emit)
@@ -3,8 +3,10 @@ Intelligent Conversation Manager for Autism Support App
 Integrates Response Synthesis Engine with guided conversation flows for dynamic, intelligent conversations.
 """
 
+import contextvars
 import json
-from typing import Dict, List, Optional, Tuple, Any
+import os
+from typing import Dict, Iterator, List, Optional, Tuple, Any
 from .response_synthesis_engine import ResponseSynthesisEngine
 from .context_traversal_engine import ContextTraversalEngine
 
@@ -12,6 +14,10 @@ from .context_traversal_engine import ContextTraversalEngine
 from .knowledge_adapter import KnowledgeAdapter
 from retrieval.retrieval_router import RetrievalRouter
 from .conversation_memory_manager import ConversationMemoryManager
+from .conversation_session import ConversationSession
+from .context_prefetcher import PREFETCH_TOP_N, get_context_prefetcher
+from utils.text_analyzer import CONCERN_CATEGORIES, age_band, analyze, match_keywords
+from utils.tracing import span, start_trace
 
 class IntelligentConversationManager:
     def __init__(self, mongo_uri: str = "mongodb://localhost:27017/"):
@@ -28,52 +34,42 @@ class IntelligentConversationManager:
             print(f"⚠️ Could not initialize retrieval router: {e}")
             self.retrieval_router = None
         
-        # Conversation state
-        self.current_context_path = None
-        self.conversation_history = []
-        self.user_profile = {}
-        self.available_paths = []
-        
-        # Conversation memory for context continuity
-        self.conversation_memory = {
-            "patient_info": {},
-            "discussed_topics": set(),
-            "user_concerns": [],
-            "recommendations_given": []
-        }
-        
-        # Initialize memory manager (will be set when user_profile is available)
-        self.memory_manager = None
-        
-        # Generate user ID if not exists
-        if "user_id" not in self.user_profile:
-            self.user_profile["user_id"] = "default"
+        # Conversation state lives in ConversationSession objects so one manager
+        # (and its engines) can serve every user; this session backs callers
+        # that don't pass their own
+        self.default_session = ConversationSession()
+    
+    def _session(self, session: Optional[ConversationSession]) -> ConversationSession:
+        return session if session is not None else self.default_session
         
-    def start_conversation(self, user_profile: Dict) -> Dict:
+    def start_conversation(self, user_profile: Dict, session: ConversationSession = None) -> Dict:
         """Start a new intelligent conversation based on user profile."""
-        self.user_profile.update(user_profile)
-        self.conversation_history = []
+        session = self._session(session)
+        session.user_profile.update(user_profile)
+        session.conversation_history = []
+        session.insight_checkpoint = 0
+        session.conversation_id = self._generate_conversation_id()
         
         # Initialize memory manager for this user
-        self._initialize_memory_manager()
+        self._initialize_memory_manager(session)
         
         # Use knowledge adapter for initial context
-        initial_path = self.knowledge_adapter.get_initial_context(self.user_profile)
-        self.current_context_path = initial_path
+        initial_path = self.knowledge_adapter.get_initial_context(session.user_profile)
+        session.current_context_path = initial_path
         
         # Get initial response using synthesis engine
         initial_response = self.response_engine.synthesize_response(
             user_query="Start conversation",
             context_path=initial_path,
-            user_profile=self.user_profile,
+            user_profile=session.user_profile,
             vector_results=[]
         )
         
         # Get available conversation paths using knowledge adapter
-        self.available_paths = self.knowledge_adapter.get_available_paths(initial_path)
+        session.available_paths = self.knowledge_adapter.get_available_paths(initial_path)
         
         # Add to conversation history
-        self.conversation_history.append({
+        session.conversation_history.append({
             "role": "assistant",
             "content": initial_response["response"],
             "context_path": initial_path,
@@ -85,144 +81,264 @@ class IntelligentConversationManager:
             "response": initial_response["response"],
             "context_path": initial_path,
             "next_suggestions": initial_response["next_suggestions"],
-            "available_paths": self.available_paths,
-            "conversation_id": self._generate_conversation_id()
+            "available_paths": session.available_paths,
+            "conversation_id": session.conversation_id
         }
     
-    def process_user_response(self, user_input: str, selected_path: str = None) -> Dict:
+    def process_user_response(self, user_input: str, selected_path: str = None, session: ConversationSession = None) -> Dict:
         """Process user input and generate intelligent response."""
+        session = self._session(session)
         
-        try:
-            # Extract and remember user-provided facts
-            self._extract_and_remember_facts(user_input)
+        with session.lock, start_trace("turn") as trace:
+            try:
+                early_result, next_context, mode, vector_results = self._begin_turn(session, user_input, selected_path)
+                if early_result:
+                    return {**early_result, "trace": trace.waterfall()}
             
-            # Add user input to history
-            self.conversation_history.append({
-                "role": "user",
-                "content": user_input,
-                "timestamp": self._get_timestamp()
-            })
+                # Generate response based on routing mode
+                with span("synthesis", mode=mode):
+                    response = self._synthesize_for_mode(session, mode, user_input, next_context, vector_results)
+                
+                result = self._finish_turn(session, user_input, next_context, mode, response)
+                return {**result, "trace": trace.waterfall()}
+            
+            except Exception as e:
+                print(f"❌ Error processing user response: {e}")
+                import traceback
+                traceback.print_exc()
+                return self._error_result(session)
+    
+    def process_user_response_stream(self, user_input: str, selected_path: str = None, session: ConversationSession = None) -> Iterator[Dict]:
+        """
+        Streaming variant of process_user_response.
         
-            # Store user message in conversation memory
-            self._store_conversation_memory({
-                "role": "user",
-                "content": user_input,
-                "timestamp": self._get_timestamp()
-            })
+        Yields {"type": "token", "content": str} frames while the answer is
+        generated, then one {"type": "final", ...} frame with the same fields
+        process_user_response returns (sources, next_suggestions, ...).
+        """
+        session = self._session(session)
+        
+        # The turn runs in its own context, entered only while a frame is being produced,
+        # so its trace never leaks into the caller between frames
+        context = contextvars.copy_context()
+        frames = self._stream_turn(session, user_input, selected_path)
+        try:
+            while True:
+                try:
+                    frame = context.run(next, frames)
+                except StopIteration:
+                    return
+                yield frame
+        finally:
+            context.run(frames.close)
+    
+    def _stream_turn(self, session: ConversationSession, user_input: str, selected_path: str = None) -> Iterator[Dict]:
+        """
+        Frames of one streamed turn. The session lock is held only while session
+        state changes (before and after synthesis), never across a yield, so a
+        stream abandoned mid-answer (e.g. a Streamlit rerun) can't block the next turn.
+        """
+        with start_trace("turn") as trace:
+            try:
+                with session.lock:
+                    early_result, next_context, mode, vector_results = self._begin_turn(session, user_input, selected_path)
+                if early_result:
+                    yield {"type": "token", "content": early_result["response"]}
+                    yield {"type": "final", **early_result, "trace": trace.waterfall()}
+                    return
             
-            # Extract insights periodically (every 10 messages)
-            if len(self.conversation_history) % 10 == 0:
-                self._extract_and_store_insights()
+                # Synthesis only reads session state
+                response = None
+                with span("synthesis", mode=mode, stream=True):
+                    for frame in self._synthesize_for_mode(session, mode, user_input, next_context, vector_results, stream=True):
+                        if frame["type"] == "token":
+                            yield frame
+                        else:
+                            response = {k: v for k, v in frame.items() if k != "type"}
             
-            # Check for safety terms first
-            safety_warning = ""
-            if self.retrieval_router:
-                safety_warning = self.retrieval_router.get_safety_warning(user_input)
-                if safety_warning:
-                    return {
-                        "response": safety_warning,
-                        "context_path": self.current_context_path,
-                        "next_suggestions": [],
-                        "available_paths": self.available_paths,
-                        "confidence": 1.0,
-                        "sources": [],
-                        "safety_warning": True
-                    }
-        
-            # Determine next context path
-            if selected_path:
-                next_context = selected_path
-            else:
-                next_context = self._determine_next_context(user_input)
+                with session.lock:
+                    result = self._finish_turn(session, user_input, next_context, mode, response)
+                yield {"type": "final", **result, "trace": trace.waterfall()}
         
-            # Update current context
-            self.current_context_path = next_context
+            except Exception as e:
+                print(f"❌ Error processing user response: {e}")
+                import traceback
+                traceback.print_exc()
+                yield {"type": "final", **self._error_result(session)}
+    
+    def _begin_turn(self, session: ConversationSession, user_input: str, selected_path: str = None) -> Tuple[Optional[Dict], str, str, List]:
+        """
+        Record the user message, run the safety check and route the turn.
         
-            # Use retrieval router to decide knowledge source
-            mode, vector_results = "vector_only", []
-            if self.retrieval_router:
-                try:
+        Returns (early_result, next_context, mode, vector_results); early_result is
+        set when the turn is answered without synthesis (safety warning).
+        """
+        # Extract and remember user-provided facts
+        self._extract_and_remember_facts(session, user_input)
+        
+        # Add user input to history
+        session.conversation_history.append({
+            "role": "user",
+            "content": user_input,
+            "timestamp": self._get_timestamp()
+        })
+        
+        # Store user message in conversation memory
+        self._store_conversation_memory(session, {
+            "role": "user",
+            "content": user_input,
+            "timestamp": self._get_timestamp()
+        })
+        
+        # Check for safety terms first
+        safety_warning = ""
+        if self.retrieval_router:
+            with span("safety_check"):
+                safety_warning = self.retrieval_router.get_safety_warning(user_input)
+            if safety_warning:
+                return {
+                    "response": safety_warning,
+                    "context_path": session.current_context_path,
+                    "next_suggestions": [],
+                    "available_paths": session.available_paths,
+                    "confidence": 1.0,
+                    "sources": [],
+                    "safety_warning": True
+                }, session.current_context_path, "safety", []
+        
+        # Determine next context path
+        if selected_path:
+            next_context = selected_path
+        else:
+            next_context = self._determine_next_context(session, user_input)
+        
+        # Update current context
+        session.current_context_path = next_context
+        
+        # Use retrieval router to decide knowledge source
+        mode, vector_results = "vector_only", []
+        if self.retrieval_router:
+            try:
+                with span("route"):
                     mode, vector_results = self.retrieval_router.route(
                         user_input, 
-                        self.user_profile, 
+                        session.user_profile, 
                         next_context
                     )
-                except Exception as e:
-                    print(f"⚠️ Retrieval router failed: {e}")
-                    mode, vector_results = "vector_only", []
-        
-            # Generate response based on routing mode
-            if mode == "mongo_only":
-                # Use only structured MongoDB data
-                response = self.response_engine.synthesize_response(
-                    user_query=user_input,
-                    context_path=next_context,
-                    user_profile=self.user_profile,
-                        conversation_history=self.conversation_history,
-                        vector_results=[]
-                )
-            elif mode == "blend":
-                # Combine MongoDB + vector search
-                response = self._synthesize_blended_response(
-                    user_input, next_context, vector_results
-                )
-            else:  # vector_only
-                # Use vector search with guided hints
-                response = self._synthesize_vector_response(
-                    user_input, next_context, vector_results
-                )
+            except Exception as e:
+                print(f"⚠️ Retrieval router failed: {e}")
+                mode, vector_results = "vector_only", []
         
-            # Update available paths
-            self.available_paths = self.knowledge_adapter.get_available_paths(next_context)
-                
-            # Update conversation memory
-            self._update_conversation_memory(user_input, response)
-            
-            # Add response to history
-            self.conversation_history.append({
-                "role": "assistant",
-                "content": response["response"],
-                "context_path": next_context,
-                "sources": response["sources"],
-                "next_suggestions": response["next_suggestions"],
-                "timestamp": self._get_timestamp()
-            })
+        return None, next_context, mode, vector_results
+    
+    def _synthesize_for_mode(self, session: ConversationSession, mode: str, user_input: str, next_context: str, vector_results: List, stream: bool = False):
+        """Dispatch synthesis for a routing mode; returns a result dict, or a frame iterator when stream=True."""
+        if mode == "mongo_only":
+            # Use only structured MongoDB data
+            synthesize = self.response_engine.synthesize_response_stream if stream else self.response_engine.synthesize_response
+            return synthesize(
+                user_query=user_input,
+                context_path=next_context,
+                user_profile=session.user_profile,
+                conversation_history=session.conversation_history,
+                vector_results=[]
+            )
+        elif mode == "blend":
+            # Combine MongoDB + vector search
+            return self._synthesize_blended_response(
+                session, user_input, next_context, vector_results, stream=stream
+            )
+        else:  # vector_only
+            # Use vector search with guided hints
+            return self._synthesize_vector_response(
+                session, user_input, next_context, vector_results, stream=stream
+            )
+    
+    def _finish_turn(self, session: ConversationSession, user_input: str, next_context: str, mode: str, response: Dict) -> Dict:
+        """Update paths, memory and history with the assistant response and build the turn result."""
+        # Update available paths
+        session.available_paths = self.knowledge_adapter.get_available_paths(next_context)
             
-            # Store assistant response in conversation memory
-            self._store_conversation_memory({
-                "role": "assistant",
-                "content": response["response"],
-                "context_path": next_context,
-                "sources": response["sources"],
-                "next_suggestions": response["next_suggestions"],
-                "timestamp": self._get_timestamp()
-            })
+        # Update conversation memory
+        self._update_conversation_memory(session, user_input, response)
         
-            return {
-                "response": response["response"],
-                "context_path": next_context,
-                "next_suggestions": response["next_suggestions"],
-                "available_paths": self.available_paths,
-                "confidence": response.get("confidence", 0.8),
-                "sources": response["sources"],
-                "mode": mode
-            }
+        # Add response to history
+        session.conversation_history.append({
+            "role": "assistant",
+            "content": response["response"],
+            "context_path": next_context,
+            "sources": response["sources"],
+            "next_suggestions": response["next_suggestions"],
+            "timestamp": self._get_timestamp()
+        })
         
-        except Exception as e:
-            print(f"❌ Error processing user response: {e}")
-            import traceback
-            traceback.print_exc()
-            return {
-                "response": "I apologize, but I encountered an error processing your request. Please try again.",
-                "context_path": self.current_context_path,
-                "next_suggestions": [],
-                "available_paths": [],
-                "confidence": 0.0,
-                "sources": [],
-                "mode": "error"
-            }
+        # Store assistant response in conversation memory
+        self._store_conversation_memory(session, {
+            "role": "assistant",
+            "content": response["response"],
+            "context_path": next_context,
+            "sources": response["sources"],
+            "next_suggestions": response["next_suggestions"],
+            "timestamp": self._get_timestamp()
+        })
+        
+        # Fold this turn into the running insights (background worker)
+        self._extract_and_store_insights(session)
+        
+        # Warm the likely next nodes while the user reads and types (opt-in)
+        self._schedule_prefetch(session, next_context, response)
+        
+        # Append the turn to the benchmark fixture; the benchmarks package is only loaded when recording
+        if os.getenv("BENCHMARK_RECORD_PATH"):
+            from benchmarks.turn_recorder import record_turn
+            record_turn(session, user_input, next_context, response)
+        
+        return {
+            "response": response["response"],
+            "context_path": next_context,
+            "next_suggestions": response["next_suggestions"],
+            "available_paths": session.available_paths,
+            "confidence": response.get("confidence", 0.8),
+            "sources": response["sources"],
+            "mode": mode
+        }
+    
+    def _schedule_prefetch(self, session: ConversationSession, next_context: str, response: Dict):
+        """Queue background warming for the top available paths and suggested follow-ups, if prefetch is enabled."""
+        prefetcher = get_context_prefetcher()
+        if not prefetcher:
+            return
+        
+        paths = session.available_paths[:PREFETCH_TOP_N]
+        suggestions = (response.get("next_suggestions") or [])[:PREFETCH_TOP_N] if self.retrieval_router else []
+        profile = dict(session.user_profile)
+        
+        # Interleave by rank so the most likely path and suggestion are warmed first
+        jobs = {}
+        for rank in range(PREFETCH_TOP_N):
+            if rank < len(paths):
+                path = paths[rank]
+                jobs[("mongo", path)] = lambda path=path: self.response_engine.prefetch_context(path)
+            if rank < len(suggestions):
+                suggestion = suggestions[rank]
+                jobs[("kb", suggestion, profile.get("user_id"))] = (
+                    lambda suggestion=suggestion: self.retrieval_router.prefetch_vector_results(suggestion, profile, next_context)
+                )
+        # Per session, so one user's turn doesn't cancel another's waiting jobs
+        prefetcher.schedule(jobs, owner=id(session))
     
-    def _synthesize_blended_response(self, user_input: str, context_path: str, vector_results: List) -> Dict:
+    def _error_result(self, session: ConversationSession) -> Dict:
+        return {
+            "response": "I apologize, but I encountered an error processing your request. Please try again.",
+            "context_path": session.current_context_path,
+            "next_suggestions": [],
+            "available_paths": [],
+            "confidence": 0.0,
+            "sources": [],
+            "mode": "error"
+        }
+    
+    def _synthesize_blended_response(self, session: ConversationSession, user_input: str, context_path: str, vector_results: List, stream: bool = False):
         """Synthesize response combining MongoDB structure with vector search."""
         # Get MongoDB content
         mongo_content = self.response_engine.get_mongodb_content(context_path)
@@ -240,23 +356,24 @@ class IntelligentConversationManager:
         
         # Add patient information to user profile for better personalization
         try:
-            from utils.patient_utils import parse_patient_documents
-            patient_info = parse_patient_documents(self.user_profile.get("user_id", "default"))
+            from utils.patient_context_cache import get_patient_context
+            patient_info = get_patient_context(session.user_profile.get("user_id", "default"))
             if patient_info:
-                self.user_profile.update(patient_info)
+                session.user_profile.update(patient_info)
         except Exception as e:
             print(f"⚠️ Could not update user profile with patient info: {e}")
         
         # Generate enhanced response using the existing API with vector results
-        return self.response_engine.synthesize_response(
+        synthesize = self.response_engine.synthesize_response_stream if stream else self.response_engine.synthesize_response
+        return synthesize(
             user_query=user_input,
             context_path=context_path,
-            user_profile=self.user_profile,
-            conversation_history=self.conversation_history,
+            user_profile=session.user_profile,
+            conversation_history=session.conversation_history,
             vector_results=vector_results
         )
     
-    def _synthesize_vector_response(self, user_input: str, context_path: str, vector_results: List) -> Dict:
+    def _synthesize_vector_response(self, session: ConversationSession, user_input: str, context_path: str, vector_results: List, stream: bool = False):
         """Synthesize response using vector search with guided hints."""
         # Get guided hint from current context
         guided_hint = {"label": "Continue", "next_steps": []}
@@ -268,11 +385,12 @@ class IntelligentConversationManager:
                 guided_hint = {"label": "Continue", "next_steps": []}
         
         # Generate response using the existing API with vector results
-        return self.response_engine.synthesize_response(
+        synthesize = self.response_engine.synthesize_response_stream if stream else self.response_engine.synthesize_response
+        return synthesize(
             user_query=user_input,
             context_path=context_path,
-            user_profile=self.user_profile,
-            conversation_history=self.conversation_history,
+            user_profile=session.user_profile,
+            conversation_history=session.conversation_history,
             vector_results=vector_results
         )
 
@@ -302,46 +420,47 @@ class IntelligentConversationManager:
         
         return "\n".join(formatted)
     
-    def _determine_next_context(self, user_input: str) -> str:
+    def _determine_next_context(self, session: ConversationSession, user_input: str) -> str:
         """Intelligently determine the next context based on user input."""
+        text = analyze(user_input).lower
         
         # Try to find direct path matches
-        for path in self.available_paths:
-            if path.lower() in user_input.lower():
-                return path
+        path_matches = match_keywords(text, session.available_paths)
+        if path_matches:
+            return path_matches[0]
         
         # Use knowledge adapter to find best match
-        best_match = self.knowledge_adapter.get_node(self.current_context_path)
+        best_match = self.knowledge_adapter.get_node(session.current_context_path)
         if best_match and best_match.get("routes"):
             # Check routes for relevance
             for route in best_match["routes"]:
                 if isinstance(route, dict) and route.get("keywords"):
-                    for keyword in route["keywords"]:
-                        if keyword.lower() in user_input.lower():
-                            return route.get("next_path", self.current_context_path)
+                    if match_keywords(text, route["keywords"]):
+                        return route.get("next_path", session.current_context_path)
         
         # Fallback to current context
-        return self.current_context_path
+        return session.current_context_path
     
     def _get_available_paths(self, context_path: str) -> List[str]:
         """Get available conversation paths using knowledge adapter."""
         return self.knowledge_adapter.get_available_paths(context_path)
     
-    def get_conversation_summary(self) -> Dict:
+    def get_conversation_summary(self, session: ConversationSession = None) -> Dict:
         """Generate a comprehensive conversation summary."""
-        if not self.conversation_history:
+        session = self._session(session)
+        if not session.conversation_history:
             return {"summary": "No conversation history available."}
         
         # Extract key information
-        user_responses = [msg["content"] for msg in self.conversation_history if msg["role"] == "user"]
-        ai_responses = [msg["content"] for msg in self.conversation_history if msg["role"] == "assistant"]
-        context_paths = [msg.get("context_path", "") for msg in self.conversation_history if msg.get("context_path")]
+        user_responses = [msg["content"] for msg in session.conversation_history if msg["role"] == "user"]
+        ai_responses = [msg["content"] for msg in session.conversation_history if msg["role"] == "assistant"]
+        context_paths = [msg.get("context_path", "") for msg in session.conversation_history if msg.get("context_path")]
         
         # Generate summary using response engine
         summary_prompt = f"""
         Conversation Summary Request:
         
-        User Profile: {self.user_profile}
+        User Profile: {session.user_profile}
         Topics Discussed: {list(set(context_paths))}
         User Questions: {user_responses}
         AI Responses: {ai_responses}
@@ -355,28 +474,30 @@ class IntelligentConversationManager:
         
         summary_response = self.response_engine.synthesize_response(
             user_query=summary_prompt,
-            context_path=self.current_context_path or "conversation_summary",
-            user_profile=self.user_profile,
-            conversation_history=self.conversation_history,
-            vector_results=[]
+            context_path=session.current_context_path or "conversation_summary",
+            user_profile=session.user_profile,
+            conversation_history=session.conversation_history,
+            vector_results=[],
+            use_cache=False
         )
         
         return {
             "summary": summary_response["response"],
             "topics_discussed": list(set(context_paths)),
-            "conversation_length": len(self.conversation_history),
-            "user_profile": self.user_profile,
-            "final_context": self.current_context_path,
+            "conversation_length": len(session.conversation_history),
+            "user_profile": session.user_profile,
+            "final_context": session.current_context_path,
             "next_recommendations": summary_response["next_suggestions"]
         }
     
-    def suggest_next_topics(self) -> List[Dict]:
+    def suggest_next_topics(self, session: ConversationSession = None) -> List[Dict]:
         """Suggest relevant next topics based on conversation history."""
-        if not self.current_context_path:
+        session = self._session(session)
+        if not session.current_context_path:
             return []
         
         # Get current context content using knowledge adapter
-        content = self.knowledge_adapter.get_node(self.current_context_path)
+        content = self.knowledge_adapter.get_node(session.current_context_path)
         if not content:
             return []
         
@@ -405,14 +526,14 @@ class IntelligentConversationManager:
                     })
         
         # Add profile-based suggestions
-        if self.user_profile.get("diagnosis_status") == "diagnosed_no":
+        if session.user_profile.get("diagnosis_status") == "diagnosed_no":
             suggestions.append({
                 "topic": "Get Screening Recommendations",
                 "path": "diagnosed_no.screening_tools",
                 "description": "Learn about autism screening tools and assessments",
                 "type": "profile_based"
             })
-        elif self.user_profile.get("diagnosis_status") == "diagnosed_yes":
+        elif session.user_profile.get("diagnosis_status") == "diagnosed_yes":
             suggestions.append({
                 "topic": "Find Support Resources",
                 "path": "diagnosed_yes.support_resources",
@@ -427,128 +548,91 @@ class IntelligentConversationManager:
         import uuid
         return str(uuid.uuid4())[:8]
 
-    def _update_conversation_memory(self, user_input: str, response: Dict):
+    def _update_conversation_memory(self, session: ConversationSession, user_input: str, response: Dict):
         """Update conversation memory with new information."""
+        annotation = analyze(user_input)
+        
         # Extract patient information
-        if "child" in user_input.lower() or "son" in user_input.lower() or "daughter" in user_input.lower():
+        if annotation.has("child_mention"):
             # Extract age, name, diagnosis info
-            import re
-            age_match = re.search(r'(\d+)\s*(?:year|yr)s?\s*old', user_input.lower())
-            if age_match:
-                self.conversation_memory["patient_info"]["age"] = age_match.group(1)
+            age = annotation.first_group("stated_age")
+            if age:
+                session.conversation_memory["patient_info"]["age"] = age
             
-            name_match = re.search(r'(?:my\s+(?:son|daughter|child)\s+)(\w+)', user_input.lower())
-            if name_match:
-                self.conversation_memory["patient_info"]["name"] = name_match.group(1).capitalize()
+            name = annotation.first_group("my_child_name")
+            if name:
+                session.conversation_memory["patient_info"]["name"] = name.capitalize()
         
         # Track discussed topics
         if response.get("context_path"):
-            self.conversation_memory["discussed_topics"].add(response["context_path"])
+            session.conversation_memory["discussed_topics"].add(response["context_path"])
         
         # Track user concerns
-        concern_keywords = ["worried", "concerned", "struggling", "difficulty", "problem"]
-        if any(keyword in user_input.lower() for keyword in concern_keywords):
-            self.conversation_memory["user_concerns"].append(user_input)
+        if annotation.has("user_concern"):
+            session.conversation_memory["user_concerns"].append(user_input)
         
         # Track recommendations
         if response.get("next_suggestions"):
-            self.conversation_memory["recommendations_given"].extend(response["next_suggestions"])
+            session.conversation_memory["recommendations_given"].extend(response["next_suggestions"])
     
-    def _get_conversation_context(self) -> str:
+    def _get_conversation_context(self, session: ConversationSession) -> str:
         """Get conversation context for LLM synthesis."""
         context_parts = []
         
-        if self.conversation_memory["patient_info"]:
-            patient_info = ", ".join([f"{k}: {v}" for k, v in self.conversation_memory["patient_info"].items()])
+        if session.conversation_memory["patient_info"]:
+            patient_info = ", ".join([f"{k}: {v}" for k, v in session.conversation_memory["patient_info"].items()])
             context_parts.append(f"Patient Information: {patient_info}")
         
-        if self.conversation_memory["discussed_topics"]:
-            topics = ", ".join(list(self.conversation_memory["discussed_topics"])[:5])
+        if session.conversation_memory["discussed_topics"]:
+            topics = ", ".join(list(session.conversation_memory["discussed_topics"])[:5])
             context_parts.append(f"Previously Discussed: {topics}")
         
-        if self.conversation_memory["user_concerns"]:
-            concerns = "; ".join(self.conversation_memory["user_concerns"][-3:])
+        if session.conversation_memory["user_concerns"]:
+            concerns = "; ".join(session.conversation_memory["user_concerns"][-3:])
             context_parts.append(f"User Concerns: {concerns}")
         
         return "\n".join(context_parts) if context_parts else "No previous context available."
     
-    def _extract_and_remember_facts(self, user_input: str):
+    def _extract_and_remember_facts(self, session: ConversationSession, user_input: str):
         """Extract and remember user-provided facts like age, diagnosis, etc."""
-        input_lower = user_input.lower()
+        annotation = analyze(user_input)
         
         # Extract age information
-        import re
-        age_patterns = [
-            r'(?:he\'s|she\'s|child is|kid is|my child is)\s*(\d+)\s*(?:years?\s*old)?',
-            r'(\d+)\s*(?:year|yr)s?\s*old',
-            r'age\s*(?:is\s*)?(\d+)',
-            r'(\d+)\s*(?:years?\s*)?(?:old|of\s*age)'
-        ]
-        
-        for pattern in age_patterns:
-            match = re.search(pattern, input_lower)
-            if match:
-                age = int(match.group(1))
-                # Map age to age band
-                if age <= 3:
-                    age_band = "0-3"
-                elif age <= 5:
-                    age_band = "3-5"
-                elif age <= 12:
-                    age_band = "6-12"
-                elif age <= 17:
-                    age_band = "13-17"
-                else:
-                    age_band = "18+"
-                
-                if self.user_profile.get("child_age") != age_band:
-                    self.user_profile["child_age"] = age_band
-                    self.user_profile["specific_age"] = age
-                    print(f"✅ Remembered: Child age {age} (band: {age_band})")
-                break
+        age = annotation.first_group("age")
+        if age:
+            age = int(age)
+            band = age_band(age)
+            if session.user_profile.get("child_age") != band:
+                session.user_profile["child_age"] = band
+                session.user_profile["specific_age"] = age
+                print(f"✅ Remembered: Child age {age} (band: {band})")
         
         # Extract diagnosis status
-        if any(phrase in input_lower for phrase in ["diagnosed with autism", "has autism", "autism diagnosis", "confirmed autism"]):
-            if self.user_profile.get("diagnosis_status") != "diagnosed_yes":
-                self.user_profile["diagnosis_status"] = "diagnosed_yes"
+        if annotation.has("diagnosis_yes"):
+            if session.user_profile.get("diagnosis_status") != "diagnosed_yes":
+                session.user_profile["diagnosis_status"] = "diagnosed_yes"
                 print("✅ Remembered: Child has autism diagnosis")
         
-        elif any(phrase in input_lower for phrase in ["not diagnosed", "no diagnosis", "haven't been diagnosed", "waiting for diagnosis"]):
-            if self.user_profile.get("diagnosis_status") != "diagnosed_no":
-                self.user_profile["diagnosis_status"] = "diagnosed_no"
+        elif annotation.has("diagnosis_no"):
+            if session.user_profile.get("diagnosis_status") != "diagnosed_no":
+                session.user_profile["diagnosis_status"] = "diagnosed_no"
                 print("✅ Remembered: Child not yet diagnosed")
         
         # Extract child name
-        name_patterns = [
-            r'(?:my\s+(?:son|daughter|child)\s+)(\w+)',
-            r'(?:his|her)\s+name\s+is\s+(\w+)',
-            r'(\w+)\s+(?:is\s+my\s+(?:son|daughter|child))',
-            r'(?:called|named)\s+(\w+)'
-        ]
-        
-        for pattern in name_patterns:
-            match = re.search(pattern, input_lower)
-            if match:
-                name = match.group(1).capitalize()
-                if self.user_profile.get("child_name") != name:
-                    self.user_profile["child_name"] = name
-                    print(f"✅ Remembered: Child's name is {name}")
-                break
+        name = annotation.first_group("child_name")
+        if name:
+            name = name.capitalize()
+            if session.user_profile.get("child_name") != name:
+                session.user_profile["child_name"] = name
+                print(f"✅ Remembered: Child's name is {name}")
         
         # Extract concerns
-        concern_keywords = {
-            "speech": ["speech", "talking", "speaking", "language", "words", "communication"],
-            "social": ["social", "friends", "playing", "interaction", "eye contact"],
-            "behavior": ["behavior", "meltdown", "tantrums", "repetitive", "stimming"],
-            "development": ["development", "milestones", "delayed", "behind"]
-        }
-        
-        for concern_type, keywords in concern_keywords.items():
-            if any(keyword in input_lower for keyword in keywords):
-                concerns = self.user_profile.get("concerns", [])
+        for concern_type in CONCERN_CATEGORIES:
+            if annotation.has(f"concern:{concern_type}"):
+                concerns = session.user_profile.get("concerns", [])
                 if concern_type not in concerns:
                     concerns.append(concern_type)
-                    self.user_profile["concerns"] = concerns
+                    session.user_profile["concerns"] = concerns
                     print(f"✅ Remembered: Concern about {concern_type}")
     
     def _get_timestamp(self) -> str:
@@ -561,40 +645,43 @@ class IntelligentConversationManager:
         self.response_engine.close()
         self.context_engine.close()
 
-    def _initialize_memory_manager(self):
+    def _initialize_memory_manager(self, session: ConversationSession):
         """Initialize the memory manager for the current user."""
         try:
-            user_id = self.user_profile.get("user_id", "default")
-            self.memory_manager = ConversationMemoryManager(user_id)
+            user_id = session.user_profile.get("user_id", "default")
+            session.memory_manager = ConversationMemoryManager(user_id)
             print(f"✅ Memory manager initialized for user: {user_id}")
         except Exception as e:
             print(f"⚠️ Could not initialize memory manager: {e}")
-            self.memory_manager = None
+            session.memory_manager = None
     
-    def _store_conversation_memory(self, message: Dict):
+    def _store_conversation_memory(self, session: ConversationSession, message: Dict):
         """Store a message in conversation memory if memory manager is available."""
-        if self.memory_manager:
+        if session.memory_manager:
             try:
-                self.memory_manager.store_chat_message(message)
+                with span("memory_write"):
+                    session.memory_manager.store_chat_message(message)
             except Exception as e:
                 print(f"⚠️ Error storing conversation memory: {e}")
     
-    def _extract_and_store_insights(self):
-        """Extract insights from current conversation and store them."""
-        if self.memory_manager and len(self.conversation_history) > 10:
+    def _extract_and_store_insights(self, session: ConversationSession):
+        """Hand messages added since the last call to the incremental insight extractor."""
+        if not session.memory_manager:
+            return
+        new_messages = session.conversation_history[session.insight_checkpoint:]
+        if new_messages:
             try:
-                insights = self.memory_manager.extract_and_store_insights(self.conversation_history)
-                print(f"✅ Extracted and stored conversation insights")
-                return insights
+                from .insight_extractor import submit_insight_messages
+                submit_insight_messages(session.user_id, new_messages)
+                session.insight_checkpoint = len(session.conversation_history)
             except Exception as e:
                 print(f"⚠️ Error extracting insights: {e}")
-        return {}
     
-    def _get_memory_context(self, query: str) -> Dict:
+    def _get_memory_context(self, session: ConversationSession, query: str) -> Dict:
         """Get relevant context from conversation memory."""
-        if self.memory_manager:
+        if session.memory_manager:
             try:
-                return self.memory_manager.retrieve_relevant_context(query)
+                return session.memory_manager.retrieve_relevant_context(query)
             except Exception as e:
                 print(f"⚠️ Error retrieving memory context: {e}")
         return {}
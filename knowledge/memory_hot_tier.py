@@ -0,0 +1,172 @@
+"""
+Hot Memory Tier for Autism Support App
+Bounded in-process LRU of each active user's recent messages and merged memory documents, in front of Qdrant.
+"""
+
+import json
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Callable, Dict, List, Optional
+
+RECENT_MESSAGES = 50
+IDLE_SECONDS = int(os.getenv("HOT_MEMORY_IDLE_SECONDS", "1800"))
+MAX_BYTES = int(float(os.getenv("HOT_MEMORY_MAX_MB", "32")) * 1024 * 1024)
+
+_MISSING = object()
+
+
+def _size_of(value) -> int:
+    try:
+        return len(json.dumps(value, default=str))
+    except Exception:
+        return len(str(value))
+
+
+class _UserMemory:
+    __slots__ = ("messages", "docs", "doc_sizes", "last_access", "size")
+
+    def __init__(self):
+        self.messages = deque()
+        self.docs: Dict[str, Optional[object]] = {}
+        self.doc_sizes: Dict[str, int] = {}
+        self.last_access = time.time()
+        self.size = 0
+
+
+class HotMemoryTier:
+    """
+    user_id → recent messages plus latest insights/prefs/learning documents.
+
+    Writes go here first and are written through to Qdrant by the caller. Users
+    idle longer than idle_seconds are evicted, then least recently used users
+    until the estimated size is under max_bytes.
+    """
+
+    def __init__(self, max_bytes: int = MAX_BYTES, idle_seconds: int = IDLE_SECONDS, recent_messages: int = RECENT_MESSAGES):
+        self.max_bytes = max_bytes
+        self.idle_seconds = idle_seconds
+        self.recent_messages = recent_messages
+        self._users: "OrderedDict[str, _UserMemory]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def record_message(self, user_id: str, message: Dict):
+        """Append a chat message to the user's recent messages."""
+        size = _size_of(message)
+        with self._lock:
+            entry = self._touch(user_id)
+            entry.messages.append((message, size))
+            self._grow(entry, size)
+            while len(entry.messages) > self.recent_messages:
+                _, dropped = entry.messages.popleft()
+                self._grow(entry, -dropped)
+            self._enforce_limits()
+
+    def recent(self, user_id: str, limit: int) -> Optional[List[Dict]]:
+        """Last limit messages oldest-first, or None if the user is not hot."""
+        with self._lock:
+            entry = self._users.get(user_id)
+            if entry is None or not entry.messages:
+                self.stats["misses"] += 1
+                return None
+            self._touch(user_id)
+            self.stats["hits"] += 1
+            return [m for m, _ in list(entry.messages)[-limit:]]
+
+    def put_doc(self, user_id: str, memory_type: str, data):
+        """Replace the user's merged document of memory_type."""
+        size = _size_of(data)
+        with self._lock:
+            entry = self._touch(user_id)
+            self._grow(entry, size - entry.doc_sizes.get(memory_type, 0))
+            entry.docs[memory_type] = data
+            entry.doc_sizes[memory_type] = size
+            self._enforce_limits()
+
+    def get_doc(self, user_id: str, memory_type: str, loader: Callable[[], Optional[object]]):
+        """
+        The user's document of memory_type; on a miss loader() is called (outside
+        the lock) and its result, including None, is kept.
+        """
+        with self._lock:
+            entry = self._users.get(user_id)
+            data = entry.docs.get(memory_type, _MISSING) if entry else _MISSING
+            if data is not _MISSING:
+                self._touch(user_id)
+                self.stats["hits"] += 1
+                return data
+            self.stats["misses"] += 1
+
+        data = loader()
+        with self._lock:
+            entry = self._touch(user_id)
+            # A write that raced the load wins
+            if memory_type not in entry.docs:
+                size = _size_of(data)
+                entry.docs[memory_type] = data
+                entry.doc_sizes[memory_type] = size
+                self._grow(entry, size)
+                self._enforce_limits()
+            return entry.docs.get(memory_type, data)
+
+    def invalidate(self, user_id: str = None):
+        """Forget one user, or everyone."""
+        with self._lock:
+            if user_id is None:
+                self._users.clear()
+                self._bytes = 0
+            else:
+                entry = self._users.pop(user_id, None)
+                if entry:
+                    self._bytes -= entry.size
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self.stats)
+            stats["users"] = len(self._users)
+            stats["bytes"] = self._bytes
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
+
+    def _touch(self, user_id: str) -> _UserMemory:
+        """Get or create the entry and mark it most recently used. Caller holds the lock."""
+        entry = self._users.get(user_id)
+        if entry is None:
+            entry = _UserMemory()
+            self._users[user_id] = entry
+        else:
+            self._users.move_to_end(user_id)
+        entry.last_access = time.time()
+        return entry
+
+    def _grow(self, entry: _UserMemory, delta: int):
+        entry.size += delta
+        self._bytes += delta
+
+    def _enforce_limits(self):
+        """Evict idle users, then LRU users over the byte cap (never the one just touched). Caller holds the lock."""
+        cutoff = time.time() - self.idle_seconds
+        while len(self._users) > 1:
+            user_id, entry = next(iter(self._users.items()))
+            if entry.last_access >= cutoff and self._bytes <= self.max_bytes:
+                break
+            self._users.popitem(last=False)
+            self._bytes -= entry.size
+            self.stats["evictions"] += 1
+
+
+_tier = None
+_tier_lock = threading.Lock()
+
+
+def get_hot_memory_tier() -> HotMemoryTier:
+    """Process-wide hot tier."""
+    global _tier
+    with _tier_lock:
+        if _tier is None:
+            _tier = HotMemoryTier()
+        return _tier
@@ -8,6 +8,12 @@ import json
 import os
 import sys
 
+# Works both as `python -m knowledge.X` and when run as a script from knowledge/
+try:
+    from knowledge.semantic_response_cache import bump_kb_version
+except ImportError:
+    from semantic_response_cache import bump_kb_version
+
 # Configuration
 MONGO_URI = "mongodb://localhost:27017/"
 DB_NAME = "autism_ai"
@@ -69,6 +75,9 @@ def update_mongodb(data):
         print(f"📊 Final document count: {final_count}")
         
         client.close()
+        
+        # Cached answers were synthesized from the old knowledge base
+        bump_kb_version("mongo insert")
         return True
         
     except Exception as e:
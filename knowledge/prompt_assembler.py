@@ -0,0 +1,161 @@
+"""
+Prompt Assembler for Autism Support App
+Fills a fixed token budget with prompt sections by priority and relevance, counting with a real tokenizer.
+"""
+
+from typing import Dict, List, Optional, Tuple
+
+DEFAULT_MODEL = "gpt-4o-mini"
+
+_encodings = {}
+
+
+def _get_encoding(model: str):
+    """tiktoken encoding for model, or None when tiktoken is not installed."""
+    if model not in _encodings:
+        try:
+            import tiktoken
+            try:
+                _encodings[model] = tiktoken.encoding_for_model(model)
+            except KeyError:
+                _encodings[model] = tiktoken.get_encoding("o200k_base")
+        except Exception as e:
+            print(f"⚠️ tiktoken unavailable, estimating tokens from characters: {e}")
+            _encodings[model] = None
+    return _encodings[model]
+
+
+def count_tokens(text: str, model: str = DEFAULT_MODEL) -> int:
+    """Number of tokens in text (≈ chars/4 without tiktoken)."""
+    if not text:
+        return 0
+    encoding = _get_encoding(model)
+    if encoding is None:
+        return (len(text) + 3) // 4
+    return len(encoding.encode(text))
+
+
+def truncate_to_tokens(text: str, max_tokens: int, model: str = DEFAULT_MODEL) -> str:
+    """Cut text to at most max_tokens tokens, marking the cut with '...'."""
+    if max_tokens <= 0:
+        return ""
+    encoding = _get_encoding(model)
+    if encoding is None:
+        max_chars = max_tokens * 4
+        return text if len(text) <= max_chars else text[:max(max_chars - 3, 0)] + "..."
+    tokens = encoding.encode(text)
+    if len(tokens) <= max_tokens:
+        return text
+    return encoding.decode(tokens[:max(max_tokens - 1, 0)]) + "..."
+
+
+class PromptAssembler:
+    """
+    Collects prompt sections and renders as many as fit in budget_tokens.
+
+    Sections are admitted in priority order (lower number first) and, within a
+    section, items are admitted by descending relevance score. Required sections
+    go first and are truncated rather than dropped; only they can take the text
+    past the budget, and only by MIN_ITEM_TOKENS per item once it is spent. The
+    rendered prompt keeps the order sections were added in, so layout stays
+    stable even when lower-priority sections are dropped.
+    """
+
+    # Items left with fewer tokens than this are dropped rather than truncated
+    MIN_ITEM_TOKENS = 24
+
+    def __init__(self, budget_tokens: int, model: str = DEFAULT_MODEL):
+        self.budget_tokens = budget_tokens
+        self.model = model
+        self._sections: List[Dict] = []
+
+    def add_section(
+        self,
+        name: str,
+        items: List,
+        header: str = "",
+        priority: int = 5,
+        max_item_tokens: Optional[int] = None,
+        bullet: str = "",
+        required: bool = False
+    ):
+        """
+        Add a section. items are strings or (text, score) tuples; header is
+        rendered once above the admitted items and only if any item fits.
+        """
+        scored = []
+        for index, item in enumerate(items or []):
+            text, score = (item if isinstance(item, tuple) else (item, 0.0))
+            if text and str(text).strip():
+                scored.append({"text": str(text).strip(), "score": float(score or 0.0), "index": index})
+        if scored:
+            self._sections.append({
+                "name": name,
+                "header": header,
+                "priority": priority,
+                "max_item_tokens": max_item_tokens,
+                "bullet": bullet,
+                "required": required,
+                "items": scored
+            })
+
+    def assemble(self) -> Tuple[str, Dict]:
+        """Render the admitted sections; returns (text, usage) with per-section token counts."""
+        remaining = self.budget_tokens
+        admitted: Dict[str, List[Dict]] = {}
+        usage: Dict[str, Dict] = {}
+
+        for section in sorted(self._sections, key=lambda s: (not s["required"], s["priority"])):
+            name = section["name"]
+            required = section["required"]
+            header_tokens = count_tokens(section["header"] + "\n", self.model) if section["header"] else 0
+            usage[name] = {"tokens": 0, "items": 0, "dropped": 0}
+            if not required and remaining - header_tokens < self.MIN_ITEM_TOKENS:
+                usage[name]["dropped"] = len(section["items"])
+                continue
+
+            kept = []
+            spent = header_tokens
+            for item in sorted(section["items"], key=lambda i: (-i["score"], i["index"])):
+                text = section["bullet"] + item["text"]
+                if section["max_item_tokens"]:
+                    text = truncate_to_tokens(text, section["max_item_tokens"], self.model)
+                tokens = count_tokens(text + "\n", self.model)
+                available = remaining - spent
+                if required:
+                    available = max(available, self.MIN_ITEM_TOKENS)
+                if tokens > available:
+                    if available < self.MIN_ITEM_TOKENS:
+                        usage[name]["dropped"] += 1
+                        continue
+                    full_text = text
+                    text = truncate_to_tokens(full_text, available - 1, self.model)
+                    tokens = count_tokens(text + "\n", self.model)
+                    if tokens > available:
+                        # Tokens can merge differently around the cut; trim by the overshoot once more
+                        text = truncate_to_tokens(full_text, available - 1 - (tokens - available), self.model)
+                        tokens = count_tokens(text + "\n", self.model)
+                    if tokens > available and not required:
+                        usage[name]["dropped"] += 1
+                        continue
+                kept.append({**item, "text": text})
+                spent += tokens
+
+            if kept:
+                admitted[name] = sorted(kept, key=lambda i: i["index"])
+                remaining -= spent
+                usage[name].update(tokens=spent, items=len(kept))
+
+        parts = []
+        for section in self._sections:
+            kept = admitted.get(section["name"])
+            if not kept:
+                continue
+            lines = ([section["header"]] if section["header"] else []) + [i["text"] for i in kept]
+            parts.append("\n".join(lines))
+
+        text = "\n\n".join(parts)
+        used = self.budget_tokens - remaining
+        summary = ", ".join(f"{n}={u['tokens']}" + (f" (-{u['dropped']})" if u["dropped"] else "") for n, u in usage.items())
+        print(f"🧮 Prompt context: {used}/{self.budget_tokens} tokens ({summary})")
+        return text, {"budget": self.budget_tokens, "used": used, "sections": usage}
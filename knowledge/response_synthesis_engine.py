@@ -4,19 +4,30 @@ Combines MongoDB knowledge base content with real-time web browsing for comprehe
 """
 
 import json
+import os
+import time
 import openai
-import streamlit as st
-import requests
-from bs4 import BeautifulSoup
-from typing import Dict, List, Optional, Tuple, Any
-from pymongo import MongoClient
+from typing import Dict, Iterator, List, Optional, Tuple, Any
 from urllib.parse import urlparse
 import re
+from .web_content_cache import WebContentCache
+from .search_result_cache import SearchResultCache
+from .context_gatherer import ContextGatherer
+from .semantic_response_cache import SemanticResponseCache
+from .prompt_assembler import PromptAssembler
+from .context_prefetcher import get_context_prefetcher, take_prefetched
+from utils.single_flight import single_flight, get_single_flight_stats
+from utils.llm_usage import record_usage, get_usage_stats
+from utils.tracing import record_latency, span
+from utils.lazy_services import create_mongo_client, get_openai_api_key, get_openai_base_url
+
+# Token budget for the retrieved context in each synthesis prompt
+SYNTHESIS_CONTEXT_TOKENS = int(os.getenv("SYNTHESIS_CONTEXT_TOKENS", "2000"))
 
 class ResponseSynthesisEngine:
     def __init__(self, mongo_uri: str = "mongodb://localhost:27017/"):
         """Initialize the response synthesis engine."""
-        self.client = MongoClient(mongo_uri)
+        self.client = create_mongo_client(mongo_uri)
         self.db = self.client["autism_ai"]
         self.collection = self.db["knowledge"]
         
@@ -26,7 +37,12 @@ class ResponseSynthesisEngine:
         
         # Cache for performance
         self.response_cache = {}
-        self.web_content_cache = {}
+        self.web_content_cache = WebContentCache()
+        self.search_result_cache = SearchResultCache()
+        self.semantic_cache = SemanticResponseCache()
+        
+        # Web, memory and patient context are fetched concurrently under one per-turn deadline
+        self.context_gatherer = ContextGatherer()
         
         # Define web browsing tool
         self.web_fetch_tool = {
@@ -45,11 +61,11 @@ class ResponseSynthesisEngine:
         }
         
     def _init_openai(self):
-        """Initialize OpenAI client from Streamlit secrets."""
+        """Initialize OpenAI client from Streamlit secrets (or the environment)."""
         try:
-            api_key = st.secrets.get("OPENAI_API_KEY")
+            api_key = get_openai_api_key()
             if api_key:
-                self.openai_client = openai.OpenAI(api_key=api_key)
+                self.openai_client = openai.OpenAI(api_key=api_key, base_url=get_openai_base_url())
                 print("✅ OpenAI client initialized for response synthesis")
             else:
                 print("⚠️ No OpenAI API key found - web browsing disabled")
@@ -57,29 +73,15 @@ class ResponseSynthesisEngine:
             print(f"❌ Error initializing OpenAI: {e}")
     
     def web_fetch(self, url: str) -> Dict:
-        """Fetch a URL and return clean text content."""
+        """Fetch a URL and return clean text content (served from the web cache when possible)."""
         try:
-            # Keep it simple & safe
-            headers = {"User-Agent": "AutismSupportApp/1.0"}
-            r = requests.get(url, headers=headers, timeout=12)
-            r.raise_for_status()
-            
-            # Parse HTML and extract clean text
-            soup = BeautifulSoup(r.text, "html.parser")
-            
-            # Strip script/style and get text
-            for tag in soup(["script", "style", "noscript"]):
-                tag.decompose()
-            
-            text = " ".join(soup.get_text(separator=" ").split())
-            
-            # Return bounded payload
-            return {
-                "content": text[:20000],  # Limit to 20K chars
-                "status": r.status_code,
-                "url": url,
-                "success": True
-            }
+            # Only counts toward the prefetch hit rate; a prefetched page is served by the web cache
+            take_prefetched("web", url)
+            with span("web_fetch", url=url):
+                result = self.web_content_cache.fetch(url, self._extract_text, timeout=12)
+            if result.get("cache") != "miss":
+                print(f"💾 Web cache {result['cache']}: {url}")
+            return result
             
         except Exception as e:
             print(f"❌ Web fetch error for {url}: {e}")
@@ -90,10 +92,33 @@ class ResponseSynthesisEngine:
                 "success": False
             }
     
+    @staticmethod
+    def _extract_text(html: str) -> str:
+        """Parse HTML and return bounded clean text."""
+        # bs4 is only needed here
+        from bs4 import BeautifulSoup
+        soup = BeautifulSoup(html, "html.parser")
+        
+        # Strip script/style and get text
+        for tag in soup(["script", "style", "noscript"]):
+            tag.decompose()
+        
+        text = " ".join(soup.get_text(separator=" ").split())
+        
+        # Return bounded payload
+        return text[:20000]  # Limit to 20K chars
+    
     def get_mongodb_content(self, context_path: str) -> Optional[Dict]:
-        """Get content from MongoDB for a specific context path."""
+        """Get content from MongoDB for a specific context path (using prefetched content once if available)."""
+        prefetched = take_prefetched("mongo", context_path)
+        if prefetched is not None:
+            return prefetched
+        return self._find_mongodb_content(context_path)
+    
+    def _find_mongodb_content(self, context_path: str) -> Optional[Dict]:
         try:
-            doc = self.collection.find_one({"context_path": context_path})
+            with span("mongo_lookup", context_path=context_path):
+                doc = self.collection.find_one({"context_path": context_path})
             if doc:
                 return {
                     "response": doc.get("response", ""),
@@ -107,6 +132,20 @@ class ResponseSynthesisEngine:
             print(f"❌ MongoDB error: {e}")
         return None
     
+    def prefetch_context(self, context_path: str):
+        """Warm a likely next node: its Mongo content and the page behind its source (runs on the prefetch pool)."""
+        prefetcher = get_context_prefetcher()
+        if not prefetcher:
+            return
+        content = self._find_mongodb_content(context_path)
+        prefetcher.put("mongo", context_path, content)
+        
+        source = (content or {}).get("source") or ""
+        if source.startswith("http"):
+            result = self.web_content_cache.fetch(source, self._extract_text, timeout=12)
+            if result.get("success"):
+                prefetcher.put("web", source, True)
+    
     def browse_external_source(self, url: str, query: str) -> Optional[str]:
         """Browse external source using OpenAI native web search with custom scraping fallback."""
         if not self.openai_client or not url:
@@ -118,6 +157,19 @@ class ResponseSynthesisEngine:
             if not parsed.scheme or not parsed.netloc:
                 return None
                 
+            # Repeat questions on the same node reuse the cached web context
+            with span("web_search", url=url):
+                return self.search_result_cache.get_or_fetch(
+                    url, query, lambda: self._browse_external_source_uncached(url, query)
+                )
+            
+        except Exception as e:
+            print(f"❌ Web browsing error: {e}")
+            return None
+    
+    def _browse_external_source_uncached(self, url: str, query: str) -> Optional[str]:
+        """Run native web search (with scraping fallback) for a validated URL."""
+        try:
             print(f"🌐 Browsing external source: {url}")
             
             # Try OpenAI native web search first (PRIMARY METHOD)
@@ -173,17 +225,24 @@ class ResponseSynthesisEngine:
             print(f"❌ Custom web scraping error: {e}")
             return None
     
+    @single_flight("synthesize_response")
     def synthesize_response(
         self, 
         user_query: str, 
         context_path: str, 
         user_profile: Dict,
         conversation_history: List[Dict] = None,
-        vector_results: List[Dict] = None
+        vector_results: List[Dict] = None,
+        use_cache: bool = True
     ) -> Dict:
         """
         Synthesize a comprehensive response combining MongoDB content and web browsing.
         
+        Generic turns (see _semantic_cache_embedding) are answered from the shared
+        context only, without history or memory, so the answer can be reused for
+        the same question on this node from anyone in the same profile bucket.
+        Pass use_cache=False for requests that depend on this conversation.
+        
         Returns:
             {
                 "response": str - synthesized response,
@@ -192,16 +251,143 @@ class ResponseSynthesisEngine:
                 "next_suggestions": List[str] - suggested next steps
             }
         """
+        # Generic turns can reuse the answer to a near-identical question on this node
+        query_embedding = self._semantic_cache_embedding(user_query, user_profile, vector_results) if use_cache else None
+        generic = query_embedding is not None
+        cached = self.semantic_cache.lookup(context_path, user_profile, query_embedding)
+        if cached:
+            return cached
         
-        # Get base content from MongoDB
-        mongodb_content = self.get_mongodb_content(context_path)
+        plan = self._plan_synthesis(user_query, context_path, user_profile, vector_results, personal=not generic)
+        if plan.get("fallback"):
+            return plan["fallback"]
         
-        # Check if we have vector results (patient documents) even if MongoDB content is missing
-        has_patient_docs = bool(vector_results and any(
+        # Synthesize comprehensive response using LLM
+        synthesized_response = self._llm_synthesize(
+            user_query=user_query,
+            mongodb_content=plan["mongodb_content"],
+            web_content=plan["gathered_context"]["web_content"],
+            user_profile=user_profile,
+            conversation_history=None if generic else conversation_history,
+            vector_results=vector_results or [],
+            gathered_context=plan["gathered_context"]
+        )
+        
+        result = self._finalize_synthesis(plan, synthesized_response, context_path, user_profile, vector_results)
+        self._store_semantic_cache(context_path, user_profile, query_embedding, plan, result)
+        return result
+    
+    def synthesize_response_stream(
+        self, 
+        user_query: str, 
+        context_path: str, 
+        user_profile: Dict,
+        conversation_history: List[Dict] = None,
+        vector_results: List[Dict] = None,
+        use_cache: bool = True
+    ) -> Iterator[Dict]:
+        """
+        Streaming variant of synthesize_response.
+        
+        Yields {"type": "token", "content": str} frames as the LLM produces them,
+        then one {"type": "final", ...} frame carrying the same fields as
+        synthesize_response (sources, next_suggestions, ...).
+        """
+        query_embedding = self._semantic_cache_embedding(user_query, user_profile, vector_results) if use_cache else None
+        generic = query_embedding is not None
+        cached = self.semantic_cache.lookup(context_path, user_profile, query_embedding)
+        if cached:
+            yield {"type": "token", "content": cached["response"]}
+            yield {"type": "final", **cached}
+            return
+        
+        plan = self._plan_synthesis(user_query, context_path, user_profile, vector_results, personal=not generic)
+        if plan.get("fallback"):
+            yield {"type": "token", "content": plan["fallback"]["response"]}
+            yield {"type": "final", **plan["fallback"]}
+            return
+        
+        chunks = []
+        for token in self._llm_synthesize_stream(
+            user_query=user_query,
+            mongodb_content=plan["mongodb_content"],
+            web_content=plan["gathered_context"]["web_content"],
+            user_profile=user_profile,
+            conversation_history=None if generic else conversation_history,
+            vector_results=vector_results or [],
+            gathered_context=plan["gathered_context"]
+        ):
+            chunks.append(token)
+            yield {"type": "token", "content": token}
+        
+        result = self._finalize_synthesis(plan, "".join(chunks).strip(), context_path, user_profile, vector_results)
+        self._store_semantic_cache(context_path, user_profile, query_embedding, plan, result)
+        yield {"type": "final", **result}
+    
+    @staticmethod
+    def _has_user_docs(vector_results: List[Dict] = None) -> bool:
+        """Whether any retrieved chunk comes from the user's own uploaded documents."""
+        return bool(vector_results and any(
             result.get("payload", {}).get("source") == "user_upload" or 
             result.get("payload", {}).get("type") == "user_document"
             for result in vector_results
         ))
+    
+    def _semantic_cache_embedding(self, user_query: str, user_profile: Dict, vector_results: List[Dict] = None):
+        """
+        Query embedding for the semantic cache, or None when the turn is personal.
+
+        Generic prompts leave out history and memory, so eligibility only depends on
+        the inputs they keep: profile concerns, retrieved user documents and the
+        patient section, which any uploaded document would fill.
+        """
+        if user_profile.get("concerns") or self._has_user_docs(vector_results):
+            return None
+        user_id = user_profile.get("user_id")
+        if user_id and self._user_has_documents(user_id):
+            return None
+        return self.semantic_cache.embed(user_query)
+    
+    def _user_has_documents(self, user_id: str) -> bool:
+        """Whether user_id has uploaded documents; an unreadable store counts as yes."""
+        try:
+            from rag.ingest_user_docs import get_document_fingerprint
+            return get_document_fingerprint(user_id) != ""
+        except Exception as e:
+            print(f"⚠️ Skipping semantic cache, could not check user documents: {e}")
+            return True
+    
+    def _store_semantic_cache(self, context_path: str, user_profile: Dict, query_embedding, plan: Dict, result: Dict):
+        """Cache a generic answer; anything built from the user's memory or patient documents is never shared."""
+        gathered_context = plan["gathered_context"]
+        if query_embedding is None or gathered_context.get("patient_info"):
+            return
+        if any((gathered_context.get("memory_context") or {}).values()):
+            return
+        if result["response"].startswith("I apologize, but I encountered an error"):
+            return
+        self.semantic_cache.store(context_path, user_profile, query_embedding, result)
+    
+    def _plan_synthesis(
+        self, 
+        user_query: str, 
+        context_path: str, 
+        user_profile: Dict,
+        vector_results: List[Dict] = None,
+        personal: bool = True
+    ) -> Dict:
+        """
+        Collect everything a synthesis needs before the LLM call.
+        
+        Returns {"fallback": result} when there is no content to synthesize from,
+        otherwise {"mongodb_content": Dict, "gathered_context": Dict}. With
+        personal=False memory and patient context are not fetched.
+        """
+        # Get base content from MongoDB
+        mongodb_content = self.get_mongodb_content(context_path)
+        
+        # Check if we have vector results (patient documents) even if MongoDB content is missing
+        has_patient_docs = self._has_user_docs(vector_results)
         
         # Only fall back to hardcoded response if we have NO content at all
         if not mongodb_content and not has_patient_docs:
@@ -216,12 +402,12 @@ class ResponseSynthesisEngine:
             else:
                 response = "I'm here to help you with autism support and resources. I can provide information about screening, diagnosis, treatment options, support services, and educational resources. What would you like to learn more about?"
             
-            return {
+            return {"fallback": {
                 "response": response,
                 "sources": [],
                 "confidence": 0.5,
                 "next_suggestions": ["Learn about screening options", "Find support resources", "Explore treatment options"]
-            }
+            }}
         
         # If we have patient documents, create a minimal MongoDB content structure
         if not mongodb_content and has_patient_docs:
@@ -239,43 +425,29 @@ class ResponseSynthesisEngine:
         if mongodb_content.get("source"):
             external_sources.append(mongodb_content["source"])
         
-        # Browse external sources for additional context
-        web_content = []
-        for source in external_sources:
-            if source and source.startswith("http"):
-                try:
-                    content = self.browse_external_source(source, user_query)
-                    if content and len(content.strip()) > 0:
-                        web_content.append({
-                            "source": source,
-                            "content": content
-                        })
-                        print(f"✅ Successfully browsed: {source}")
-                    else:
-                        print(f"⚠️ No content retrieved from: {source}")
-                except Exception as e:
-                    print(f"❌ Error browsing {source}: {e}")
-                    continue
+        # Gather web, memory and patient context concurrently
+        gathered_context = self.gather_context(user_query, user_profile, external_sources, personal=personal)
         
-        # Synthesize comprehensive response using LLM
-        synthesized_response = self._llm_synthesize(
-            user_query=user_query,
-            mongodb_content=mongodb_content,
-            web_content=web_content,
-            user_profile=user_profile,
-            conversation_history=conversation_history,
-            vector_results=vector_results or []
-        )
+        return {"mongodb_content": mongodb_content, "gathered_context": gathered_context}
+    
+    def _finalize_synthesis(
+        self, 
+        plan: Dict, 
+        synthesized_response: str, 
+        context_path: str, 
+        user_profile: Dict,
+        vector_results: List[Dict] = None
+    ) -> Dict:
+        """Attach sources, suggestions and confidence to a synthesized response."""
+        mongodb_content = plan["mongodb_content"]
+        gathered_context = plan["gathered_context"]
+        web_content = gathered_context["web_content"]
         
         # Determine next suggestions based on available routes/branches
         next_suggestions = self._get_next_suggestions(mongodb_content, user_profile)
         
         # Calculate confidence based on sources
-        has_user_docs = bool(vector_results and any(
-            result.get("payload", {}).get("source") == "user_upload" or 
-            result.get("payload", {}).get("type") == "user_document"
-            for result in vector_results
-        ))
+        has_user_docs = self._has_user_docs(vector_results)
         
         # Build sources list in the format the UI expects
         sources = []
@@ -327,117 +499,179 @@ class ResponseSynthesisEngine:
             "next_suggestions": next_suggestions,
             "mongodb_content": mongodb_content,
             "web_content": web_content,
-            "vector_results": vector_results or []
+            "vector_results": vector_results or [],
+            "context_timings": gathered_context["timings"]
         }
     
-    def _llm_synthesize(
+    def gather_context(self, user_query: str, user_profile: Dict, external_sources: List[str] = None, personal: bool = True) -> Dict:
+        """
+        Fetch every independent piece of context for a turn concurrently.
+        Memory and patient context are skipped when personal is False.
+        
+        Returns:
+            {
+                "web_content": List[Dict] - browsed sources that returned content,
+                "memory_context": Dict - conversation memory by type (or None),
+                "patient_info": Dict - parsed patient documents (or None),
+                "timings": Dict - per-branch seconds and status
+            }
+        """
+        branches = {}
+        
+        web_sources = [s for s in (external_sources or []) if s and s.startswith("http")]
+        for source in web_sources:
+            branches[f"web:{source}"] = lambda source=source: self.browse_external_source(source, user_query)
+        
+        user_id = (user_profile or {}).get("user_id")
+        if personal:
+            if user_id:
+                branches["memory"] = lambda: self._fetch_memory_context(user_id, user_query)
+            branches["patient"] = lambda: self._fetch_patient_info(user_id or "default")
+        
+        with span("context_gather", branches=len(branches)):
+            results, timings = self.context_gatherer.gather(branches)
+        
+        web_content = []
+        for source in web_sources:
+            content = results.get(f"web:{source}")
+            if content and len(content.strip()) > 0:
+                web_content.append({
+                    "source": source,
+                    "content": content
+                })
+                print(f"✅ Successfully browsed: {source}")
+            else:
+                print(f"⚠️ No content retrieved from: {source}")
+        
+        return {
+            "web_content": web_content,
+            "memory_context": results.get("memory"),
+            "patient_info": results.get("patient"),
+            "timings": timings
+        }
+    
+    def _fetch_memory_context(self, user_id: str, user_query: str) -> Dict:
+        """Retrieve relevant conversation memory for the user."""
+        from knowledge.conversation_memory_manager import ConversationMemoryManager
+        with span("memory_context"):
+            memory_manager = ConversationMemoryManager(user_id)
+            return memory_manager.retrieve_relevant_context(user_query, limit=3)
+    
+    def _fetch_patient_info(self, user_id: str) -> Dict:
+        """Parse the user's patient documents (served from the process-wide patient context cache)."""
+        from utils.patient_context_cache import get_patient_context
+        with span("patient_context"):
+            return get_patient_context(user_id)
+    
+    def _build_synthesis_messages(
         self, 
         user_query: str, 
         mongodb_content: Dict, 
         web_content: List[Dict],
         user_profile: Dict,
         conversation_history: List[Dict] = None,
-        vector_results: List[Dict] = None
-    ) -> str:
-        """Synthesize response using OpenAI LLM with comprehensive context."""
+        vector_results: List[Dict] = None,
+        gathered_context: Dict = None
+    ) -> List[Dict]:
+        """Build the system and user messages for synthesis from all available context."""
+        # Memory and patient context normally arrive pre-fetched from gather_context
+        if gathered_context is None:
+            gathered_context = self.gather_context(user_query, user_profile)
+        
+        # Fill a fixed token budget by section priority (lower = kept first) and relevance
+        assembler = PromptAssembler(SYNTHESIS_CONTEXT_TOKENS)
+        
+        # Add MongoDB content context
+        if mongodb_content and mongodb_content.get("response"):
+            assembler.add_section("guidance", [mongodb_content["response"]], header="Structured Guidance:", priority=1, required=True)
+        
+        # Add user profile context
+        profile_lines = []
+        if user_profile:
+            if user_profile.get("role"):
+                profile_lines.append(f"Role: {user_profile['role']}")
+            if user_profile.get("child_age"):
+                profile_lines.append(f"Child Age: {user_profile['child_age']}")
+            if user_profile.get("diagnosis_status"):
+                profile_lines.append(f"Diagnosis Status: {user_profile['diagnosis_status']}")
+            if user_profile.get("concerns"):
+                profile_lines.append(f"Concerns: {', '.join(user_profile['concerns'])}")
+        assembler.add_section("profile", profile_lines, header="User Profile:", priority=1, required=True)
+        
+        # Add patient document context if available
         try:
-            # Build comprehensive context
-            context_parts = []
-            
-            # Add MongoDB content context
-            if mongodb_content and mongodb_content.get("response"):
-                context_parts.append(f"Structured Guidance:\n{mongodb_content['response']}")
-            
-            # Add user profile context
-            if user_profile:
-                profile_context = "User Profile:\n"
-                if user_profile.get("role"):
-                    profile_context += f"Role: {user_profile['role']}\n"
-                if user_profile.get("child_age"):
-                    profile_context += f"Child Age: {user_profile['child_age']}\n"
-                if user_profile.get("diagnosis_status"):
-                    profile_context += f"Diagnosis Status: {user_profile['diagnosis_status']}\n"
-                if user_profile.get("concerns"):
-                    profile_context += f"Concerns: {', '.join(user_profile['concerns'])}\n"
-            context_parts.append(profile_context)
-            
-            # Add conversation history context for continuity
-            if conversation_history:
-                recent_history = conversation_history[-3:]  # Last 3 exchanges
-                history_context = "Recent Conversation History:\n"
-                for msg in recent_history:
-                    role = "User" if msg.get("role") == "user" else "Assistant"
-                    content = msg.get("content", "")[:100] + "..." if len(msg.get("content", "")) > 100 else msg.get("content", "")
-                    history_context += f"{role}: {content}\n"
-                context_parts.append(history_context)
-            
-            # NEW: Add conversation memory context if available
-            try:
-                if user_profile and user_profile.get("user_id"):
-                    from knowledge.conversation_memory_manager import ConversationMemoryManager
-                    memory_manager = ConversationMemoryManager(user_profile["user_id"])
-                    memory_context = memory_manager.retrieve_relevant_context(user_query, limit=3)
-                    
-                    if memory_context:
-                        memory_summary = "Relevant Past Insights:\n"
-                        for memory_type, memories in memory_context.items():
-                            if memories:
-                                memory_summary += f"{memory_type.replace('_', ' ').title()}:\n"
-                                for memory in memories[:2]:  # Top 2 memories per type
-                                    content = memory.get("content", "")[:150] + "..." if len(memory.get("content", "")) > 150 else memory.get("content", "")
-                                    memory_summary += f"- {content}\n"
-                                memory_summary += "\n"
-                        
-                        if len(memory_summary.strip()) > 20:  # Only add if we have meaningful content
-                            context_parts.append(memory_summary)
-            except Exception as e:
-                print(f"⚠️ Could not retrieve memory context: {e}")
-                # Continue without memory context
+            from utils.patient_utils import create_patient_summary
+            patient_info = gathered_context.get("patient_info")
             
-            # Add patient document context if available
-            try:
-                from utils.patient_utils import parse_patient_documents, create_patient_summary
-                user_id = user_profile.get("user_id", "default")
-                patient_info = parse_patient_documents(user_id)
+            if patient_info:
+                patient_lines = [create_patient_summary(patient_info)]
                 
-                if patient_info:
-                    patient_summary = create_patient_summary(patient_info)
-                    context_parts.append(f"Patient Information:\n{patient_summary}")
-                    
-                    # Add specific patient details for personalization
-                    if patient_info.get("name"):
-                        context_parts.append(f"Focus on {patient_info['name']}'s specific situation and needs.")
-                    if patient_info.get("age"):
-                        context_parts.append(f"Provide age-appropriate recommendations for a {patient_info['age']}-year-old child.")
-                    if patient_info.get("concerns"):
-                        concerns = ", ".join(patient_info["concerns"][:3])
-                        context_parts.append(f"Address these specific concerns: {concerns}")
-            except Exception as e:
-                print(f"⚠️ Could not add patient context: {e}")
-                # Continue without patient context
-            
-            # Add web content context
-            if web_content:
-                web_context = "Additional Web Information:\n"
-                for i, content in enumerate(web_content[:2], 1):  # Limit to 2 web sources
-                    web_context += f"{i}. {content['content'][:200]}...\n"
-                context_parts.append(web_context)
-            
-            # Add vector results context
-            if vector_results:
-                vector_context = "Relevant Document Information:\n"
-                for i, result in enumerate(vector_results[:3], 1):  # Limit to 3 results
-                    payload = result.get("payload", {})
-                    content = payload.get("content", "")[:200] + "..." if len(payload.get("content", "")) > 200 else payload.get("content", "")
-                    source = payload.get("filename", payload.get("source", "Unknown"))
-                    vector_context += f"{i}. {source}: {content}\n"
-                context_parts.append(vector_context)
-            
-            # Combine all context
-            full_context = "\n\n".join(context_parts)
+                # Add specific patient details for personalization
+                if patient_info.get("name"):
+                    patient_lines.append(f"Focus on {patient_info['name']}'s specific situation and needs.")
+                if patient_info.get("age"):
+                    patient_lines.append(f"Provide age-appropriate recommendations for a {patient_info['age']}-year-old child.")
+                if patient_info.get("concerns"):
+                    concerns = ", ".join(patient_info["concerns"][:3])
+                    patient_lines.append(f"Address these specific concerns: {concerns}")
+                assembler.add_section("patient", patient_lines, header="Patient Information:", priority=2)
+        except Exception as e:
+            print(f"⚠️ Could not add patient context: {e}")
+            # Continue without patient context
+        
+        # Add vector results context, most relevant first
+        if vector_results:
+            vector_items = []
+            for result in vector_results:
+                payload = result.get("payload", {})
+                source = payload.get("filename", payload.get("source", "Unknown"))
+                vector_items.append((f"{source}: {payload.get('content', '')}", result.get("score", 0)))
+            assembler.add_section(
+                "documents", vector_items, header="Relevant Document Information:",
+                priority=2, max_item_tokens=250, bullet="- "
+            )
+        
+        # Add conversation history context for continuity (newer messages rank higher)
+        if conversation_history:
+            history_items = []
+            for position, msg in enumerate(conversation_history[-6:]):
+                role = "User" if msg.get("role") == "user" else "Assistant"
+                history_items.append((f"{role}: {msg.get('content', '')}", position))
+            assembler.add_section(
+                "history", history_items, header="Recent Conversation History:",
+                priority=3, max_item_tokens=80
+            )
+        
+        # Add conversation memory context if available
+        try:
+            memory_context = gathered_context.get("memory_context")
             
-            # Create system prompt
-            system_prompt = f"""You are an empathetic, knowledgeable autism support assistant. Use the following context to provide personalized, helpful responses:
+            if memory_context:
+                memory_items = []
+                for memory_type, memories in memory_context.items():
+                    label = memory_type.replace('_', ' ').title()
+                    for memory in memories or []:
+                        memory_items.append((f"{label}: {memory.get('content', '')}", memory.get("score", 0)))
+                assembler.add_section(
+                    "memory", memory_items, header="Relevant Past Insights:",
+                    priority=4, max_item_tokens=60, bullet="- "
+                )
+        except Exception as e:
+            print(f"⚠️ Could not retrieve memory context: {e}")
+            # Continue without memory context
+        
+        # Add web content context
+        if web_content:
+            assembler.add_section(
+                "web", [w["content"] for w in web_content], header="Additional Web Information:",
+                priority=5, max_item_tokens=300, bullet="- "
+            )
+        
+        # Combine all context
+        full_context, _ = assembler.assemble()
+        
+        # Create system prompt
+        system_prompt = f"""You are an empathetic, knowledgeable autism support assistant. Use the following context to provide personalized, helpful responses:
 
 {full_context}
 
@@ -449,20 +683,41 @@ Provide responses that are:
 - Empathetic and supportive
 - Actionable and practical
 - Consistent with previous conversations if memory context is available"""
-            
-            # Create user message
-            user_message = f"User Query: {user_query}\n\nPlease provide a comprehensive, personalized response based on the context above."
+        
+        # Create user message
+        user_message = f"User Query: {user_query}\n\nPlease provide a comprehensive, personalized response based on the context above."
+        
+        return [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_message}
+        ]
+    
+    def _llm_synthesize(
+        self, 
+        user_query: str, 
+        mongodb_content: Dict, 
+        web_content: List[Dict],
+        user_profile: Dict,
+        conversation_history: List[Dict] = None,
+        vector_results: List[Dict] = None,
+        gathered_context: Dict = None
+    ) -> str:
+        """Synthesize response using OpenAI LLM with comprehensive context."""
+        try:
+            messages = self._build_synthesis_messages(
+                user_query, mongodb_content, web_content, user_profile,
+                conversation_history, vector_results, gathered_context
+            )
             
             # Call OpenAI
-            response = self.openai_client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_message}
-                ],
-                temperature=0.7,
-                max_tokens=1000
-            )
+            with span("llm", model="gpt-4o-mini"):
+                response = self.openai_client.chat.completions.create(
+                    model="gpt-4o-mini",
+                    messages=messages,
+                    temperature=0.7,
+                    max_tokens=1000
+                )
+            record_usage("synthesis", getattr(response, "usage", None))
             
             return response.choices[0].message.content.strip()
             
@@ -472,6 +727,56 @@ Provide responses that are:
             traceback.print_exc()
             return "I apologize, but I encountered an error processing your request. Please try again."
     
+    def _llm_synthesize_stream(
+        self, 
+        user_query: str, 
+        mongodb_content: Dict, 
+        web_content: List[Dict],
+        user_profile: Dict,
+        conversation_history: List[Dict] = None,
+        vector_results: List[Dict] = None,
+        gathered_context: Dict = None
+    ) -> Iterator[str]:
+        """Same as _llm_synthesize but yields text deltas as they arrive."""
+        produced = False
+        try:
+            messages = self._build_synthesis_messages(
+                user_query, mongodb_content, web_content, user_profile,
+                conversation_history, vector_results, gathered_context
+            )
+            
+            # Call OpenAI with streaming so the UI can render the first tokens immediately
+            with span("llm", model="gpt-4o-mini", stream=True):
+                started = time.perf_counter()
+                stream = self.openai_client.chat.completions.create(
+                    model="gpt-4o-mini",
+                    messages=messages,
+                    temperature=0.7,
+                    max_tokens=1000,
+                    stream=True,
+                    stream_options={"include_usage": True}
+                )
+                
+                for chunk in stream:
+                    # The last chunk carries usage and no choices
+                    if getattr(chunk, "usage", None):
+                        record_usage("synthesis", chunk.usage)
+                    if not chunk.choices:
+                        continue
+                    delta = chunk.choices[0].delta.content
+                    if delta:
+                        if not produced:
+                            record_latency("llm_first_token", time.perf_counter() - started)
+                        produced = True
+                        yield delta
+            
+        except Exception as e:
+            print(f"❌ Error in streaming LLM synthesis: {e}")
+            import traceback
+            traceback.print_exc()
+            if not produced:
+                yield "I apologize, but I encountered an error processing your request. Please try again."
+    
     def _get_next_suggestions(self, mongodb_content: Dict, user_profile: Dict) -> List[str]:
         """Generate next step suggestions based on available routes and branches."""
         suggestions = []
@@ -596,6 +901,18 @@ Provide responses that are:
         
         return results
     
+    def get_cache_stats(self) -> Dict:
+        """Get hit/miss statistics for the engine's caches."""
+        prefetcher = get_context_prefetcher()
+        return {
+            "web_content": self.web_content_cache.get_stats(),
+            "web_search": self.search_result_cache.get_stats(),
+            "semantic_response": self.semantic_cache.get_stats(),
+            "single_flight": get_single_flight_stats(),
+            "prompt_cache": get_usage_stats(),
+            "prefetch": prefetcher.get_stats() if prefetcher else {"enabled": False}
+        }
+    
     def close(self):
         """Close the MongoDB connection."""
         self.client.close()
@@ -0,0 +1,135 @@
+"""
+Search Result Cache for Autism Support App
+Caches web-search context by (source URL, normalized query) with stale-while-revalidate refresh.
+"""
+
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Optional, Tuple
+
+DEFAULT_TTL_SECONDS = 6 * 3600       # Serve directly while younger than this
+DEFAULT_STALE_SECONDS = 48 * 3600    # Serve stale + refresh in background up to this much longer
+DEFAULT_MAX_ENTRIES = 1000
+
+# Words that do not change what a search about a node should return
+STOPWORDS = {
+    "a", "an", "and", "are", "about", "can", "could", "do", "does", "for", "how", "i", "in",
+    "is", "it", "me", "my", "of", "on", "or", "please", "should", "tell", "the", "to",
+    "what", "when", "where", "which", "who", "why", "with", "would", "you", "your"
+}
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def normalize_query(query: str) -> str:
+    """Lowercase, drop punctuation and stopwords, and sort the remaining unique tokens."""
+    tokens = {t for t in _TOKEN_RE.findall((query or "").lower()) if t not in STOPWORDS}
+    return " ".join(sorted(tokens))
+
+
+class SearchResultCache:
+    """In-process LRU of search results with TTL and background stale-while-revalidate."""
+
+    def __init__(
+        self,
+        ttl_seconds: int = DEFAULT_TTL_SECONDS,
+        stale_seconds: int = DEFAULT_STALE_SECONDS,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        max_workers: int = 2
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.stale_seconds = stale_seconds
+        self.max_entries = max_entries
+
+        self._entries: "OrderedDict[Tuple[str, str], Dict]" = OrderedDict()
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="search-refresh")
+
+        self.stats = {
+            "hits": 0,
+            "stale_hits": 0,
+            "misses": 0,
+            "background_refreshes": 0,
+            "refresh_failures": 0
+        }
+
+    def make_key(self, source: str, query: str) -> Tuple[str, str]:
+        return (source.rstrip("/"), normalize_query(query))
+
+    def get_or_fetch(self, source: str, query: str, fetch: Callable[[], Optional[str]]) -> Optional[str]:
+        """
+        Return cached content for (source, query), calling fetch() only when needed.
+
+        Fresh entries are returned directly. Entries past their TTL but inside the
+        stale window are returned immediately while fetch() refreshes them in the
+        background. Anything older (or missing) is fetched synchronously.
+        """
+        key = self.make_key(source, query)
+        now = time.time()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry:
+                self._entries.move_to_end(key)
+                age = now - entry["stored_at"]
+                if age < self.ttl_seconds:
+                    self.stats["hits"] += 1
+                    return entry["content"]
+                if age < self.ttl_seconds + self.stale_seconds:
+                    self.stats["stale_hits"] += 1
+                    if key not in self._refreshing:
+                        self._refreshing.add(key)
+                        self._executor.submit(self._refresh, key, fetch)
+                    return entry["content"]
+            self.stats["misses"] += 1
+
+        content = fetch()
+        if content and content.strip():
+            self._store(key, content)
+        return content
+
+    def _refresh(self, key: Tuple[str, str], fetch: Callable[[], Optional[str]]):
+        try:
+            content = fetch()
+            if content and content.strip():
+                self._store(key, content)
+                with self._lock:
+                    self.stats["background_refreshes"] += 1
+                print(f"🔄 Refreshed cached search for {key[0]}")
+        except Exception as e:
+            with self._lock:
+                self.stats["refresh_failures"] += 1
+            print(f"⚠️ Background search refresh failed for {key[0]}: {e}")
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def _store(self, key: Tuple[str, str], content: str):
+        with self._lock:
+            self._entries[key] = {"content": content, "stored_at": time.time()}
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, source: str = None):
+        """Drop entries for one source, or everything when source is None."""
+        with self._lock:
+            if source is None:
+                self._entries.clear()
+                return
+            source = source.rstrip("/")
+            for key in [k for k in self._entries if k[0] == source]:
+                del self._entries[key]
+
+    def get_stats(self) -> Dict:
+        """Hit/miss counters plus hit rate (stale hits count as hits)."""
+        with self._lock:
+            stats = dict(self.stats)
+            stats["entries"] = len(self._entries)
+        lookups = stats["hits"] + stats["stale_hits"] + stats["misses"]
+        stats["hit_rate"] = (stats["hits"] + stats["stale_hits"]) / lookups if lookups else 0.0
+        return stats
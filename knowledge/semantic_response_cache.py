@@ -0,0 +1,155 @@
+"""
+Semantic Response Cache for Autism Support App
+Reuses synthesized answers for near-identical generic questions on the same context node.
+"""
+
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+DEFAULT_SIMILARITY_THRESHOLD = 0.92
+DEFAULT_TTL_SECONDS = 24 * 3600
+DEFAULT_MAX_ENTRIES_PER_BUCKET = 200
+
+# Touched by every knowledge-base ingestion; a newer marker invalidates cached answers
+KB_VERSION_PATH = os.path.join("data", "kb_version")
+
+
+def bump_kb_version(reason: str = "") -> None:
+    """Record that the knowledge base was re-ingested so cached answers are dropped."""
+    try:
+        os.makedirs(os.path.dirname(KB_VERSION_PATH), exist_ok=True)
+        with open(KB_VERSION_PATH, "w", encoding="utf-8") as f:
+            f.write(f"{time.time()} {reason}\n")
+        print(f"🔖 Knowledge base version bumped{f' ({reason})' if reason else ''}")
+    except Exception as e:
+        print(f"⚠️ Could not bump knowledge base version: {e}")
+
+
+def _read_kb_version() -> int:
+    try:
+        return os.stat(KB_VERSION_PATH).st_mtime_ns
+    except FileNotFoundError:
+        return 0
+
+
+def profile_bucket(user_profile: Dict) -> Tuple[str, str, str]:
+    """Coarse profile key: answers are only shared between users in the same bucket."""
+    user_profile = user_profile or {}
+    return (
+        user_profile.get("role") or "unknown",
+        user_profile.get("child_age") or "unknown",
+        user_profile.get("diagnosis_status") or "unknown"
+    )
+
+
+class SemanticResponseCache:
+    """Per-(context_path, profile bucket) store of answers matched by query-embedding similarity."""
+
+    def __init__(
+        self,
+        embed_fn: Callable[[str], List[float]] = None,
+        similarity_threshold: float = DEFAULT_SIMILARITY_THRESHOLD,
+        ttl_seconds: int = DEFAULT_TTL_SECONDS,
+        max_entries_per_bucket: int = DEFAULT_MAX_ENTRIES_PER_BUCKET
+    ):
+        self._embed_fn = embed_fn
+        self.similarity_threshold = similarity_threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries_per_bucket = max_entries_per_bucket
+
+        self._buckets: Dict[Tuple, List[Dict]] = {}
+        self._kb_version = _read_kb_version()
+        self._lock = threading.Lock()
+        self.stats = {
+            "hits": 0,
+            "misses": 0,
+            "stores": 0,
+            "expired": 0,
+            "invalidations": 0
+        }
+
+    def embed(self, query: str) -> Optional[np.ndarray]:
+        """Unit-normalized query embedding, or None when embeddings are unavailable."""
+        if self._embed_fn is None:
+            from rag.embeddings import embed_single
+            self._embed_fn = embed_single
+        try:
+            vector = np.asarray(self._embed_fn(query), dtype=np.float32)
+        except Exception as e:
+            print(f"⚠️ Semantic cache could not embed query: {e}")
+            return None
+        norm = float(np.linalg.norm(vector)) if vector.size else 0.0
+        return vector / norm if norm else None
+
+    def _check_kb_version(self):
+        version = _read_kb_version()
+        if version != self._kb_version:
+            with self._lock:
+                self._kb_version = version
+                self._buckets.clear()
+                self.stats["invalidations"] += 1
+            print("🔄 Knowledge base changed - semantic response cache cleared")
+
+    def lookup(self, context_path: str, user_profile: Dict, embedding: Optional[np.ndarray]) -> Optional[Dict]:
+        """Return a copy of the best cached result above the similarity threshold, or None."""
+        self._check_kb_version()
+        if embedding is None:
+            return None
+
+        key = (context_path, profile_bucket(user_profile))
+        now = time.time()
+        with self._lock:
+            entries = self._buckets.get(key, [])
+            live = [e for e in entries if now - e["stored_at"] < self.ttl_seconds]
+            if len(live) != len(entries):
+                self.stats["expired"] += len(entries) - len(live)
+                self._buckets[key] = live
+
+            best, best_score = None, -1.0
+            if live:
+                scores = np.stack([e["embedding"] for e in live]) @ embedding
+                index = int(np.argmax(scores))
+                best, best_score = live[index], float(scores[index])
+
+            if best is not None and best_score >= self.similarity_threshold:
+                self.stats["hits"] += 1
+                print(f"💾 Semantic cache hit for {context_path} (similarity {best_score:.3f})")
+                return dict(best["result"])
+
+            self.stats["misses"] += 1
+            return None
+
+    def store(self, context_path: str, user_profile: Dict, embedding: Optional[np.ndarray], result: Dict):
+        """Remember result for this node and profile bucket."""
+        if embedding is None or not result.get("response"):
+            return
+        key = (context_path, profile_bucket(user_profile))
+        with self._lock:
+            entries = self._buckets.setdefault(key, [])
+            entries.append({"embedding": embedding, "result": dict(result), "stored_at": time.time()})
+            if len(entries) > self.max_entries_per_bucket:
+                del entries[:len(entries) - self.max_entries_per_bucket]
+            self.stats["stores"] += 1
+
+    def invalidate(self, context_path: str = None):
+        """Drop cached answers for one context node, or everything when context_path is None."""
+        with self._lock:
+            if context_path is None:
+                self._buckets.clear()
+            else:
+                for key in [k for k in self._buckets if k[0] == context_path]:
+                    del self._buckets[key]
+            self.stats["invalidations"] += 1
+
+    def get_stats(self) -> Dict:
+        """Hit/miss counters plus hit rate."""
+        with self._lock:
+            stats = dict(self.stats)
+            stats["entries"] = sum(len(entries) for entries in self._buckets.values())
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
@@ -0,0 +1,203 @@
+"""
+Web Content Cache for Autism Support App
+Disk-backed cache of extracted page text keyed by URL, revalidated with ETag/Last-Modified.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, Optional
+
+import requests
+
+DEFAULT_CACHE_DIR = "data/web_cache"
+DEFAULT_TTL_SECONDS = 24 * 3600            # Serve without revalidating for a day
+DEFAULT_MAX_ENTRY_BYTES = 200_000          # Extracted text larger than this is truncated
+DEFAULT_MAX_TOTAL_BYTES = 50 * 1024 * 1024 # Oldest entries are evicted past this
+
+
+class WebContentCache:
+    """Persistent URL → extracted-text cache with TTL, conditional revalidation and size limits."""
+
+    def __init__(
+        self,
+        cache_dir: str = DEFAULT_CACHE_DIR,
+        ttl_seconds: int = DEFAULT_TTL_SECONDS,
+        max_entry_bytes: int = DEFAULT_MAX_ENTRY_BYTES,
+        max_total_bytes: int = DEFAULT_MAX_TOTAL_BYTES,
+        session: Optional[requests.Session] = None,
+        user_agent: str = "AutismSupportApp/1.0"
+    ):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.ttl_seconds = ttl_seconds
+        self.max_entry_bytes = max_entry_bytes
+        self.max_total_bytes = max_total_bytes
+        self.session = session or requests.Session()
+        self.user_agent = user_agent
+
+        self._lock = threading.Lock()
+        self.stats = {
+            "hits": 0,
+            "misses": 0,
+            "revalidated": 0,
+            "stale_served": 0,
+            "evictions": 0
+        }
+
+    def _entry_path(self, url: str) -> Path:
+        return self.cache_dir / f"{hashlib.sha256(url.encode('utf-8')).hexdigest()}.json"
+
+    def _count(self, stat: str):
+        with self._lock:
+            self.stats[stat] += 1
+
+    def get(self, url: str) -> Optional[Dict]:
+        """Return the stored entry for url (fresh or stale), or None."""
+        path = self._entry_path(url)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+            return entry if entry.get("url") == url else None
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+        except Exception as e:
+            print(f"⚠️ Could not read web cache entry for {url}: {e}")
+            return None
+
+    def is_fresh(self, entry: Dict) -> bool:
+        return (time.time() - entry.get("fetched_at", 0)) < self.ttl_seconds
+
+    def put(self, url: str, content: str, status: int = 200, etag: str = None, last_modified: str = None) -> Dict:
+        """Store extracted text for url, enforcing the per-entry size limit."""
+        encoded = content.encode("utf-8")
+        if len(encoded) > self.max_entry_bytes:
+            content = encoded[:self.max_entry_bytes].decode("utf-8", errors="ignore")
+
+        entry = {
+            "url": url,
+            "content": content,
+            "status": status,
+            "etag": etag,
+            "last_modified": last_modified,
+            "fetched_at": time.time()
+        }
+        self._write(url, entry)
+        self._enforce_total_size()
+        return entry
+
+    def _write(self, url: str, entry: Dict):
+        path = self._entry_path(url)
+        tmp_path = path.with_suffix(f".{threading.get_ident()}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(entry, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    def _enforce_total_size(self):
+        """Evict least recently fetched entries until the cache fits max_total_bytes."""
+        with self._lock:
+            files = [(p, p.stat()) for p in self.cache_dir.glob("*.json")]
+            total = sum(s.st_size for _, s in files)
+            if total <= self.max_total_bytes:
+                return
+            for path, st in sorted(files, key=lambda item: item[1].st_mtime):
+                if total <= self.max_total_bytes:
+                    break
+                try:
+                    path.unlink()
+                    total -= st.st_size
+                    self.stats["evictions"] += 1
+                except FileNotFoundError:
+                    pass
+
+    def fetch(self, url: str, extract: Callable[[str], str], timeout: int = 12) -> Dict:
+        """
+        Return extracted text for url, using the cache when possible.
+
+        Fresh entries are served directly. Expired entries are revalidated with
+        If-None-Match / If-Modified-Since; a 304 refreshes the entry without
+        re-parsing. If the network fails, a stale entry is served when present.
+
+        Returns the same shape as ResponseSynthesisEngine.web_fetch plus "cache":
+            {"content", "status", "url", "success", "cache": "hit"|"revalidated"|"miss"|"stale"}
+        """
+        entry = self.get(url)
+        if entry and self.is_fresh(entry):
+            self._count("hits")
+            return self._result(entry, "hit")
+
+        headers = {"User-Agent": self.user_agent}
+        if entry:
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+
+        try:
+            r = self.session.get(url, headers=headers, timeout=timeout)
+
+            if r.status_code == 304 and entry:
+                entry["fetched_at"] = time.time()
+                entry["etag"] = r.headers.get("ETag", entry.get("etag"))
+                entry["last_modified"] = r.headers.get("Last-Modified", entry.get("last_modified"))
+                self._write(url, entry)
+                self._count("hits")
+                self._count("revalidated")
+                return self._result(entry, "revalidated")
+
+            r.raise_for_status()
+            self._count("misses")
+            entry = self.put(
+                url,
+                extract(r.text),
+                status=r.status_code,
+                etag=r.headers.get("ETag"),
+                last_modified=r.headers.get("Last-Modified")
+            )
+            return self._result(entry, "miss")
+
+        except Exception as e:
+            if entry:
+                print(f"⚠️ Revalidation failed for {url}, serving stale copy: {e}")
+                self._count("stale_served")
+                return self._result(entry, "stale")
+            raise
+
+    def _result(self, entry: Dict, cache_state: str) -> Dict:
+        return {
+            "content": entry["content"],
+            "status": entry.get("status", 200),
+            "url": entry["url"],
+            "success": True,
+            "cache": cache_state
+        }
+
+    def invalidate(self, url: str) -> bool:
+        """Drop the cached entry for url."""
+        try:
+            self._entry_path(url).unlink()
+            return True
+        except FileNotFoundError:
+            return False
+
+    def clear(self) -> int:
+        """Remove every cached entry."""
+        removed = 0
+        for path in self.cache_dir.glob("*.json"):
+            try:
+                path.unlink()
+                removed += 1
+            except FileNotFoundError:
+                pass
+        return removed
+
+    def get_stats(self) -> Dict:
+        """Hit/miss counters plus hit rate."""
+        with self._lock:
+            stats = dict(self.stats)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
@@ -1,34 +1,115 @@
 """
 Build a vector index using ONLY Llama-Index’s built-in disk store.
 No external vector-DB, no onnxruntime, no chromadb.
+
+Builds are incremental by default: every file is loaded with its path as the
+document id, and Llama-Index keeps a hash per document in the persisted
+docstore. On rebuild only new or changed files are re-embedded, files that
+disappeared are dropped, and unchanged nodes keep their stored embeddings.
 """
 
 import os
-from llama_index.core import VectorStoreIndex, SimpleDirectoryReader, Settings
+import argparse
+from llama_index.core import (
+    VectorStoreIndex,
+    SimpleDirectoryReader,
+    StorageContext,
+    Settings,
+    load_index_from_storage,
+)
 from llama_index.llms.openai import OpenAI
 from llama_index.embeddings.openai import OpenAIEmbedding
 
+from knowledge.semantic_response_cache import bump_kb_version
+from utils.lazy_services import get_openai_base_url
+
 # Where the persisted index will live
 VECTOR_DIR = "vector_index/"          # ← folder will be created if missing
 
+
+def _configure_settings():
+    """Configure LLM + embedding once."""
+    # OPENAI_BASE_URL (e.g. the local stub) applies to index builds too
+    api_base = get_openai_base_url()
+    Settings.llm         = OpenAI(model="gpt-4o-mini", api_base=api_base)
+    Settings.embed_model = OpenAIEmbedding(model="text-embedding-3-small", api_base=api_base)
+
+
+def _load_documents(documents_path: str, num_workers: int = None) -> list:
+    """Read every file under documents_path, in parallel when there is more than one."""
+    reader = SimpleDirectoryReader(documents_path, filename_as_id=True)
+    file_count = len(reader.input_files)
+    if not file_count:
+        return []
+
+    workers = min(num_workers or os.cpu_count() or 1, file_count)
+    if workers > 1:
+        print(f"📂 Loading {file_count} files with {workers} workers...")
+        return reader.load_data(num_workers=workers)
+    return reader.load_data()
+
+
+def _has_persisted_index(persist_dir: str) -> bool:
+    return os.path.exists(os.path.join(persist_dir, "docstore.json"))
+
+
+def refresh_index_from_documents(docs: list, persist_dir: str = VECTOR_DIR) -> dict:
+    """
+    Bring the persisted index in line with docs without re-embedding unchanged files.
+
+    Returns:
+        {"inserted_or_updated": int, "deleted": int, "unchanged": int}
+    """
+    storage_ctx = StorageContext.from_defaults(persist_dir=persist_dir)
+    index       = load_index_from_storage(storage_ctx)
+
+    # Compares each doc's hash with the one stored in the docstore and only
+    # re-embeds new or changed documents.
+    refreshed = index.refresh_ref_docs(docs)
+    changed   = sum(1 for r in refreshed if r)
+
+    # Drop documents whose source file no longer exists
+    current_ids = {doc.doc_id for doc in docs}
+    stale_ids   = [ref_id for ref_id in index.ref_doc_info if ref_id not in current_ids]
+    for ref_id in stale_ids:
+        index.delete_ref_doc(ref_id, delete_from_docstore=True)
+
+    index.storage_context.persist(persist_dir=persist_dir)
+
+    return {
+        "inserted_or_updated": changed,
+        "deleted": len(stale_ids),
+        "unchanged": len(docs) - changed,
+    }
+
+
 def build_index_from_documents(
         documents_path: str = "documents/",
-        persist_dir:   str = VECTOR_DIR) -> bool:
-    """Ingest docs → embed → save on disk."""
-    docs = SimpleDirectoryReader(documents_path).load_data()
+        persist_dir:   str = VECTOR_DIR,
+        incremental:   bool = True,
+        num_workers:   int = None) -> bool:
+    """Ingest docs → embed → save on disk (only new/changed files when incremental)."""
+    docs = _load_documents(documents_path, num_workers=num_workers)
     if not docs:
         print("⚠️  No documents found – skipping index build.")
         return False
 
     os.makedirs(persist_dir, exist_ok=True)
+    _configure_settings()
 
-    # Configure LLM + embedding once
-    Settings.llm         = OpenAI(model="gpt-4o-mini")
-    Settings.embed_model = OpenAIEmbedding(model="text-embedding-3-small")
+    if incremental and _has_persisted_index(persist_dir):
+        stats = refresh_index_from_documents(docs, persist_dir=persist_dir)
+        print(f"✅  Index refreshed in “{persist_dir}”: "
+              f"{stats['inserted_or_updated']} new/changed, "
+              f"{stats['deleted']} deleted, {stats['unchanged']} unchanged.")
+        if stats['inserted_or_updated'] or stats['deleted']:
+            bump_kb_version("index refresh")
+        return True
 
-    # Build & persist
+    # Full build & persist
     index = VectorStoreIndex.from_documents(docs)
     index.storage_context.persist(persist_dir=persist_dir)
+    bump_kb_version("index build")
 
     print(f"✅  Index built and stored in “{persist_dir}”.")
     return True
@@ -36,4 +117,16 @@ def build_index_from_documents(
 
 # CLI helper
 if __name__ == "__main__":
-    build_index_from_documents()
+    parser = argparse.ArgumentParser(description="Build or refresh the on-disk vector index.")
+    parser.add_argument("--documents", default="documents/", help="Folder with source documents")
+    parser.add_argument("--persist-dir", default=VECTOR_DIR, help="Where the index is stored")
+    parser.add_argument("--full", action="store_true", help="Re-embed everything instead of refreshing")
+    parser.add_argument("--workers", type=int, default=None, help="Parallel loader workers")
+    args = parser.parse_args()
+
+    build_index_from_documents(
+        documents_path=args.documents,
+        persist_dir=args.persist_dir,
+        incremental=not args.full,
+        num_workers=args.workers,
+    )
@@ -5,7 +5,11 @@ Handles text-to-vector conversion using OpenAI or local models.
 
 import os
 from typing import List
+from utils.single_flight import single_flight
+from utils.tracing import traced
 
+@traced("embed")
+@single_flight("embed")
 def embed(texts: List[str]) -> List[List[float]]:
     """Generate embeddings for a list of texts."""
     provider = os.getenv("EMBED_PROVIDER", "openai")
@@ -19,15 +23,15 @@ def _embed_openai(texts: List[str]) -> List[List[float]]:
     """Generate embeddings using OpenAI."""
     try:
         from openai import OpenAI
-        import streamlit as st
+        from utils.lazy_services import get_openai_api_key, get_openai_base_url
         
-        # Get API key from Streamlit secrets
-        api_key = st.secrets.get("OPENAI_API_KEY")
+        # Get API key from Streamlit secrets (or the environment)
+        api_key = get_openai_api_key()
         if not api_key:
             print("❌ No OpenAI API key found")
             return []
         
-        client = OpenAI(api_key=api_key)
+        client = OpenAI(api_key=api_key, base_url=get_openai_base_url())
         model = os.getenv("EMBED_MODEL", "text-embedding-3-small")
         
         response = client.embeddings.create(
@@ -9,6 +9,7 @@ from pathlib import Path
 from qdrant_client.models import PointStruct
 from .qdrant_client import ensure_collection
 from .embeddings import embed
+from knowledge.semantic_response_cache import bump_kb_version
 
 COLLECTION_NAME = "kb_autism_support"
 
@@ -72,6 +73,7 @@ def main():
         # Insert into Qdrant
         print(f"📤 Inserting {len(points)} points into Qdrant...")
         qdr.upsert(collection_name=COLLECTION_NAME, points=points)
+        bump_kb_version("shared kb ingest")
         
         print(f"✅ Successfully ingested {len(points)} knowledge items")
         return True
@@ -11,8 +11,17 @@ from qdrant_client.models import PointStruct, Filter, FieldCondition, MatchValue
 from .qdrant_client import ensure_collection
 from .embeddings import embed
 from .process_admin_docs import extract_text_from_file
-from typing import List, Dict
+from typing import List, Dict, Optional
 import hashlib
+from utils.single_flight import single_flight
+
+def _invalidate_patient_context(user_id: str, documents_removed: bool = False):
+    """Drop the cached patient context once the user's document set changes."""
+    try:
+        from utils.patient_context_cache import invalidate_patient_context
+        invalidate_patient_context(user_id, documents_removed=documents_removed)
+    except Exception as e:
+        print(f"⚠️ Could not invalidate patient context for {user_id}: {e}")
 
 def chunk_text(text: str, max_tokens: int = 4000) -> List[str]:
     """Split text into chunks of approximately max_tokens."""
@@ -91,6 +100,7 @@ def check_duplicate_content(new_chunk: str, existing_chunks: List[str], threshol
             return True
     return False
 
+@single_flight("ingest_user_documents")
 def ingest_user_documents(user_id: str, docs_dir: str) -> int:
     """
     Ingest user-specific documents into their private vector store.
@@ -252,6 +262,7 @@ def ingest_user_documents(user_id: str, docs_dir: str) -> int:
         # Insert into Qdrant
         print(f"📤 Inserting {len(points)} new document chunks into Qdrant...")
         qdr.upsert(collection_name=collection_name, points=points)
+        _invalidate_patient_context(user_id)
         
         print(f"✅ Successfully ingested {len(points)} new document chunks")
         if skipped_files:
@@ -385,6 +396,86 @@ def get_full_document_content(user_id: str) -> str:
         print(f"❌ Failed to get full document content: {e}")
         return ""
 
+def get_document_chunks(user_id: str) -> List[Dict]:
+    """
+    Get the user's document chunks in document order.
+    
+    Args:
+        user_id: Unique identifier for the user
+        
+    Returns:
+        List of {"filename", "chunk_index", "content"} sorted by filename and chunk
+    """
+    try:
+        from .qdrant_client import get_qdrant
+        
+        qdr = get_qdrant()
+        if not qdr:
+            return []
+        
+        collection_name = f"user_docs_{user_id}"
+        results = qdr.scroll(
+            collection_name=collection_name,
+            limit=1000,
+            with_payload=["filename", "chunk_index", "content"],
+            with_vectors=False
+        )
+        
+        chunks = [
+            {
+                "filename": point.payload.get("filename", "Unknown"),
+                "chunk_index": point.payload.get("chunk_index", 0),
+                "content": point.payload.get("content", "")
+            }
+            for point in results[0]
+            if point.payload and point.payload.get("content")
+        ]
+        chunks.sort(key=lambda c: (c["filename"], c["chunk_index"]))
+        
+        print(f"✅ Retrieved {len(chunks)} document chunks")
+        return chunks
+        
+    except Exception as e:
+        print(f"❌ Failed to get document chunks: {e}")
+        return []
+
+def get_document_fingerprint(user_id: str) -> Optional[str]:
+    """
+    Fingerprint of the user's current document set (filenames, file hashes, chunks).
+    
+    Reads payload metadata only, so it is cheap compared to fetching content.
+    Returns "" when the user has no documents and None if the store can't be read.
+    """
+    try:
+        from .qdrant_client import get_qdrant
+        
+        qdr = get_qdrant()
+        if not qdr:
+            return None
+        
+        collection_name = f"user_docs_{user_id}"
+        if not qdr.collection_exists(collection_name):
+            return ""
+        
+        points = qdr.scroll(
+            collection_name=collection_name,
+            limit=1000,
+            with_payload=["filename", "file_hash", "chunk_index"],
+            with_vectors=False
+        )[0]
+        if not points:
+            return ""
+        
+        parts = sorted(
+            f"{p.payload.get('filename', '')}|{p.payload.get('file_hash', '')}|{p.payload.get('chunk_index', 0)}|{p.id}"
+            for p in points if p.payload
+        )
+        return hashlib.sha256("\n".join(parts).encode("utf-8")).hexdigest()
+        
+    except Exception as e:
+        print(f"⚠️ Could not fingerprint documents for {user_id}: {e}")
+        return None
+
 def check_existing_documents(user_id: str) -> dict:
     """
     Check what documents already exist in the user's collection.
@@ -470,6 +561,7 @@ def delete_user_document(user_id: str, filename: str) -> bool:
         # Delete all chunks for this document
         point_ids = [point.id for point in existing_points]
         qdr.delete(collection_name=collection_name, points_selector=point_ids)
+        _invalidate_patient_context(user_id, documents_removed=True)
         
         print(f"✅ Deleted {len(point_ids)} chunks for document: {filename}")
         return True
@@ -504,6 +596,7 @@ def clear_user_documents(user_id: str) -> bool:
             ]
         ))
         
+        _invalidate_patient_context(user_id, documents_removed=True)
         print(f"✅ Cleared all documents for user: {user_id}")
         return True
         
@@ -0,0 +1,235 @@
+"""
+Memory Compaction for Autism Support App
+Rolls old chat_history messages into summary points and applies per-type retention so per-user memory stays bounded.
+
+Set MEMORY_COMPACTION_HOURS to compact every N hours inside the app process
+(through the app's shared Qdrant client), or run
+`python -m rag.memory_compaction [--user USER_ID]` against a Qdrant server
+(QDRANT_HOST). Embedded storage is locked by whichever process opens it, so the
+CLI only uses it with --local, while the app is stopped.
+"""
+
+import argparse
+import os
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+# Raw messages always kept per user, newest first
+KEEP_RECENT_MESSAGES = int(os.getenv("MEMORY_KEEP_RECENT", "100"))
+# Older messages are summarized in windows of this many
+SUMMARY_WINDOW = int(os.getenv("MEMORY_SUMMARY_WINDOW", "20"))
+# Summary points kept per user; older ones are already reflected in the merged insights
+MAX_SUMMARIES = int(os.getenv("MEMORY_MAX_SUMMARIES", "50"))
+# Days a point of each type is kept; the user's merged (stable-id) document is never expired
+RETENTION_DAYS = {
+    "insights": int(os.getenv("MEMORY_RETENTION_DAYS_INSIGHTS", "180")),
+    "prefs": int(os.getenv("MEMORY_RETENTION_DAYS_PREFS", "365")),
+    "learning": int(os.getenv("MEMORY_RETENTION_DAYS_LEARNING", "365"))
+}
+SUMMARY_TYPE = "chat_summary"
+
+
+def summarize_window(messages: List[Dict], use_llm: bool = True) -> str:
+    """Short summary of a window of chat messages (LLM when available, extractive otherwise)."""
+    transcript = "\n".join(
+        f"{m.get('role', 'user')}: {(m.get('content') or '')[:500]}" for m in messages if m.get("content")
+    )
+    if use_llm:
+        try:
+            from utils.lazy_services import create_openai_client
+            from utils.llm_usage import record_usage
+            response = create_openai_client().chat.completions.create(
+                model="gpt-4o-mini",
+                messages=[
+                    {"role": "system", "content": "Summarize this part of a conversation between a parent or caregiver and an autism support assistant in 3-5 sentences. Keep facts about the child, concerns raised and advice given."},
+                    {"role": "user", "content": transcript}
+                ],
+                max_tokens=200,
+                temperature=0.2
+            )
+            record_usage("memory_compaction", getattr(response, "usage", None))
+            summary = (response.choices[0].message.content or "").strip()
+            if summary:
+                return summary
+        except Exception as e:
+            print(f"⚠️ LLM summary unavailable, using extractive summary: {e}")
+
+    from utils.text_analyzer import analyze
+    topics, questions = [], []
+    for m in messages:
+        annotation = analyze(m.get("content") or "")
+        topics.extend(t for t in annotation.found("topic") if t not in topics)
+        if m.get("role") == "user" and annotation.text:
+            questions.append(annotation.text.strip()[:120])
+    parts = []
+    if topics:
+        parts.append(f"Topics: {', '.join(topics)}.")
+    if questions:
+        parts.append("User asked: " + " | ".join(questions[:5]))
+    return " ".join(parts) or "Earlier conversation."
+
+
+def compact_user_memory(
+    user_id: str,
+    keep_recent: int = KEEP_RECENT_MESSAGES,
+    window: int = SUMMARY_WINDOW,
+    use_llm: bool = True,
+    qdr=None
+) -> Dict:
+    """Summarize and delete old raw messages, cap summaries and expire old insight points for one user."""
+    from qdrant_client.models import (
+        PointStruct, Filter, FieldCondition, MatchValue, OrderBy, Direction,
+        FilterSelector, PointIdsList, DatetimeRange, HasIdCondition
+    )
+    from rag.qdrant_client import get_qdrant, memory_doc_id
+    from rag.memory_schema import build_memory_payload, read_memory
+    from rag.embeddings import embed
+
+    stats = {"user_id": user_id, "summaries_created": 0, "messages_deleted": 0, "summaries_deleted": 0, "expired": {}}
+    qdr = qdr or get_qdrant()
+    if not qdr:
+        return stats
+
+    collection = f"chat_history_{user_id}"
+    if qdr.collection_exists(collection):
+        def scroll_type(memory_type: str) -> List:
+            limit = qdr.count(collection, count_filter=Filter(must=[FieldCondition(key="type", match=MatchValue(value=memory_type))]), exact=True).count
+            if not limit:
+                return []
+            points, _ = qdr.scroll(
+                collection_name=collection,
+                scroll_filter=Filter(must=[FieldCondition(key="type", match=MatchValue(value=memory_type))]),
+                order_by=OrderBy(key="timestamp", direction=Direction.ASC),
+                limit=limit,
+                with_payload=True,
+                with_vectors=False
+            )
+            return points
+
+        # 1) Roll full windows of messages older than the newest keep_recent into summaries
+        raw = scroll_type("chat_history")
+        old = raw[:max(len(raw) - keep_recent, 0)]
+        windows = [old[i:i + window] for i in range(0, len(old) - window + 1, window)]
+        if windows:
+            summaries = [summarize_window([read_memory(p.payload)["data"] or {} for p in w], use_llm=use_llm) for w in windows]
+            vectors = embed(summaries)
+            if len(vectors) == len(windows):
+                points = []
+                for w, summary, vector in zip(windows, summaries, vectors):
+                    start, end = w[0].payload.get("timestamp", ""), w[-1].payload.get("timestamp", "")
+                    data = {"summary": summary, "message_count": len(w), "start": start, "end": end}
+                    points.append(PointStruct(
+                        # Deterministic id: re-running after a crash overwrites instead of duplicating
+                        id=uuid.uuid5(uuid.NAMESPACE_URL, f"autism-support/summary/{user_id}/{w[0].id}/{w[-1].id}").hex,
+                        vector=vector,
+                        payload=build_memory_payload(user_id, SUMMARY_TYPE, data, end)[1]
+                    ))
+                # Write summaries before deleting what they replace
+                qdr.upsert(collection_name=collection, points=points)
+                qdr.delete(collection_name=collection, points_selector=PointIdsList(points=[p.id for w in windows for p in w]))
+                stats["summaries_created"] = len(points)
+                stats["messages_deleted"] = sum(len(w) for w in windows)
+            else:
+                print(f"⚠️ Could not embed summaries for {user_id}; leaving raw messages in place")
+
+        # 2) Keep only the newest MAX_SUMMARIES summaries
+        summaries = scroll_type(SUMMARY_TYPE)
+        if len(summaries) > MAX_SUMMARIES:
+            expired = summaries[:len(summaries) - MAX_SUMMARIES]
+            qdr.delete(collection_name=collection, points_selector=PointIdsList(points=[p.id for p in expired]))
+            stats["summaries_deleted"] = len(expired)
+
+    # 3) Per-type retention for insight-style memories
+    for memory_type, days in RETENTION_DAYS.items():
+        name = f"{memory_type}_{user_id}"
+        if days <= 0 or not qdr.collection_exists(name):
+            continue
+        expiry = Filter(
+            must=[FieldCondition(key="timestamp", range=DatetimeRange(lt=datetime.now() - timedelta(days=days)))],
+            must_not=[HasIdCondition(has_id=[memory_doc_id(user_id, memory_type)])]
+        )
+        expired = qdr.count(name, count_filter=expiry, exact=True).count
+        if expired:
+            qdr.delete(collection_name=name, points_selector=FilterSelector(filter=expiry))
+        stats["expired"][memory_type] = expired
+
+    print(
+        f"🧹 Compacted memory for {user_id}: {stats['messages_deleted']} messages → {stats['summaries_created']} summaries, "
+        f"{stats['summaries_deleted']} old summaries and {sum(stats['expired'].values())} expired points removed"
+    )
+    return stats
+
+
+def memory_user_ids(qdr) -> List[str]:
+    """Users that have any conversation memory collection."""
+    prefixes = ["chat_history_"] + [f"{t}_" for t in RETENTION_DAYS]
+    users = set()
+    for collection in qdr.get_collections().collections:
+        for prefix in prefixes:
+            if collection.name.startswith(prefix):
+                users.add(collection.name[len(prefix):])
+                break
+    return sorted(users)
+
+
+def compact_all(user_id: Optional[str] = None, use_llm: bool = True) -> List[Dict]:
+    """Compact one user's memory, or every user's (through the process-wide Qdrant client)."""
+    from rag.qdrant_client import get_qdrant
+    try:
+        qdr = get_qdrant()
+    except Exception as e:
+        print(f"❌ Memory compaction skipped, Qdrant unavailable: {e}")
+        return []
+    results = []
+    for uid in ([user_id] if user_id else memory_user_ids(qdr)):
+        try:
+            results.append(compact_user_memory(uid, use_llm=use_llm, qdr=qdr))
+        except Exception as e:
+            print(f"❌ Memory compaction failed for {uid}: {e}")
+    return results
+
+
+def start_compaction_scheduler(interval_hours: float = None) -> Optional[threading.Thread]:
+    """Compact all users every interval_hours on a daemon thread (MEMORY_COMPACTION_HOURS; 0 disables)."""
+    if interval_hours is None:
+        interval_hours = float(os.getenv("MEMORY_COMPACTION_HOURS", "0"))
+    if interval_hours <= 0:
+        return None
+
+    def run():
+        while True:
+            time.sleep(interval_hours * 3600)
+            try:
+                compact_all()
+            except Exception as e:
+                # Keep the schedule alive through a failed pass
+                print(f"❌ Memory compaction pass failed: {e}")
+
+    thread = threading.Thread(target=run, name="memory-compaction", daemon=True)
+    thread.start()
+    print(f"🧹 Memory compaction scheduled every {interval_hours:g}h")
+    return thread
+
+
+# CLI helper
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compact conversation memory and apply retention.")
+    parser.add_argument("--user", default=None, help="Only compact this user id")
+    parser.add_argument("--every", type=float, default=0, help="Repeat every N hours instead of running once")
+    parser.add_argument("--no-llm", action="store_true", help="Use extractive summaries (no OpenAI calls)")
+    parser.add_argument("--local", action="store_true", help="Use embedded ./qdrant_storage (only while the app is not running)")
+    args = parser.parse_args()
+
+    from rag.qdrant_client import qdrant_server_configured
+    if not qdrant_server_configured() and not args.local:
+        parser.error("set QDRANT_HOST to a Qdrant server, or pass --local when the app is not running "
+                     "(embedded storage can only be opened by one process)")
+
+    while True:
+        compact_all(args.user, use_llm=not args.no_llm)
+        if args.every <= 0:
+            break
+        time.sleep(args.every * 3600)
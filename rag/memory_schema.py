@@ -0,0 +1,193 @@
+"""
+Memory Schema for Autism Support App
+Versioned, compact payloads for conversation memory points, the text they are embedded from, and migration of older points.
+
+Run `python -m rag.memory_schema [--user USER_ID] [--keep-vectors]` to migrate
+stored points to the current schema. It needs QDRANT_HOST, or --local while the
+app is not running.
+"""
+
+import argparse
+import json
+from typing import Dict, List, Optional, Tuple
+
+MEMORY_SCHEMA_VERSION = 2
+MEMORY_TYPES = ["chat_history", "insights", "prefs", "learning"]
+
+# Schema 2 payload:
+#   v, type, user_id, timestamp, source            - every point
+#   text                                           - messages and summaries: the embedded text, stored once
+#   role, context_path, conversation_type          - chat_history
+#   message_count, start, end                      - chat_summary
+#   data                                           - insights/prefs/learning: the merged document (text is derived)
+# Schema 1 (unversioned) stored content=f"{type}: {str(data)}" plus the full data dict.
+
+
+def memory_text(memory_type: str, data) -> str:
+    """The semantic text a memory is embedded from - no ids, timestamps, sources or suggestions."""
+    if data is None:
+        return ""
+    if isinstance(data, str):
+        return data
+    if memory_type == "chat_history":
+        return data.get("content") or ""
+    if memory_type == "chat_summary":
+        return data.get("summary") or ""
+    if memory_type == "insights":
+        parts = []
+        if data.get("topics_discussed"):
+            parts.append("Topics: " + ", ".join(data["topics_discussed"]))
+        if data.get("user_concerns"):
+            parts.append("Concerns: " + "; ".join(data["user_concerns"]))
+        if data.get("successful_strategies"):
+            parts.append("Helpful strategies: " + "; ".join(data["successful_strategies"]))
+        progress = data.get("patient_progress") or {}
+        if progress.get("improvements"):
+            parts.append("Progress: " + "; ".join(progress["improvements"]))
+        if progress.get("goals"):
+            parts.append("Goals: " + "; ".join(progress["goals"]))
+        return "\n".join(parts)
+    if memory_type == "prefs" and isinstance(data, dict):
+        return "\n".join(f"{k.replace('_', ' ')}: {'; '.join(v)}" for k, v in data.items() if v)
+    if memory_type == "learning" and isinstance(data, list):
+        return "; ".join(str(item) for item in data)
+    return json.dumps(data, default=str)
+
+
+def build_memory_payload(user_id: str, memory_type: str, data, timestamp: str) -> Tuple[str, Dict]:
+    """Return (embedding text, schema-2 payload) for a memory record."""
+    text = memory_text(memory_type, data)
+    payload = {
+        "v": MEMORY_SCHEMA_VERSION,
+        "type": memory_type,
+        "user_id": user_id,
+        "timestamp": timestamp,
+        "source": "conversation_memory"
+    }
+    if memory_type == "chat_history" and isinstance(data, dict):
+        payload.update({
+            "text": text,
+            "role": data.get("role", "unknown"),
+            "context_path": data.get("context_path") or "",
+            "conversation_type": data.get("conversation_type", "general"),
+            # Order by when the message was sent, not when it was persisted
+            "timestamp": data.get("timestamp") or timestamp
+        })
+    elif memory_type == "chat_summary" and isinstance(data, dict):
+        payload.update({
+            "text": text,
+            "message_count": data.get("message_count", 0),
+            "start": data.get("start", ""),
+            "end": data.get("end", "")
+        })
+    else:
+        payload["data"] = data
+    return text, payload
+
+
+def read_memory(payload: Dict) -> Dict:
+    """Normalize a schema-1 or schema-2 payload to {type, user_id, timestamp, text, data}."""
+    payload = payload or {}
+    memory_type = payload.get("type", "unknown")
+    if payload.get("v", 1) >= 2:
+        if memory_type == "chat_history":
+            text = payload.get("text", "")
+            data = {
+                "role": payload.get("role", "unknown"),
+                "content": text,
+                "timestamp": payload.get("timestamp", ""),
+                "context_path": payload.get("context_path", ""),
+                "conversation_type": payload.get("conversation_type", "general")
+            }
+        elif memory_type == "chat_summary":
+            text = payload.get("text", "")
+            data = {
+                "summary": text,
+                "message_count": payload.get("message_count", 0),
+                "start": payload.get("start", ""),
+                "end": payload.get("end", "")
+            }
+        else:
+            data = payload.get("data")
+            text = memory_text(memory_type, data)
+    else:
+        data = payload.get("data")
+        text = memory_text(memory_type, data) if data is not None else payload.get("content", "")
+    return {
+        "type": memory_type,
+        "user_id": payload.get("user_id", ""),
+        "timestamp": payload.get("timestamp", ""),
+        "text": text,
+        "data": data
+    }
+
+
+def migrate_payload(payload: Dict) -> Optional[Tuple[str, Dict]]:
+    """(text, schema-2 payload) for an older payload, or None if it is already current."""
+    if (payload or {}).get("v", 1) >= MEMORY_SCHEMA_VERSION:
+        return None
+    record = read_memory(payload)
+    return build_memory_payload(record["user_id"], record["type"], record["data"], record["timestamp"])
+
+
+def migrate_memory(user_id: str = None, keep_vectors: bool = False, batch_size: int = 64) -> Dict[str, int]:
+    """
+    Rewrite older memory points to the current schema. By default they are
+    re-embedded from their semantic text; keep_vectors only rewrites payloads.
+    """
+    from qdrant_client.models import PointStruct
+    from rag.qdrant_client import get_qdrant, _ensure_memory_indexes
+    from rag.embeddings import embed
+
+    qdr = get_qdrant()
+    if not qdr:
+        return {}
+    prefixes = [f"{t}_" for t in MEMORY_TYPES]
+    names = [
+        c.name for c in qdr.get_collections().collections
+        if any(c.name.startswith(p) and (user_id is None or c.name == f"{p}{user_id}") for p in prefixes)
+    ]
+
+    migrated = {}
+    for name in names:
+        _ensure_memory_indexes(qdr, name)
+        count, offset = 0, None
+        while True:
+            points, offset = qdr.scroll(collection_name=name, limit=batch_size, offset=offset, with_payload=True, with_vectors=False)
+            pending = [(p.id, migrate_payload(p.payload)) for p in points]
+            pending = [(pid, m) for pid, m in pending if m]
+            if pending:
+                if keep_vectors:
+                    for pid, (_, payload) in pending:
+                        qdr.overwrite_payload(collection_name=name, payload=payload, points=[pid])
+                else:
+                    vectors = embed([text or payload["type"] for _, (text, payload) in pending])
+                    if len(vectors) != len(pending):
+                        print(f"❌ Could not embed {len(pending)} points in {name}; stopping")
+                        break
+                    qdr.upsert(collection_name=name, points=[
+                        PointStruct(id=pid, vector=vector, payload=payload)
+                        for (pid, (_, payload)), vector in zip(pending, vectors)
+                    ])
+                count += len(pending)
+            if offset is None:
+                break
+        migrated[name] = count
+        print(f"✅ Migrated {count} points in {name} to memory schema v{MEMORY_SCHEMA_VERSION}")
+    return migrated
+
+
+# CLI helper
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Migrate conversation memory points to the current payload schema.")
+    parser.add_argument("--user", default=None, help="Only migrate this user id")
+    parser.add_argument("--keep-vectors", action="store_true", help="Rewrite payloads only (no re-embedding)")
+    parser.add_argument("--local", action="store_true", help="Use embedded ./qdrant_storage (only while the app is not running)")
+    args = parser.parse_args()
+
+    from rag.qdrant_client import qdrant_server_configured
+    if not qdrant_server_configured() and not args.local:
+        parser.error("set QDRANT_HOST to a Qdrant server, or pass --local when the app is not running "
+                     "(embedded storage can only be opened by one process)")
+
+    migrate_memory(args.user, keep_vectors=args.keep_vectors)
@@ -0,0 +1,248 @@
+"""
+Memory Write Queue for Autism Support App
+Write-behind persistence of conversation memory: batched embedding and upserts off the request path, journaled to disk.
+"""
+
+import atexit
+import json
+import os
+import threading
+import time
+import uuid
+from datetime import datetime
+from typing import Dict, List
+
+from utils.tracing import span
+
+DEFAULT_JOURNAL_PATH = os.path.join("data", "memory_journal.jsonl")
+MAX_BATCH_SIZE = int(os.getenv("MEMORY_WRITE_BATCH_SIZE", "32"))
+FLUSH_INTERVAL_SECONDS = float(os.getenv("MEMORY_WRITE_FLUSH_SECONDS", "2.0"))
+# A record whose payload keeps being rejected is dropped after this many flushes
+MAX_ATTEMPTS = 5
+# Outages (Qdrant unreachable, embedding errors) back off up to this long; their records are kept
+MAX_BACKOFF_SECONDS = float(os.getenv("MEMORY_WRITE_MAX_BACKOFF_SECONDS", "300"))
+
+
+class MemoryWriteQueue:
+    """
+    Buffers memory records and persists them in batches from a background thread.
+
+    Every record is appended to a local journal before enqueue returns, and the
+    journal is rewritten to the still-unstored records after each flush, so
+    anything not yet in Qdrant is replayed on the next start. Record ids double
+    as point ids, which makes a replayed record overwrite rather than duplicate.
+    Transient failures only delay records (with exponential backoff); records
+    are dropped only after being rejected MAX_ATTEMPTS times.
+    """
+
+    def __init__(
+        self,
+        journal_path: str = DEFAULT_JOURNAL_PATH,
+        max_batch_size: int = MAX_BATCH_SIZE,
+        flush_interval: float = FLUSH_INTERVAL_SECONDS
+    ):
+        self.journal_path = journal_path
+        self.max_batch_size = max_batch_size
+        self.flush_interval = flush_interval
+        self._pending: List[Dict] = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopped = False
+        self._worker = None
+        self._backoff = 0.0
+        self._retry_at = 0.0
+        self.stats = {"enqueued": 0, "stored": 0, "batches": 0, "failed_batches": 0, "postponed": 0, "dropped": 0, "replayed": 0}
+
+        os.makedirs(os.path.dirname(journal_path) or ".", exist_ok=True)
+        self._replay_journal()
+
+    def enqueue(self, user_id: str, memory_type: str, data: Dict, record_id: str = None) -> bool:
+        """
+        Journal a memory record and schedule it for storage; returns once it is durable locally.
+        Pass a stable record_id to replace an earlier record instead of adding one.
+        """
+        record = {
+            "id": record_id or uuid.uuid4().hex,
+            "user_id": user_id,
+            "memory_type": memory_type,
+            "data": data,
+            "timestamp": datetime.now().isoformat(),
+            "attempts": 0
+        }
+        try:
+            with self._lock:
+                with open(self.journal_path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(record, default=str) + "\n")
+                self._pending.append(record)
+                self.stats["enqueued"] += 1
+                full = len(self._pending) >= self.max_batch_size
+        except Exception as e:
+            print(f"❌ Error journaling {memory_type} memory: {e}")
+            return False
+
+        self._ensure_worker()
+        if full:
+            self._wake.set()
+        return True
+
+    def flush(self) -> int:
+        """Store everything pending now, in batches; returns the number of records stored."""
+        from rag.qdrant_client import get_qdrant, store_conversation_memories
+
+        stored = 0
+        with self._flush_lock:
+            # An unreachable store is not the records' fault: keep them (and the journal) as they are
+            try:
+                get_qdrant()
+            except Exception as e:
+                self._postpone(f"Qdrant unavailable: {e}")
+                return 0
+
+            while True:
+                with self._lock:
+                    batch = self._pending[:self.max_batch_size]
+                    self._pending = self._pending[self.max_batch_size:]
+                if not batch:
+                    break
+
+                with span("memory_flush", records=len(batch)):
+                    retry, rejected = store_conversation_memories(batch)
+
+                with self._lock:
+                    self.stats["batches"] += 1
+                    self.stats["stored"] += len(batch) - len(retry) - len(rejected)
+                    stored += len(batch) - len(retry) - len(rejected)
+                    # Only rejections count against a record; transient failures keep it as is
+                    kept = []
+                    for record in rejected:
+                        record["attempts"] = record.get("attempts", 0) + 1
+                        if record["attempts"] < MAX_ATTEMPTS:
+                            kept.append(record)
+                        else:
+                            self.stats["dropped"] += 1
+                            print(f"⚠️ Dropping {record['memory_type']} memory {record['id']} for {record['user_id']} "
+                                  f"after {MAX_ATTEMPTS} rejections: {json.dumps(record['data'], default=str)[:200]}")
+                    if retry or rejected:
+                        self.stats["failed_batches"] += 1
+                    else:
+                        self._backoff = 0.0
+                        self._retry_at = 0.0
+                    self._pending = retry + kept + self._pending
+                    self._rewrite_journal()
+
+                if retry:
+                    self._postpone(f"{len(retry)} records hit a transient error")
+                # Leave failed records for a later flush instead of spinning on them
+                if retry or rejected:
+                    break
+        return stored
+
+    def _postpone(self, reason: str):
+        """Back off exponentially before the next background flush; pending records stay journaled."""
+        with self._lock:
+            self._backoff = min(MAX_BACKOFF_SECONDS, self._backoff * 2 if self._backoff else self.flush_interval)
+            self._retry_at = time.time() + self._backoff
+            self.stats["postponed"] += 1
+            backoff = self._backoff
+        print(f"⚠️ Memory flush postponed {backoff:.0f}s: {reason}")
+
+    def _due(self) -> bool:
+        with self._lock:
+            return bool(self._pending) and time.time() >= self._retry_at
+
+    def pending_count(self) -> int:
+        with self._lock:
+            return len(self._pending)
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self.stats)
+            stats["pending"] = len(self._pending)
+            stats["backoff_seconds"] = self._backoff
+        return stats
+
+    def close(self):
+        """Stop the worker and flush what is left (registered with atexit)."""
+        self._stopped = True
+        self._wake.set()
+        if self._worker:
+            self._worker.join(timeout=self.flush_interval + 5)
+        if self.pending_count():
+            self.flush()
+
+    def _ensure_worker(self):
+        with self._lock:
+            if self._worker is not None or self._stopped:
+                return
+            self._worker = threading.Thread(target=self._run, name="memory-writer", daemon=True)
+            self._worker.start()
+
+    def _run(self):
+        while not self._stopped:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            if self._stopped:
+                break
+            try:
+                if self._due():
+                    self.flush()
+            except Exception as e:
+                print(f"❌ Memory write flush failed: {e}")
+
+    def _replay_journal(self):
+        """Load records left over from a previous run."""
+        if not os.path.exists(self.journal_path):
+            return
+        records = {}
+        try:
+            with open(self.journal_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        record = json.loads(line)
+                        records[record["id"]] = record
+                    except Exception:
+                        # A torn final line from a crash mid-write
+                        continue
+        except Exception as e:
+            print(f"⚠️ Could not read memory journal: {e}")
+            return
+
+        if records:
+            self._pending = list(records.values())
+            self.stats["replayed"] = len(records)
+            print(f"🔁 Replaying {len(records)} unsaved memory records from journal")
+            self._ensure_worker()
+
+    def _rewrite_journal(self):
+        """Replace the journal with the pending records. Caller holds self._lock."""
+        try:
+            tmp_path = self.journal_path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                for record in self._pending:
+                    f.write(json.dumps(record, default=str) + "\n")
+            os.replace(tmp_path, self.journal_path)
+        except Exception as e:
+            print(f"⚠️ Could not rewrite memory journal: {e}")
+
+
+_queue = None
+_queue_lock = threading.Lock()
+
+
+def get_memory_write_queue() -> MemoryWriteQueue:
+    """Process-wide queue, created (and its journal replayed) on first use."""
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            _queue = MemoryWriteQueue()
+            atexit.register(_queue.close)
+        return _queue
+
+
+def enqueue_conversation_memory(user_id: str, memory_type: str, data: Dict, record_id: str = None) -> bool:
+    """Write-behind replacement for store_conversation_memory."""
+    return get_memory_write_queue().enqueue(user_id, memory_type, data, record_id=record_id)
@@ -3,38 +3,79 @@ Qdrant Client for Autism Support App
 Replaces LlamaIndex with production-ready vector database.
 """
 import os
+import threading
 from qdrant_client import QdrantClient
 from qdrant_client.models import Distance, VectorParams, Filter, FieldCondition, MatchAny
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
+from utils.tracing import span
+
+class _SerializedClient:
+    """
+    Embedded (local-mode) Qdrant is neither thread-safe nor shareable between
+    clients, so the process shares one and its calls run one at a time.
+    """
+
+    def __init__(self, client: QdrantClient):
+        self._client = client
+        self._lock = threading.RLock()
+
+    def __getattr__(self, item):
+        attr = getattr(self._client, item)
+        if not callable(attr):
+            return attr
+
+        def call(*args, **kwargs):
+            with self._lock:
+                return attr(*args, **kwargs)
+        return call
+
+
+_shared_client = None
+_shared_client_lock = threading.Lock()
+
+def qdrant_server_configured() -> bool:
+    """Whether QDRANT_HOST points at a Qdrant server (safe to share between processes)."""
+    return bool(os.getenv("QDRANT_HOST"))
 
 def get_qdrant():
-    """Get Qdrant client connection."""
-    # Try local storage first, then fallback to in-memory
-    try:
-        # Use local storage directory
-        storage_path = os.path.join(os.getcwd(), "qdrant_storage")
-        client = QdrantClient(path=storage_path)
-        client.get_collections()
-        print(f"✅ Connected to local Qdrant storage at {storage_path}")
-        return client
-    except Exception as e:
-        print(f"⚠️ Local storage failed, using in-memory: {e}")
-        try:
-            # Fallback to in-memory storage
-            client = QdrantClient(":memory:")
+    """
+    Process-wide Qdrant client: the server at QDRANT_HOST if set, else the
+    embedded store in ./qdrant_storage (QDRANT_LOCATION=":memory:" for an
+    in-memory one). Raises if the store can't be opened, e.g. when another
+    process holds the embedded storage lock, rather than handing out an empty
+    throwaway store.
+    """
+    global _shared_client
+    with _shared_client_lock:
+        if _shared_client is not None:
+            return _shared_client
+
+        if qdrant_server_configured():
+            client = QdrantClient(
+                host=os.getenv("QDRANT_HOST"),
+                port=int(os.getenv("QDRANT_PORT", "6333")),
+                api_key=os.getenv("QDRANT_API_KEY") or None
+            )
+            client.get_collections()
+            print(f"✅ Connected to Qdrant server at {os.getenv('QDRANT_HOST')}")
+            _shared_client = client
+        elif os.getenv("QDRANT_LOCATION") == ":memory:":
+            _shared_client = _SerializedClient(QdrantClient(":memory:"))
             print("✅ Using in-memory Qdrant storage")
-            return client
-        except Exception as e2:
-            print(f"❌ Failed to create Qdrant client: {e2}")
-            return None
+        else:
+            storage_path = os.path.join(os.getcwd(), "qdrant_storage")
+            try:
+                client = QdrantClient(path=storage_path)
+            except Exception as e:
+                raise RuntimeError(f"Could not open local Qdrant storage at {storage_path}: {e}") from e
+            print(f"✅ Connected to local Qdrant storage at {storage_path}")
+            _shared_client = _SerializedClient(client)
+        return _shared_client
 
 def ensure_collection(name: str, size: int = 1536):
     """Ensure collection exists with proper configuration."""
-    qdr = get_qdrant()
-    if not qdr:
-        return None
-    
     try:
+        qdr = get_qdrant()
         # Check if collection exists
         collections = qdr.get_collections()
         collection_names = [c.name for c in collections.collections]
@@ -62,11 +103,8 @@ def search_with_user_filter(
     k: int = 8
 ) -> List[Dict]:
     """Search with optional user filtering."""
-    qdr = get_qdrant()
-    if not qdr:
-        return []
-    
     try:
+        qdr = get_qdrant()
         # Build filter for user isolation
         query_filter = None
         if user_id:
@@ -75,13 +113,14 @@ def search_with_user_filter(
             )
         
         # Perform search
-        results = qdr.search(
-            collection_name=collection_name,
-            query_vector=query_vector,
-            query_filter=query_filter,
-            with_payload=True,
-            limit=k
-        )
+        with span("qdrant_search", collection=collection_name):
+            results = qdr.search(
+                collection_name=collection_name,
+                query_vector=query_vector,
+                query_filter=query_filter,
+                with_payload=True,
+                limit=k
+            )
         
         # Format results
         formatted_results = []
@@ -106,11 +145,8 @@ def search_with_diversity(
     min_sources: int = 2
 ) -> List[Dict]:
     """Search with diversity awareness to ensure results from different sources."""
-    qdr = get_qdrant()
-    if not qdr:
-        return []
-    
     try:
+        qdr = get_qdrant()
         # Build filter for user isolation
         query_filter = None
         if user_id:
@@ -119,13 +155,14 @@ def search_with_diversity(
             )
         
         # Get more candidates than needed for diversity selection
-        candidates = qdr.search(
-            collection_name=collection_name,
-            query_vector=query_vector,
-            query_filter=query_filter,
-            with_payload=True,
-            limit=k * 3  # Get 3x more candidates
-        )
+        with span("qdrant_search", collection=collection_name):
+            candidates = qdr.search(
+                collection_name=collection_name,
+                query_vector=query_vector,
+                query_filter=query_filter,
+                with_payload=True,
+                limit=k * 3  # Get 3x more candidates
+            )
         
         if not candidates:
             return []
@@ -206,9 +243,10 @@ def store_conversation_memory(user_id: str, memory_type: str, data: Dict):
             print(f"❌ Failed to ensure collection: {collection_name}")
             return False
         
-        # Create content for embedding
-        content = f"{memory_type}: {str(data)}"
-        vector = embed_single(content)
+        # Embed only the semantic text; payload follows the versioned memory schema
+        from .memory_schema import build_memory_payload
+        content, payload = build_memory_payload(user_id, memory_type, data, datetime.now().isoformat())
+        vector = embed_single(content or memory_type)
         
         if not vector:
             print(f"❌ Failed to generate embedding for memory")
@@ -218,14 +256,7 @@ def store_conversation_memory(user_id: str, memory_type: str, data: Dict):
         point = PointStruct(
             id=uuid.uuid4().hex,
             vector=vector,
-            payload={
-                "type": memory_type,
-                "user_id": user_id,
-                "content": content,
-                "data": data,
-                "timestamp": datetime.now().isoformat(),
-                "source": "conversation_memory"
-            }
+            payload=payload
         )
         
         # Insert into Qdrant
@@ -237,6 +268,173 @@ def store_conversation_memory(user_id: str, memory_type: str, data: Dict):
         print(f"❌ Error storing conversation memory: {e}")
         return False
 
+def _is_permanent_store_error(e: Exception) -> bool:
+    """Whether a store error rejects the data itself (payload/schema) rather than an outage or rate limit."""
+    status = getattr(e, "status_code", None)
+    if status is not None:
+        return 400 <= status < 500 and status not in (408, 429)
+    # Pydantic validation errors are ValueErrors too
+    return isinstance(e, (ValueError, TypeError))
+
+def store_conversation_memories(records: List[Dict]) -> Tuple[List[Dict], List[Dict]]:
+    """
+    Store many memory records with one embedding request and one upsert per collection.
+    
+    Each record has id, user_id, memory_type, data and timestamp; the id is used as
+    the point id, so storing a record twice overwrites it. Returns (retry, rejected):
+    records that hit a transient error (embedding provider, Qdrant unreachable) and
+    records whose payload or schema was refused.
+    """
+    if not records:
+        return [], []
+    try:
+        from .embeddings import embed
+        from qdrant_client.models import PointStruct
+        
+        from .memory_schema import build_memory_payload
+    except Exception as e:
+        print(f"❌ Error storing conversation memories: {e}")
+        return list(records), []
+    
+    rejected = []
+    buildable = []
+    for record in records:
+        try:
+            buildable.append((record, build_memory_payload(record["user_id"], record["memory_type"], record["data"], record["timestamp"])))
+        except Exception as e:
+            print(f"❌ Rejected {record.get('memory_type')} memory {record.get('id')}: {e}")
+            rejected.append(record)
+    if not buildable:
+        return [], rejected
+    
+    try:
+        vectors = embed([text or record["memory_type"] for record, (text, _) in buildable])
+        if len(vectors) != len(buildable):
+            print(f"❌ Failed to generate embeddings for {len(buildable)} memories")
+            return [record for record, _ in buildable], rejected
+        
+        # Group points by per-user collection
+        by_collection: Dict[str, List] = {}
+        for (record, (_, payload)), vector in zip(buildable, vectors):
+            try:
+                point = PointStruct(id=record["id"], vector=vector, payload=payload)
+            except Exception as e:
+                print(f"❌ Rejected {record['memory_type']} memory {record['id']}: {e}")
+                rejected.append(record)
+                continue
+            by_collection.setdefault(f"{record['memory_type']}_{record['user_id']}", []).append((record, point))
+        
+        qdr = get_qdrant()
+        existing = {c.name for c in qdr.get_collections().collections}
+    except Exception as e:
+        print(f"❌ Error storing conversation memories: {e}")
+        return [record for record, _ in buildable if record not in rejected], rejected
+    
+    retry = []
+    for name, items in by_collection.items():
+        try:
+            if name not in existing:
+                qdr.create_collection(
+                    collection_name=name,
+                    vectors_config=VectorParams(size=1536, distance=Distance.COSINE)
+                )
+                _ensure_memory_indexes(qdr, name)
+                print(f"✅ Created collection: {name}")
+            qdr.upsert(collection_name=name, points=[point for _, point in items])
+        except Exception as e:
+            permanent = _is_permanent_store_error(e)
+            print(f"❌ Error storing memories in {name}{' (rejected)' if permanent else ''}: {e}")
+            (rejected if permanent else retry).extend(record for record, _ in items)
+    
+    print(f"✅ Stored {len(records) - len(retry) - len(rejected)} memories across {len(by_collection)} collections")
+    return retry, rejected
+
+def memory_doc_id(user_id: str, memory_type: str) -> str:
+    """Stable point id for a user's single merged memory document (insights, prefs, learning)."""
+    import uuid
+    return uuid.uuid5(uuid.NAMESPACE_URL, f"autism-support/{memory_type}/{user_id}").hex
+
+def get_conversation_memory_doc(user_id: str, memory_type: str) -> Optional[Dict]:
+    """Payload of the user's merged memory document by id lookup (no embedding or search), or None."""
+    try:
+        qdr = get_qdrant()
+        if not qdr:
+            return None
+        with span("qdrant_retrieve", collection=f"{memory_type}_{user_id}"):
+            points = qdr.retrieve(
+                collection_name=f"{memory_type}_{user_id}",
+                ids=[memory_doc_id(user_id, memory_type)],
+                with_payload=True,
+                with_vectors=False
+            )
+        return (points[0].payload or {}) if points else None
+    except Exception as e:
+        print(f"⚠️ Could not read {memory_type} document for {user_id}: {e}")
+        return None
+
+_memory_indexed = set()
+
+def _ensure_memory_indexes(qdr, collection_name: str):
+    """Payload indexes on the typed memory fields (timestamp for ordered scrolls, type and role for filters)."""
+    if collection_name in _memory_indexed:
+        return
+    try:
+        import warnings
+        from qdrant_client.models import PayloadSchemaType
+        with warnings.catch_warnings():
+            # Local (embedded) Qdrant ignores payload indexes and warns about it
+            warnings.simplefilter("ignore", UserWarning)
+            qdr.create_payload_index(collection_name, field_name="timestamp", field_schema=PayloadSchemaType.DATETIME)
+            qdr.create_payload_index(collection_name, field_name="type", field_schema=PayloadSchemaType.KEYWORD)
+            qdr.create_payload_index(collection_name, field_name="role", field_schema=PayloadSchemaType.KEYWORD)
+        _memory_indexed.add(collection_name)
+    except Exception as e:
+        print(f"⚠️ Could not index memory fields on {collection_name}: {e}")
+
+def get_recent_conversation_memory(user_id: str, limit: int = 25, memory_type: str = "chat_history") -> List[Dict]:
+    """
+    The user's last limit memories in chronological order, read with a
+    timestamp-ordered scroll (no embedding or vector search).
+    """
+    try:
+        from qdrant_client.models import OrderBy, Direction
+        
+        collection_name = f"{memory_type}_{user_id}"
+        qdr = get_qdrant()
+        if not qdr or not qdr.collection_exists(collection_name):
+            return []
+        _ensure_memory_indexes(qdr, collection_name)
+        
+        with span("qdrant_scroll", collection=collection_name):
+            points, _ = qdr.scroll(
+                collection_name=collection_name,
+                scroll_filter=Filter(must=[
+                    FieldCondition(key="user_id", match=MatchAny(any=[user_id])),
+                    # Skips chat_summary points written by memory compaction
+                    FieldCondition(key="type", match=MatchAny(any=[memory_type]))
+                ]),
+                order_by=OrderBy(key="timestamp", direction=Direction.DESC),
+                limit=limit,
+                with_payload=True,
+                with_vectors=False
+            )
+        return [{"payload": p.payload or {}, "id": p.id} for p in reversed(points)]
+        
+    except Exception as e:
+        print(f"⚠️ Could not load recent {memory_type} for {user_id}: {e}")
+        return []
+
+def count_conversation_memory(user_id: str, memory_type: str = "chat_history") -> int:
+    """Number of stored memories of one type for a user (0 if the collection is missing)."""
+    try:
+        qdr = get_qdrant()
+        if not qdr:
+            return 0
+        return qdr.count(collection_name=f"{memory_type}_{user_id}", exact=True).count
+    except Exception as e:
+        print(f"⚠️ Could not count {memory_type} memory for {user_id}: {e}")
+        return 0
+
 def search_conversation_memory(user_id: str, query: str, memory_type: str = None, limit: int = 5) -> List[Dict]:
     """Search conversation memory collections for relevant information."""
     try:
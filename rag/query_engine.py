@@ -9,11 +9,13 @@ from llama_index.embeddings.openai import OpenAIEmbedding
 # rag/query_engine.py  (built-in disk store version)
 from typing import Dict, List
 
+from utils.lazy_services import get_openai_base_url
+
 VECTOR_DIR = "vector_index/"  # must match build_index.py
 
 # Global LLM / embedding
-Settings.llm         = OpenAI(model="gpt-4o-mini")
-Settings.embed_model = OpenAIEmbedding(model="text-embedding-3-small")
+Settings.llm         = OpenAI(model="gpt-4o-mini", api_base=get_openai_base_url())
+Settings.embed_model = OpenAIEmbedding(model="text-embedding-3-small", api_base=get_openai_base_url())
 
 
 def query_index(query: str, k: int = 4, debug: bool = True) -> Dict:
@@ -7,6 +7,12 @@ from typing import Dict, Tuple, List
 # from app.services.knowledge_adapter import KnowledgeAdapter  # Commented out - class doesn't exist
 from rag.qdrant_client import search_with_user_filter
 from rag.embeddings import embed_single
+from utils.text_analyzer import KEYWORD_SETS, analyze, match_keywords
+from knowledge.context_prefetcher import get_context_prefetcher, take_prefetched
+from knowledge.search_result_cache import normalize_query
+
+# Guided flows answer from Mongo and blend in a few vector results
+GUIDED_FLOWS = ["diagnosed_no", "diagnosed_yes", "adult_self"]
 
 class RetrievalRouter:
     """Routes queries between structured MongoDB and vector search."""
@@ -14,7 +20,7 @@ class RetrievalRouter:
     def __init__(self, ka=None):  # ka parameter made optional since KnowledgeAdapter doesn't exist
         self.ka = ka
         # self.safety = set(ka.get_safety_rules().get("critical_terms", []))  # Commented out - ka doesn't exist
-        self.safety = set()  # Empty set for now
+        self.safety = set(KEYWORD_SETS["safety"])  # Empty set for now
 
     def route(self, user_query: str, user_profile: Dict, context_path: str) -> Tuple[str, List]:
         """
@@ -28,12 +34,12 @@ class RetrievalRouter:
         """
         
         # 1) Safety first - check for critical terms
-        if any(term.lower() in user_query.lower() for term in self.safety):
+        if self._safety_terms(user_query):
             print(f"🚨 Safety term detected in query: {user_query}")
             return "mongo_only", []
 
         # 2) If inside a guided step, prefer mongo + enrich with vector
-        if context_path and any(flow in context_path for flow in ["diagnosed_no", "diagnosed_yes", "adult_self"]):
+        if self._is_guided(context_path):
             print(f"🔄 Guided conversation detected: {context_path}")
             # Get vector results to enrich the guided response
             vector_results = self._get_vector_results(user_query, user_profile, limit=3)
@@ -44,7 +50,33 @@ class RetrievalRouter:
         vector_results = self._get_vector_results(user_query, user_profile, limit=6)
         return "vector_only", vector_results
 
+    @staticmethod
+    def _is_guided(context_path: str) -> bool:
+        return bool(context_path) and any(flow in context_path for flow in GUIDED_FLOWS)
+
+    @staticmethod
+    def _prefetch_key(query: str, user_profile: Dict, limit: int) -> Tuple:
+        return (normalize_query(query), user_profile.get("user_id", "public"), limit)
+
+    def prefetch_vector_results(self, query: str, user_profile: Dict, context_path: str):
+        """Warm the KB results route() would fetch for query on context_path (runs on the prefetch pool)."""
+        prefetcher = get_context_prefetcher()
+        if not prefetcher or not normalize_query(query):
+            return
+        limit = 3 if self._is_guided(context_path) else 6
+        results = self._search_vectors(query, user_profile, limit)
+        if results:
+            prefetcher.put("kb", self._prefetch_key(query, user_profile, limit), results)
+
     def _get_vector_results(self, query: str, user_profile: Dict, limit: int = 6) -> List:
+        """Vector results for query, using prefetched results once if the same (normalized) query was warmed."""
+        prefetched = take_prefetched("kb", self._prefetch_key(query, user_profile, limit))
+        if prefetched is not None:
+            print(f"⚡ Using prefetched vector results for: {query}")
+            return prefetched
+        return self._search_vectors(query, user_profile, limit)
+
+    def _search_vectors(self, query: str, user_profile: Dict, limit: int = 6) -> List:
         
         try:
             # Generate embedding for query
@@ -118,11 +150,17 @@ class RetrievalRouter:
 
     def get_safety_warning(self, query: str) -> str:
         """Get safety warning if critical terms detected."""
-        detected_terms = [term for term in self.safety if term.lower() in query.lower()]
+        detected_terms = self._safety_terms(query)
         if detected_terms:
             return f"⚠️ Safety Alert: Detected critical terms: {', '.join(detected_terms)}. Please contact a healthcare professional immediately."
         return ""
 
+    def _safety_terms(self, query: str) -> List[str]:
+        """Safety terms in query, read from the shared message annotation."""
+        if not self.safety:
+            return []
+        return match_keywords(analyze(query).lower, sorted(self.safety))
+
     def get_guided_hint(self, context_path: str) -> Dict:
         """Get a short guided hint from the current context."""
         # try:
@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+Test script for the Memory Write Queue
+Runs MemoryWriteQueue on a temporary journal with the Qdrant store stubbed out.
+"""
+
+import sys
+import os
+import json
+import shutil
+import tempfile
+
+# Add the project root to the path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+# Long enough that the background worker never flushes on its own during a test
+IDLE_INTERVAL = 3600
+
+
+class StubStore:
+    """Stands in for rag.qdrant_client: outcome decides what happens to every record in a batch."""
+
+    def __init__(self, outcome="stored"):
+        self.outcome = outcome
+        self.stored = []
+        self.calls = 0
+
+    def store_conversation_memories(self, records):
+        self.calls += 1
+        if self.outcome == "transient":
+            return list(records), []
+        if self.outcome == "rejected":
+            return [], list(records)
+        self.stored.extend(records)
+        return [], []
+
+    def get_qdrant(self):
+        if self.outcome == "unreachable":
+            raise RuntimeError("Qdrant storage is locked by another process")
+        return object()
+
+
+def with_store(store, test):
+    """Run test(journal_path) with the stub store patched in and a scratch journal directory."""
+    import rag.qdrant_client as qdrant_client
+
+    originals = (qdrant_client.store_conversation_memories, qdrant_client.get_qdrant)
+    qdrant_client.store_conversation_memories = store.store_conversation_memories
+    qdrant_client.get_qdrant = store.get_qdrant
+    journal_dir = tempfile.mkdtemp()
+    try:
+        test(os.path.join(journal_dir, "memory_journal.jsonl"))
+    finally:
+        qdrant_client.store_conversation_memories, qdrant_client.get_qdrant = originals
+        shutil.rmtree(journal_dir, ignore_errors=True)
+
+
+def journal_ids(path):
+    if not os.path.exists(path):
+        return []
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line)["id"] for line in f if line.strip()]
+
+
+def make_queue(path):
+    from rag.memory_write_queue import MemoryWriteQueue
+    return MemoryWriteQueue(journal_path=path, flush_interval=IDLE_INTERVAL)
+
+
+def test_journal_and_replay_after_crash():
+    """Enqueued records are journaled before enqueue returns and replayed by the next process."""
+    store = StubStore()
+
+    def run(path):
+        crashed = make_queue(path)
+        crashed.enqueue("u1", "chat_history", {"content": "first"}, record_id="a")
+        crashed.enqueue("u1", "chat_history", {"content": "second"}, record_id="b")
+        assert journal_ids(path) == ["a", "b"]
+        print("✅ Records journaled on enqueue")
+
+        # Same id enqueued twice (a rewritten merged doc) replays once, latest wins
+        crashed.enqueue("u1", "insights", {"v": 1}, record_id="c")
+        crashed.enqueue("u1", "insights", {"v": 2}, record_id="c")
+
+        restarted = make_queue(path)
+        assert restarted.get_stats()["replayed"] == 3
+        assert restarted.flush() == 3 and journal_ids(path) == []
+        assert [r["data"] for r in store.stored if r["id"] == "c"] == [{"v": 2}]
+        print("✅ Unsaved records replayed and stored after a restart")
+
+    with_store(store, run)
+
+
+def test_torn_last_line_is_skipped():
+    """A crash mid-append leaves a partial line; replay keeps every complete record."""
+    store = StubStore()
+
+    def run(path):
+        queue = make_queue(path)
+        queue.enqueue("u1", "chat_history", {"content": "complete"}, record_id="a")
+        with open(path, "a", encoding="utf-8") as f:
+            f.write('{"id": "b", "user_id": "u1", "memory_ty')
+
+        restarted = make_queue(path)
+        assert restarted.get_stats()["replayed"] == 1
+        assert restarted.flush() == 1 and [r["id"] for r in store.stored] == ["a"]
+        print("✅ Torn final line ignored, complete records replayed")
+
+    with_store(store, run)
+
+
+def test_transient_errors_keep_records():
+    """Embedding/provider failures never drop records: they stay journaled and the flush backs off."""
+    from rag.memory_write_queue import MAX_ATTEMPTS
+    store = StubStore("transient")
+
+    def run(path):
+        queue = make_queue(path)
+        queue.flush_interval = 1.0
+        queue.enqueue("u1", "chat_history", {"content": "keep me"}, record_id="a")
+
+        backoffs = []
+        for _ in range(MAX_ATTEMPTS * 2):
+            assert queue.flush() == 0
+            backoffs.append(queue.get_stats()["backoff_seconds"])
+        stats = queue.get_stats()
+        assert stats["dropped"] == 0 and stats["pending"] == 1 and journal_ids(path) == ["a"], stats
+        assert backoffs[:3] == [1.0, 2.0, 4.0], backoffs
+        assert not queue._due()
+        print(f"✅ Record kept through {len(backoffs)} transient failures, backoff {backoffs[:4]}...")
+
+        store.outcome = "stored"
+        assert queue.flush() == 1 and journal_ids(path) == []
+        assert queue.get_stats()["backoff_seconds"] == 0.0
+        print("✅ Stored once the provider recovers, backoff reset")
+
+    with_store(store, run)
+
+
+def test_unreachable_qdrant_keeps_journal():
+    """An unreachable store postpones the flush without touching records or the journal."""
+    store = StubStore("unreachable")
+
+    def run(path):
+        queue = make_queue(path)
+        queue.enqueue("u1", "chat_history", {"content": "keep me"}, record_id="a")
+        assert queue.flush() == 0 and store.calls == 0
+        assert journal_ids(path) == ["a"] and queue.get_stats()["postponed"] == 1
+        print("✅ Flush postponed while Qdrant is unreachable")
+
+    with_store(store, run)
+
+
+def test_rejected_records_dropped_after_max_attempts():
+    """Records whose payload is rejected are retried MAX_ATTEMPTS times, then dropped from the journal."""
+    from rag.memory_write_queue import MAX_ATTEMPTS
+    store = StubStore("rejected")
+
+    def run(path):
+        queue = make_queue(path)
+        queue.enqueue("u1", "chat_history", {"content": "bad"}, record_id="a")
+        for attempt in range(1, MAX_ATTEMPTS):
+            queue.flush()
+            assert journal_ids(path) == ["a"], attempt
+        queue.flush()
+        stats = queue.get_stats()
+        assert stats["dropped"] == 1 and stats["pending"] == 0 and journal_ids(path) == [], stats
+        print(f"✅ Rejected record dropped after {MAX_ATTEMPTS} attempts")
+
+    with_store(store, run)
+
+
+def run_all_tests():
+    """Run all tests and provide summary."""
+    print("🚀 Starting Memory Write Queue Tests...\n")
+
+    tests = [
+        ("Journal and replay after a crash", test_journal_and_replay_after_crash),
+        ("Torn last line", test_torn_last_line_is_skipped),
+        ("Transient errors keep records", test_transient_errors_keep_records),
+        ("Unreachable Qdrant keeps journal", test_unreachable_qdrant_keeps_journal),
+        ("Rejected records dropped", test_rejected_records_dropped_after_max_attempts)
+    ]
+
+    passed = 0
+    for test_name, test_func in tests:
+        try:
+            test_func()
+            print(f"✅ PASS {test_name}\n")
+            passed += 1
+        except Exception as e:
+            print(f"❌ FAIL {test_name}: {e}\n")
+
+    print(f"🎯 Overall: {passed}/{len(tests)} tests passed")
+    return passed == len(tests)
+
+
+if __name__ == "__main__":
+    success = run_all_tests()
+    sys.exit(0 if success else 1)
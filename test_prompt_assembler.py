@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Test script for the Prompt Assembler
+Checks priority trimming, the token budget and required sections, directly and through the synthesis prompt.
+"""
+
+import sys
+import os
+
+# Add the project root to the path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+GUIDANCE = "Early screening at 18 and 24 months helps identify developmental differences."
+PROFILE = ["Role: parent", "Child Age: 3-5", "Diagnosis Status: diagnosed_no"]
+
+
+def long_text(label, words=600):
+    return " ".join(f"{label}{i % 10}" for i in range(words))
+
+
+def build(budget, guidance=GUIDANCE, web_words=600):
+    """The synthesis layout: required guidance/profile, then documents, history, memory and web by priority."""
+    from knowledge.prompt_assembler import PromptAssembler
+
+    assembler = PromptAssembler(budget)
+    assembler.add_section("guidance", [guidance], header="Structured Guidance:", priority=1, required=True)
+    assembler.add_section("profile", PROFILE, header="User Profile:", priority=1, required=True)
+    assembler.add_section("documents", [
+        ("low relevance " + long_text("low"), 0.2),
+        ("high relevance " + long_text("high"), 0.9),
+        ("mid relevance " + long_text("mid"), 0.5),
+    ], header="Relevant Document Information:", priority=2, max_item_tokens=250, bullet="- ")
+    assembler.add_section("history", [(f"User: message {i} " + long_text("hist", 60), i) for i in range(6)],
+                          header="Recent Conversation History:", priority=3, max_item_tokens=80)
+    assembler.add_section("memory", [("Insights: " + long_text("mem", 100), 0.4)],
+                          header="Relevant Past Insights:", priority=4, max_item_tokens=60, bullet="- ")
+    assembler.add_section("web", [long_text("web", web_words)], header="Additional Web Information:",
+                          priority=5, max_item_tokens=300, bullet="- ")
+    return assembler.assemble()
+
+
+def test_oversized_sections_trimmed_by_priority():
+    """When everything can't fit, lower-priority sections and lower-scored items go first; long items are truncated."""
+    text, usage = build(500)
+    sections = usage["sections"]
+
+    assert "Structured Guidance:" in text and GUIDANCE in text
+    assert "high relevance" in text, "the highest-scored document must be admitted first"
+    assert sections["documents"]["dropped"] >= 1 and "low relevance" not in text
+    assert sections["web"]["items"] == 0 and "Additional Web Information:" not in text
+    assert "..." in text, "items over max_item_tokens are cut with an ellipsis"
+    kept = ", ".join(f"{name}={s['items']}" for name, s in sections.items())
+    print(f"✅ Trimmed by priority, items kept: {kept}")
+
+    # Sections render in the order added, whatever order they were admitted in
+    positions = [text.index(h) for h in ("Structured Guidance:", "User Profile:", "Relevant Document Information:") if h in text]
+    assert positions == sorted(positions)
+    print("✅ Layout keeps the order sections were added in")
+
+
+def test_result_stays_within_budget():
+    """The assembled text never exceeds the budget as counted by count_tokens (tiktoken when available)."""
+    from knowledge.prompt_assembler import count_tokens
+
+    for budget in (128, 300, 800, 2000, 5000):
+        text, usage = build(budget)
+        tokens = count_tokens(text)
+        assert tokens <= budget, (budget, tokens)
+        assert usage["used"] <= budget, usage
+        print(f"✅ Budget {budget}: {tokens} tokens used")
+
+
+def test_required_sections_never_dropped():
+    """Oversized required guidance is truncated, not dropped, and the profile is kept even when nothing else fits."""
+    from knowledge.prompt_assembler import PromptAssembler, count_tokens
+
+    text, usage = build(120, guidance=long_text("guide", 3000))
+    assert "Structured Guidance:" in text and "User Profile:" in text
+    assert all(line in text for line in PROFILE), text
+    assert usage["sections"]["guidance"]["dropped"] == 0 and usage["sections"]["profile"]["dropped"] == 0
+    for optional in ("documents", "history", "memory", "web"):
+        assert usage["sections"][optional]["items"] == 0, optional
+    # Only required content may pass the budget, by at most MIN_ITEM_TOKENS per item
+    assert count_tokens(text) <= 120 + PromptAssembler.MIN_ITEM_TOKENS * len(PROFILE)
+    print(f"✅ Required sections kept at budget 120 ({count_tokens(text)} tokens), optional sections dropped")
+
+
+def test_synthesis_prompt_respects_context_budget():
+    """_build_synthesis_messages keeps guidance and profile and stays within SYNTHESIS_CONTEXT_TOKENS."""
+    from knowledge.prompt_assembler import count_tokens
+    from knowledge.response_synthesis_engine import SYNTHESIS_CONTEXT_TOKENS, ResponseSynthesisEngine
+
+    engine = ResponseSynthesisEngine("mongomock://prompt-assembler")
+    history = [{"role": "user" if i % 2 == 0 else "assistant", "content": f"turn {i} " + long_text("h", 200)} for i in range(10)]
+    messages = engine._build_synthesis_messages(
+        user_query="What should we do next?",
+        mongodb_content={"response": GUIDANCE},
+        web_content=[{"source": "https://example.org", "content": long_text("web", 4000)}],
+        user_profile={"role": "parent", "child_age": "3-5", "diagnosis_status": "diagnosed_no"},
+        conversation_history=history,
+        vector_results=[{"payload": {"source": "kb", "content": long_text("doc", 2000)}, "score": 0.8} for _ in range(5)],
+        gathered_context={"web_content": [], "memory_context": {"insights": [{"content": long_text("m", 500), "score": 0.5}]}, "patient_info": None}
+    )
+    system_prompt = messages[0]["content"]
+    context = system_prompt.split("responses:\n\n", 1)[1].split("\n\nCRITICAL:", 1)[0]
+
+    assert count_tokens(context) <= SYNTHESIS_CONTEXT_TOKENS, count_tokens(context)
+    assert GUIDANCE in context and "Role: parent" in context
+    assert "turn 9" in context, "the newest history message ranks highest"
+    print(f"✅ Synthesis context {count_tokens(context)}/{SYNTHESIS_CONTEXT_TOKENS} tokens with guidance and profile kept")
+
+
+def run_all_tests():
+    """Run all tests and provide summary."""
+    print("🚀 Starting Prompt Assembler Tests...\n")
+
+    tests = [
+        ("Oversized sections trimmed by priority", test_oversized_sections_trimmed_by_priority),
+        ("Result stays within budget", test_result_stays_within_budget),
+        ("Required sections never dropped", test_required_sections_never_dropped),
+        ("Synthesis prompt respects context budget", test_synthesis_prompt_respects_context_budget)
+    ]
+
+    passed = 0
+    for test_name, test_func in tests:
+        try:
+            test_func()
+            print(f"✅ PASS {test_name}\n")
+            passed += 1
+        except Exception as e:
+            print(f"❌ FAIL {test_name}: {e}\n")
+
+    print(f"🎯 Overall: {passed}/{len(tests)} tests passed")
+    return passed == len(tests)
+
+
+if __name__ == "__main__":
+    success = run_all_tests()
+    sys.exit(0 if success else 1)
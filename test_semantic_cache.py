@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Test script for the Semantic Response Cache
+Runs ResponseSynthesisEngine against mongomock with the LLM and embeddings stubbed out.
+"""
+
+import sys
+import os
+import hashlib
+
+import numpy as np
+
+# Add the project root to the path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+CONTEXT_PATH = "screening.early_signs"
+PROFILE = {"role": "parent", "child_age": "2-3", "diagnosis_status": "diagnosed_no"}
+
+
+def fake_embed(text):
+    """Bag-of-words vector, so identical questions are identical and unrelated ones are not."""
+    vector = np.zeros(64, dtype=np.float32)
+    for word in text.lower().split():
+        vector[int(hashlib.md5(word.encode("utf-8")).hexdigest(), 16) % 64] += 1.0
+    return vector
+
+
+def make_engine(mongo_uri):
+    from knowledge.response_synthesis_engine import ResponseSynthesisEngine
+    from knowledge.semantic_response_cache import SemanticResponseCache
+
+    engine = ResponseSynthesisEngine(mongo_uri)
+    engine.collection.insert_one({"context_path": CONTEXT_PATH, "response": "Early signs include limited eye contact."})
+    engine.semantic_cache = SemanticResponseCache(embed_fn=fake_embed)
+    engine._user_has_documents = lambda user_id: user_id == "user_with_docs"
+
+    engine.llm_calls = []
+
+    def llm_synthesize(**kwargs):
+        engine.llm_calls.append(kwargs)
+        return f"Answer {len(engine.llm_calls)}"
+
+    engine._llm_synthesize = llm_synthesize
+    return engine
+
+
+def history(user_id):
+    return [
+        {"role": "user", "content": f"Hi, I'm {user_id}"},
+        {"role": "assistant", "content": "Hello! How can I help?"},
+        {"role": "user", "content": "What are the early signs of autism?"}
+    ]
+
+
+def test_second_user_generic_question_hits_cache():
+    """A generic question asked mid-conversation is answered once and reused for another user in the bucket."""
+    engine = make_engine("mongomock://semantic-cache-generic")
+    query = "What are the early signs of autism?"
+
+    first = engine.synthesize_response(query, CONTEXT_PATH, dict(PROFILE, user_id="alice"), history("alice"), [])
+    assert first["response"] == "Answer 1"
+    call = engine.llm_calls[0]
+    assert call["conversation_history"] is None, "generic prompts must not include history"
+    assert call["gathered_context"]["memory_context"] is None and call["gathered_context"]["patient_info"] is None
+    print("✅ First user's generic question synthesized without history or memory")
+
+    second = engine.synthesize_response(query, CONTEXT_PATH, dict(PROFILE, user_id="bob"), history("bob"), [])
+    assert second["response"] == "Answer 1" and len(engine.llm_calls) == 1, second
+    assert engine.semantic_cache.get_stats()["hits"] == 1
+    print("✅ Second user's identical question served from the semantic cache")
+
+    other_bucket = dict(PROFILE, user_id="carol", diagnosis_status="diagnosed_yes")
+    engine.synthesize_response(query, CONTEXT_PATH, other_bucket, history("carol"), [])
+    assert len(engine.llm_calls) == 2
+    print("✅ A different profile bucket does not share the answer")
+
+
+def test_personal_turns_bypass_cache():
+    """Concerns, user documents and use_cache=False keep history in the prompt and never touch the cache."""
+    engine = make_engine("mongomock://semantic-cache-personal")
+    engine.gather_context = lambda user_query, user_profile, external_sources=None, personal=True: {
+        "web_content": [], "memory_context": None, "patient_info": None, "timings": {}, "personal": personal
+    }
+    query = "What are the early signs of autism?"
+
+    cases = [
+        ("concerns", dict(PROFILE, user_id="dana", concerns=["speech"]), [], True),
+        ("uploaded documents", dict(PROFILE, user_id="user_with_docs"), [], True),
+        ("retrieved user chunk", dict(PROFILE, user_id="erin"), [{"payload": {"type": "user_document", "content": "x"}}], True),
+        ("use_cache=False", dict(PROFILE, user_id="frank"), [], False),
+    ]
+    for name, profile, vector_results, use_cache in cases:
+        engine.synthesize_response(query, CONTEXT_PATH, profile, history(profile["user_id"]), vector_results, use_cache=use_cache)
+        call = engine.llm_calls[-1]
+        assert call["conversation_history"], name
+        assert call["gathered_context"]["personal"], name
+        print(f"✅ {name}: personal prompt, not cached")
+
+    stats = engine.semantic_cache.get_stats()
+    assert stats["entries"] == 0 and stats["hits"] == 0, stats
+
+
+def run_all_tests():
+    """Run all tests and provide summary."""
+    print("🚀 Starting Semantic Cache Tests...\n")
+
+    tests = [
+        ("Second user's generic question hits the cache", test_second_user_generic_question_hits_cache),
+        ("Personal turns bypass the cache", test_personal_turns_bypass_cache)
+    ]
+
+    passed = 0
+    for test_name, test_func in tests:
+        try:
+            test_func()
+            print(f"✅ PASS {test_name}\n")
+            passed += 1
+        except Exception as e:
+            print(f"❌ FAIL {test_name}: {e}\n")
+
+    print(f"🎯 Overall: {passed}/{len(tests)} tests passed")
+    return passed == len(tests)
+
+
+if __name__ == "__main__":
+    success = run_all_tests()
+    sys.exit(0 if success else 1)
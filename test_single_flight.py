@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Test script for Single-Flight Call Deduplication
+Runs two concurrent identical calls and checks they execute once and get independent results.
+"""
+
+import sys
+import os
+import threading
+import time
+
+# Add the project root to the path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.time() + timeout
+    while not condition():
+        assert time.time() < deadline, "timed out waiting for condition"
+        time.sleep(0.01)
+
+
+def run_concurrently(call, operation_stats):
+    """Start call() in two threads; the second starts once the first is in flight and joins it."""
+    results = [None, None]
+
+    def worker(index):
+        results[index] = call()
+
+    first = threading.Thread(target=worker, args=(0,))
+    first.start()
+    wait_for(lambda: operation_stats().get("executions") == 1)
+    second = threading.Thread(target=worker, args=(1,))
+    second.start()
+    wait_for(lambda: operation_stats().get("collapsed") == 1)
+    return first, second, results
+
+
+def test_concurrent_calls_run_once_with_independent_results():
+    """The leader executes once; the follower's result is a copy both callers can change freely."""
+    from utils.single_flight import SingleFlight
+
+    group = SingleFlight()
+    release = threading.Event()
+    executions = []
+
+    def fn():
+        executions.append(1)
+        release.wait(5)
+        return {"response": "shared answer", "sources": [{"source": "kb"}]}
+
+    first, second, results = run_concurrently(
+        lambda: group.do("same-key", fn, "synthesize"),
+        lambda: group.get_stats().get("synthesize", {})
+    )
+    release.set()
+    first.join(5)
+    second.join(5)
+
+    assert len(executions) == 1, executions
+    leader, follower = results
+    assert leader == follower and leader is not follower
+    assert leader["sources"] is not follower["sources"]
+    print("✅ Executed once; follower got an equal but separate result")
+
+    # One session decorating its result must not leak into the other's
+    leader["confidence"] = 0.9
+    leader["sources"].append({"source": "user_upload"})
+    assert follower == {"response": "shared answer", "sources": [{"source": "kb"}]}, follower
+    print("✅ Mutating one caller's result leaves the other unchanged")
+
+
+def test_decorated_function_results_are_independent():
+    """Same guarantee through the @single_flight decorator used by synthesis and patient parsing."""
+    from utils.single_flight import get_single_flight_stats, single_flight
+
+    release = threading.Event()
+    executions = []
+
+    @single_flight("test_patient_parse")
+    def parse(user_id):
+        executions.append(user_id)
+        release.wait(5)
+        return {"name": "Sam", "concerns": ["sleep"]}
+
+    first, second, results = run_concurrently(
+        lambda: parse("u1"),
+        lambda: get_single_flight_stats().get("test_patient_parse", {})
+    )
+    release.set()
+    first.join(5)
+    second.join(5)
+
+    assert executions == ["u1"], executions
+    results[1]["concerns"].append("speech")
+    assert results[0]["concerns"] == ["sleep"], results[0]
+    print("✅ Decorated call ran once; callers' patient info is independent")
+
+
+def run_all_tests():
+    """Run all tests and provide summary."""
+    print("🚀 Starting Single-Flight Tests...\n")
+
+    tests = [
+        ("Concurrent calls run once with independent results", test_concurrent_calls_run_once_with_independent_results),
+        ("Decorated function results are independent", test_decorated_function_results_are_independent)
+    ]
+
+    passed = 0
+    for test_name, test_func in tests:
+        try:
+            test_func()
+            print(f"✅ PASS {test_name}\n")
+            passed += 1
+        except Exception as e:
+            print(f"❌ FAIL {test_name}: {e}\n")
+
+    print(f"🎯 Overall: {passed}/{len(tests)} tests passed")
+    return passed == len(tests)
+
+
+if __name__ == "__main__":
+    success = run_all_tests()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Test script for the Text Analyzer
+Compares the single-pass analyzer with the keyword and regex checks it replaced on representative messages.
+"""
+
+import sys
+import os
+import re
+
+# Add the project root to the path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+MESSAGES = [
+    "",
+    "My son Sam is 4 years old and was diagnosed with autism last year.",
+    "I'm WORRIED about his speech; he hardly says any words.",
+    "She's 7. Her name is Maya and we haven't been diagnosed yet.",
+    "The reason I ask: a person at school said the IEP is the issue.",
+    "His IEP meeting went better than expected! The new strategy helped a lot.",
+    "We're waiting for diagnosis. No diagnosis so far, and the therapy waitlist is long.",
+    "Meltdowns and tantrums every evening, repetitive stimming too.",
+    "He improved a lot - our goal is social skills and eye contact with friends while playing.",
+    "Give me a simple, step-by-step overview with an example list of resources please",
+    "Our aim is to claim support; the target objective is clear.",
+    "kid is 12, age is 12, 12 years of age",
+    "Lily is my daughter. She's called Lil at home.",
+    "Sensory issues, medication and family support: what worked for you?",
+    "Développement retardé? Elle a 3 ans. She is behind on milestones and development.",
+    "no punctuation here but struggling and frustrated and overwhelmed",
+]
+
+# The checks as they were written before the analyzer (lowercase substring tests and re.search on the lowered text)
+
+
+def old_keyword_matches(text, keywords):
+    content = text.lower()
+    return [k for k in keywords if k.lower() in content]
+
+
+def old_sentence_with(text, keyword):
+    sentences = re.split(r'[.!?]', text.lower())
+    return next((s.strip() for s in sentences if keyword in s), None)
+
+
+def old_first_group(text, patterns):
+    for pattern in patterns:
+        match = re.search(pattern, text.lower())
+        if match:
+            return match.group(1)
+    return None
+
+
+def test_keyword_sets_match_old_checks():
+    """found()/has() equal the old `keyword in text.lower()` results, keeping substring semantics and declared case."""
+    from utils.text_analyzer import KEYWORD_SETS, analyze
+
+    for text in MESSAGES:
+        annotation = analyze(text)
+        for set_name, keywords in KEYWORD_SETS.items():
+            expected = old_keyword_matches(text, keywords)
+            assert annotation.found(set_name) == expected, (text, set_name, annotation.found(set_name), expected)
+            assert annotation.has(set_name) == bool(expected), (text, set_name)
+    print(f"✅ {len(MESSAGES)} messages x {len(KEYWORD_SETS)} keyword sets match the old checks")
+
+
+def test_substring_overlap_and_case_cases():
+    """Spot checks for the cases a word-boundary or case-sensitive matcher would get wrong."""
+    from utils.text_analyzer import analyze
+
+    cases = [
+        # (text, set, expected) - the old checks were substring tests, so "son" is found in "reason"
+        ("The reason a person asked", "child_mention", ["son"]),
+        ("he hardly speaks", "concern_indicator", ["hard"]),
+        ("our claim", "goal", ["aim"]),
+        # Overlapping keywords are all reported
+        ("we're working on social skills", "topic", ["social skills"]),
+        ("we're working on social skills", "concern:social", ["social"]),
+        ("no diagnosis, not an autism diagnosis", "diagnosis_no", ["no diagnosis"]),
+        ("no diagnosis, not an autism diagnosis", "diagnosis_yes", ["autism diagnosis"]),
+        ("it improved and got better", "progress", ["improved", "better"]),
+        # Case-insensitive match, declared spelling reported
+        ("an iep meeting", "topic", ["IEP"]),
+        ("An IEP Meeting About SCHOOL", "topic", ["IEP", "school"]),
+    ]
+    for text, set_name, expected in cases:
+        assert analyze(text).found(set_name) == expected, (text, set_name, analyze(text).found(set_name))
+    print(f"✅ {len(cases)} substring, overlap and case spot checks pass")
+
+
+def test_sentences_and_patterns_match_old_checks():
+    """sentence_with() and first_group() equal the old sentence split and regex searches."""
+    from utils.text_analyzer import KEYWORD_SETS, PATTERN_GROUPS, analyze
+
+    for text in MESSAGES:
+        annotation = analyze(text)
+        for keyword in KEYWORD_SETS["concern_indicator"] + KEYWORD_SETS["strategy_indicator"]:
+            assert annotation.sentence_with(keyword) == old_sentence_with(text, keyword), (text, keyword)
+        for group, patterns in PATTERN_GROUPS.items():
+            assert annotation.first_group(group) == old_first_group(text, patterns), (text, group)
+    print("✅ Sentences and fact regexes match the old checks")
+
+    samples = {
+        MESSAGES[1]: {"age": "4", "child_name": "sam", "stated_age": "4", "my_child_name": "sam"},
+        MESSAGES[3]: {"age": "7", "child_name": "maya"},
+        MESSAGES[12]: {"child_name": "lily"},
+    }
+    for text, groups in samples.items():
+        for group, value in groups.items():
+            assert analyze(text).first_group(group) == value, (text, group)
+    print("✅ Ages and names extracted from sample messages")
+
+
+def test_match_keywords_matches_old_checks():
+    """match_keywords() equals the old per-path/per-route `keyword.lower() in text.lower()` loops, in list order."""
+    from utils.text_analyzer import match_keywords
+
+    paths = ["screening", "Diagnosis.Next_Steps", "school", "therapy", "", None]
+    routes = ["IEP", "eye contact", "speech", "son"]
+    for text in MESSAGES:
+        lower = text.lower()
+        for keywords in (paths, routes):
+            valid = [k for k in keywords if isinstance(k, str) and k]
+            assert match_keywords(lower, keywords) == old_keyword_matches(text, valid), (text, keywords)
+    assert match_keywords("next: diagnosis.next_steps", paths) == ["Diagnosis.Next_Steps"]
+    print("✅ Dynamic keyword lists match the old loops")
+
+
+def test_recent_annotations_are_reused():
+    """analyze() returns the cached annotation for a repeated message and stays bounded."""
+    import utils.text_analyzer as text_analyzer
+
+    first = text_analyzer.analyze("Repeated message about therapy")
+    assert text_analyzer.analyze("Repeated message about therapy") is first
+    fresh = text_analyzer.TextAnalyzer().analyze("Repeated message about therapy")
+    assert fresh.keywords == first.keywords and fresh.found("topic") == first.found("topic") == ["therapy"]
+
+    for i in range(text_analyzer._RECENT_MAX + 10):
+        text_analyzer.analyze(f"filler message {i}")
+    assert len(text_analyzer._recent) == text_analyzer._RECENT_MAX
+    assert text_analyzer.analyze("Repeated message about therapy") is not first
+    print("✅ Recent annotations reused and the cache stays bounded")
+
+
+def run_all_tests():
+    """Run all tests and provide summary."""
+    print("🚀 Starting Text Analyzer Tests...\n")
+
+    tests = [
+        ("Keyword sets match old checks", test_keyword_sets_match_old_checks),
+        ("Substring, overlap and case", test_substring_overlap_and_case_cases),
+        ("Sentences and patterns match old checks", test_sentences_and_patterns_match_old_checks),
+        ("match_keywords matches old checks", test_match_keywords_matches_old_checks),
+        ("Recent annotations reused", test_recent_annotations_are_reused)
+    ]
+
+    passed = 0
+    for test_name, test_func in tests:
+        try:
+            test_func()
+            print(f"✅ PASS {test_name}\n")
+            passed += 1
+        except Exception as e:
+            print(f"❌ FAIL {test_name}: {e}\n")
+
+    print(f"🎯 Overall: {passed}/{len(tests)} tests passed")
+    return passed == len(tests)
+
+
+if __name__ == "__main__":
+    success = run_all_tests()
+    sys.exit(0 if success else 1)
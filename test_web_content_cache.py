@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Test script for the Web Content Cache
+Runs WebContentCache against a local HTTP stand-in server (no external network needed).
+"""
+
+import sys
+import os
+import shutil
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Add the project root to the path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+PAGE = "<html><head><script>var x = 1;</script></head><body><h1>Early Signs</h1><p>Screen at 18 and 24 months.</p></body></html>"
+ETAG = '"v1"'
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """Serves one page with an ETag and answers conditional requests with 304."""
+    requests_seen = []
+
+    def do_GET(self):
+        StandInHandler.requests_seen.append(dict(self.headers))
+        if self.headers.get("If-None-Match") == ETAG:
+            self.send_response(304)
+            self.send_header("ETag", ETAG)
+            self.end_headers()
+            return
+        body = PAGE.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html")
+        self.send_header("ETag", ETAG)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_stand_in_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandInHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/early-signs"
+
+
+def extract(html):
+    from knowledge.response_synthesis_engine import ResponseSynthesisEngine
+    return ResponseSynthesisEngine._extract_text(html)
+
+
+def test_fetch_hit_and_revalidate():
+    """Miss on first fetch, hit while fresh, 304 revalidation once expired."""
+    from knowledge.web_content_cache import WebContentCache
+
+    server, url = start_stand_in_server()
+    cache_dir = tempfile.mkdtemp()
+    try:
+        StandInHandler.requests_seen = []
+        cache = WebContentCache(cache_dir=cache_dir, ttl_seconds=3600)
+
+        first = cache.fetch(url, extract)
+        assert first["cache"] == "miss", first
+        assert "Early Signs" in first["content"] and "var x" not in first["content"]
+        print(f"✅ First fetch stored {len(first['content'])} chars")
+
+        second = cache.fetch(url, extract)
+        assert second["cache"] == "hit" and len(StandInHandler.requests_seen) == 1
+        print("✅ Fresh entry served without a request")
+
+        # Persisted: a new instance over the same directory finds the entry on disk
+        reopened = WebContentCache(cache_dir=cache_dir, ttl_seconds=0)
+        third = reopened.fetch(url, extract)
+        assert third["cache"] == "revalidated", third
+        assert StandInHandler.requests_seen[-1].get("If-None-Match") == ETAG
+        print("✅ Expired entry revalidated with If-None-Match → 304")
+
+        stats = cache.get_stats()
+        assert stats["hits"] == 1 and stats["misses"] == 1
+        print(f"✅ Stats: {stats}")
+    finally:
+        server.shutdown()
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+
+def test_size_limits_and_stale_fallback():
+    """Entries are truncated to max_entry_bytes and served stale when the origin is down."""
+    from knowledge.web_content_cache import WebContentCache
+
+    server, url = start_stand_in_server()
+    cache_dir = tempfile.mkdtemp()
+    try:
+        cache = WebContentCache(cache_dir=cache_dir, ttl_seconds=0, max_entry_bytes=10)
+        entry = cache.fetch(url, extract)
+        assert len(entry["content"].encode("utf-8")) <= 10
+        print("✅ Entry truncated to max_entry_bytes")
+
+        server.shutdown()
+        server.server_close()
+        stale = cache.fetch(url, extract, timeout=2)
+        assert stale["cache"] == "stale" and cache.get_stats()["stale_served"] == 1
+        print("✅ Stale copy served when origin is unreachable")
+
+        tiny = WebContentCache(cache_dir=cache_dir, max_total_bytes=1)
+        tiny.put("http://example.invalid/a", "x" * 50)
+        assert tiny.get_stats()["evictions"] >= 1
+        print("✅ Oldest entries evicted past max_total_bytes")
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+
+def run_all_tests():
+    """Run all tests and provide summary."""
+    print("🚀 Starting Web Content Cache Tests...\n")
+
+    tests = [
+        ("Fetch, hit and revalidate", test_fetch_hit_and_revalidate),
+        ("Size limits and stale fallback", test_size_limits_and_stale_fallback)
+    ]
+
+    passed = 0
+    for test_name, test_func in tests:
+        try:
+            test_func()
+            print(f"✅ PASS {test_name}\n")
+            passed += 1
+        except Exception as e:
+            print(f"❌ FAIL {test_name}: {e}\n")
+
+    print(f"🎯 Overall: {passed}/{len(tests)} tests passed")
+    return passed == len(tests)
+
+
+if __name__ == "__main__":
+    success = run_all_tests()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,106 @@
+"""
+Lazy Service Loading for Autism Support App
+Defers heavy imports and client construction until first use so the login screen renders quickly.
+"""
+
+import os
+import threading
+from typing import Any, Callable, Dict, Optional
+
+MONGO_URI = "mongodb://localhost:27017/"
+
+
+class LazyProxy:
+    """Stand-in that builds the real object on first attribute access and forwards to it."""
+
+    def __init__(self, factory: Callable[[], Any], name: str = "service"):
+        self._factory = factory
+        self._name = name
+        self._instance = None
+        self._lock = threading.Lock()
+
+    def _resolve(self) -> Any:
+        if self._instance is None:
+            with self._lock:
+                if self._instance is None:
+                    print(f"⏳ Initializing {self._name} on first use")
+                    self._instance = self._factory()
+        return self._instance
+
+    @property
+    def is_loaded(self) -> bool:
+        """Whether the wrapped object has been built yet."""
+        return self._instance is not None
+
+    def __getattr__(self, item: str) -> Any:
+        return getattr(self._resolve(), item)
+
+    def __repr__(self) -> str:
+        state = "loaded" if self.is_loaded else "not loaded"
+        return f"<LazyProxy {self._name} ({state})>"
+
+
+def _secret_or_env(name: str) -> Optional[str]:
+    """name from Streamlit secrets, falling back to the environment (scripts, benchmarks)."""
+    try:
+        import streamlit as st
+        value = st.secrets.get(name)
+        if value:
+            return value
+    except Exception:
+        # No secrets.toml outside the app
+        pass
+    return os.getenv(name) or None
+
+
+def get_openai_api_key() -> Optional[str]:
+    """OPENAI_API_KEY from Streamlit secrets or the environment."""
+    return _secret_or_env("OPENAI_API_KEY")
+
+
+def get_openai_base_url() -> Optional[str]:
+    """OPENAI_BASE_URL (e.g. the local stub from benchmarks.openai_stub); None means the real API."""
+    return _secret_or_env("OPENAI_BASE_URL")
+
+
+def create_openai_client():
+    """Build the OpenAI client from Streamlit secrets (or the environment)."""
+    import openai
+    return openai.OpenAI(api_key=get_openai_api_key(), base_url=get_openai_base_url())
+
+
+_mock_mongo_clients: Dict[str, Any] = {}
+
+
+def create_mongo_client(mongo_uri: str = MONGO_URI):
+    """
+    MongoClient for mongo_uri. A mongomock:// URI gives a process-wide in-memory
+    stand-in (benchmarks and offline runs; needs the mongomock package).
+    """
+    if mongo_uri.startswith("mongomock://"):
+        try:
+            import mongomock
+        except ImportError as e:
+            raise ImportError(f"{mongo_uri} needs the mongomock package (pip install mongomock)") from e
+        if mongo_uri not in _mock_mongo_clients:
+            _mock_mongo_clients[mongo_uri] = mongomock.MongoClient()
+        return _mock_mongo_clients[mongo_uri]
+    from pymongo import MongoClient
+    return MongoClient(mongo_uri)
+
+
+def create_knowledge_collection(mongo_uri: str = MONGO_URI):
+    """Connect to the structured knowledge collection in MongoDB."""
+    return create_mongo_client(mongo_uri)["autism_ai"]["knowledge"]
+
+
+def create_conversation_manager(mongo_uri: str = MONGO_URI):
+    """Build the conversation manager (pulls in Qdrant, bs4 and the OpenAI SDK)."""
+    from knowledge.intelligent_conversation_manager import IntelligentConversationManager
+    return IntelligentConversationManager(mongo_uri)
+
+
+def query_index(query: str, k: int = 4, debug: bool = True) -> Dict:
+    """Query the Llama-Index disk store, importing llama_index only when first called."""
+    from rag.query_engine import query_index as _query_index
+    return _query_index(query, k=k, debug=debug)
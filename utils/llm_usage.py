@@ -0,0 +1,60 @@
+"""
+LLM Usage Tracking
+Records prompt, cached and completion token counts per operation, as reported by the provider.
+"""
+
+import threading
+from typing import Any, Dict
+
+_lock = threading.Lock()
+_stats: Dict[str, Dict[str, int]] = {}
+
+
+def _field(obj: Any, name: str, default=0):
+    if obj is None:
+        return default
+    if isinstance(obj, dict):
+        return obj.get(name, default)
+    return getattr(obj, name, default)
+
+
+def record_usage(operation: str, usage: Any) -> Dict[str, int]:
+    """Record a chat.completions usage object (or dict) for operation; returns the parsed counts."""
+    if usage is None:
+        return {}
+    prompt_tokens = _field(usage, "prompt_tokens") or 0
+    completion_tokens = _field(usage, "completion_tokens") or 0
+    cached_tokens = _field(_field(usage, "prompt_tokens_details", None), "cached_tokens") or 0
+
+    with _lock:
+        stats = _stats.setdefault(operation, {
+            "requests": 0,
+            "requests_with_cache_hit": 0,
+            "prompt_tokens": 0,
+            "cached_tokens": 0,
+            "completion_tokens": 0
+        })
+        stats["requests"] += 1
+        stats["requests_with_cache_hit"] += 1 if cached_tokens else 0
+        stats["prompt_tokens"] += prompt_tokens
+        stats["cached_tokens"] += cached_tokens
+        stats["completion_tokens"] += completion_tokens
+
+    share = cached_tokens / prompt_tokens if prompt_tokens else 0.0
+    print(f"🧾 LLM usage ({operation}): {prompt_tokens} prompt tokens, {cached_tokens} cached ({share:.0%}), {completion_tokens} completion")
+    return {"prompt_tokens": prompt_tokens, "cached_tokens": cached_tokens, "completion_tokens": completion_tokens}
+
+
+def get_usage_stats() -> Dict[str, Dict]:
+    """Per-operation token totals with prompt-cache hit rates, plus an overall total."""
+    with _lock:
+        stats = {op: dict(s) for op, s in _stats.items()}
+    total = {"requests": 0, "requests_with_cache_hit": 0, "prompt_tokens": 0, "cached_tokens": 0, "completion_tokens": 0}
+    for s in stats.values():
+        for key in total:
+            total[key] += s[key]
+    stats["total"] = total
+    for s in stats.values():
+        s["cached_token_rate"] = s["cached_tokens"] / s["prompt_tokens"] if s["prompt_tokens"] else 0.0
+        s["request_cache_hit_rate"] = s["requests_with_cache_hit"] / s["requests"] if s["requests"] else 0.0
+    return stats
@@ -0,0 +1,151 @@
+"""
+Patient Context Cache
+Process-wide, TTL-bound cache of parsed patient context shared by every session and worker thread.
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional, Tuple
+
+DEFAULT_TTL_SECONDS = 3600
+
+
+class PatientContextCache:
+    """
+    user_id → parsed patient info, with per-user locking so concurrent sessions extract once.
+
+    invalidate() bumps a per-user generation; a parse that started before the bump
+    returns its result but doesn't cache it, so an upload mid-parse can't leave the
+    old profile pinned for the TTL.
+    """
+
+    def __init__(self, ttl_seconds: int = DEFAULT_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self._entries: Dict[str, Tuple[Dict, float]] = {}
+        self._user_locks: Dict[str, threading.Lock] = {}
+        # Threads holding or waiting for each user lock; only unreferenced locks are evicted
+        self._lock_refs: Dict[str, int] = {}
+        self._generations: Dict[str, int] = {}
+        # Bumped by invalidate(None) so in-flight parses for every user are discarded
+        self._epoch = 0
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "invalidations": 0}
+
+    @contextmanager
+    def _user_lock(self, user_id: str):
+        """Hold user_id's lock; counted from hand-out to release so eviction can't split it."""
+        with self._lock:
+            lock = self._user_locks.setdefault(user_id, threading.Lock())
+            self._lock_refs[user_id] = self._lock_refs.get(user_id, 0) + 1
+        try:
+            with lock:
+                yield
+        finally:
+            with self._lock:
+                self._lock_refs[user_id] -= 1
+                if not self._lock_refs[user_id]:
+                    del self._lock_refs[user_id]
+
+    def _generation(self, user_id: str) -> Tuple[int, int]:
+        with self._lock:
+            return self._epoch, self._generations.get(user_id, 0)
+
+    def _evict_idle(self):
+        """Drop expired entries, and the locks/generations of users with no entry and no thread using their lock."""
+        now = time.time()
+        with self._lock:
+            for user_id in [u for u, (_, stored) in self._entries.items() if now - stored >= self.ttl_seconds]:
+                del self._entries[user_id]
+            for user_id in [u for u in self._user_locks if u not in self._entries and u not in self._lock_refs]:
+                del self._user_locks[user_id]
+                self._generations.pop(user_id, None)
+
+    def _fresh(self, user_id: str) -> Optional[Dict]:
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry and time.time() - entry[1] < self.ttl_seconds:
+                return entry[0]
+            return None
+
+    def get(self, user_id: str, force_refresh: bool = False) -> Dict:
+        """Return patient info for user_id, parsing documents only on a miss."""
+        if not force_refresh:
+            cached = self._fresh(user_id)
+            if cached is not None:
+                self._count("hits")
+                return cached
+
+        # One extraction per user at a time; latecomers reuse its result
+        with self._user_lock(user_id):
+            if not force_refresh:
+                cached = self._fresh(user_id)
+                if cached is not None:
+                    self._count("hits")
+                    return cached
+
+            self._count("misses")
+            generation = self._generation(user_id)
+            from utils.patient_utils import parse_patient_documents
+            patient_info = parse_patient_documents(user_id)
+            # {} means parsing failed - don't pin a failure for the whole TTL
+            if patient_info:
+                with self._lock:
+                    if (self._epoch, self._generations.get(user_id, 0)) == generation:
+                        self._entries[user_id] = (patient_info, time.time())
+                    else:
+                        print(f"🔄 Patient context for {user_id} changed during parsing - not caching the stale result")
+        self._evict_idle()
+        return patient_info
+
+    def peek(self, user_id: str) -> Tuple[Optional[Dict], Optional[float]]:
+        """Return (patient_info, age_seconds) without parsing, or (None, None)."""
+        with self._lock:
+            entry = self._entries.get(user_id)
+        if not entry:
+            return None, None
+        return entry[0], time.time() - entry[1]
+
+    def invalidate(self, user_id: str = None):
+        """Drop the cached context for one user, or for everyone when user_id is None."""
+        with self._lock:
+            if user_id is None:
+                self._entries.clear()
+                self._epoch += 1
+            else:
+                self._entries.pop(user_id, None)
+                self._generations[user_id] = self._generations.get(user_id, 0) + 1
+            self.stats["invalidations"] += 1
+        print(f"🔄 Patient context cache invalidated for {user_id or 'all users'}")
+
+    def _count(self, stat: str):
+        with self._lock:
+            self.stats[stat] += 1
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self.stats)
+            stats["entries"] = len(self._entries)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
+
+
+_cache = PatientContextCache()
+
+
+def get_patient_context(user_id: str, force_refresh: bool = False) -> Dict:
+    """Parsed patient info for user_id from the process-wide cache."""
+    return _cache.get(user_id, force_refresh=force_refresh)
+
+
+def invalidate_patient_context(user_id: str = None, documents_removed: bool = False):
+    """Call after a user's documents are ingested or deleted; pass documents_removed=True for deletions."""
+    _cache.invalidate(user_id)
+    if documents_removed and user_id is not None:
+        from utils.patient_profile_store import get_patient_profile_store
+        get_patient_profile_store().forget_documents(user_id)
+
+
+def get_patient_context_cache() -> PatientContextCache:
+    return _cache
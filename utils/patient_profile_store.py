@@ -0,0 +1,155 @@
+"""
+Patient Profile Store
+Persists extracted patient profiles and per-chunk extractions so they are only recomputed when their inputs change.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+from contextlib import closing
+from datetime import datetime
+from typing import Dict, Iterable, Optional
+
+DEFAULT_DB_PATH = os.path.join("data", "patient_profiles.sqlite")
+
+
+class PatientProfileStore:
+    """SQLite tables of per-user patient profiles and per-chunk extractions keyed by content hash."""
+
+    def __init__(self, db_path: str = DEFAULT_DB_PATH):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS patient_profiles (
+                    user_id TEXT PRIMARY KEY,
+                    doc_fingerprint TEXT,
+                    memory_version INTEGER,
+                    doc_info TEXT,
+                    mem_info TEXT,
+                    profile TEXT,
+                    updated_at TEXT
+                )
+                """
+            )
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS chunk_extractions (
+                    content_hash TEXT PRIMARY KEY,
+                    info TEXT,
+                    created_at TEXT
+                )
+                """
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        # The connection's own context manager only commits/rolls back; callers wrap it in closing()
+        return sqlite3.connect(self.db_path, timeout=10)
+
+    def get(self, user_id: str) -> Optional[Dict]:
+        """Return the stored row for user_id, or None."""
+        try:
+            with self._lock, closing(self._connect()) as conn, conn:
+                row = conn.execute(
+                    "SELECT doc_fingerprint, memory_version, doc_info, mem_info, profile, updated_at "
+                    "FROM patient_profiles WHERE user_id = ?",
+                    (user_id,)
+                ).fetchone()
+            if not row:
+                return None
+            return {
+                "doc_fingerprint": row[0],
+                "memory_version": row[1],
+                "doc_info": json.loads(row[2] or "{}"),
+                "mem_info": json.loads(row[3] or "{}"),
+                "profile": json.loads(row[4] or "{}"),
+                "updated_at": row[5]
+            }
+        except Exception as e:
+            print(f"⚠️ Could not read stored patient profile for {user_id}: {e}")
+            return None
+
+    def put(self, user_id: str, doc_fingerprint: str, memory_version: int, doc_info: Dict, mem_info: Dict, profile: Dict):
+        """Insert or replace the profile for user_id."""
+        try:
+            with self._lock, closing(self._connect()) as conn, conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO patient_profiles "
+                    "(user_id, doc_fingerprint, memory_version, doc_info, mem_info, profile, updated_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        user_id,
+                        doc_fingerprint,
+                        memory_version,
+                        json.dumps(doc_info or {}, default=str),
+                        json.dumps(mem_info or {}, default=str),
+                        json.dumps(profile or {}, default=str),
+                        datetime.now().isoformat()
+                    )
+                )
+        except Exception as e:
+            print(f"⚠️ Could not store patient profile for {user_id}: {e}")
+
+    def invalidate(self, user_id: str):
+        """Forget the stored profile so the next read recomputes it."""
+        try:
+            with self._lock, closing(self._connect()) as conn, conn:
+                conn.execute("DELETE FROM patient_profiles WHERE user_id = ?", (user_id,))
+        except Exception as e:
+            print(f"⚠️ Could not invalidate patient profile for {user_id}: {e}")
+
+    def forget_documents(self, user_id: str):
+        """Mark the stored document extraction stale after documents were deleted, so an empty set is re-extracted."""
+        try:
+            with self._lock, closing(self._connect()) as conn, conn:
+                conn.execute("UPDATE patient_profiles SET doc_fingerprint = NULL WHERE user_id = ?", (user_id,))
+        except Exception as e:
+            print(f"⚠️ Could not reset document fingerprint for {user_id}: {e}")
+
+    def get_chunk_extractions(self, content_hashes: Iterable[str]) -> Dict[str, Dict]:
+        """Return {content_hash: extracted info} for the hashes already extracted."""
+        hashes = list(content_hashes)
+        if not hashes:
+            return {}
+        try:
+            with self._lock, closing(self._connect()) as conn, conn:
+                found = {}
+                # Stay under SQLite's bound-parameter limit
+                for i in range(0, len(hashes), 500):
+                    batch = hashes[i:i + 500]
+                    rows = conn.execute(
+                        f"SELECT content_hash, info FROM chunk_extractions WHERE content_hash IN ({','.join('?' * len(batch))})",
+                        batch
+                    ).fetchall()
+                    found.update({h: json.loads(info) for h, info in rows})
+            return found
+        except Exception as e:
+            print(f"⚠️ Could not read chunk extractions: {e}")
+            return {}
+
+    def put_chunk_extraction(self, content_hash: str, info: Dict):
+        """Remember the extraction for one chunk of document text."""
+        try:
+            with self._lock, closing(self._connect()) as conn, conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO chunk_extractions (content_hash, info, created_at) VALUES (?, ?, ?)",
+                    (content_hash, json.dumps(info or {}, default=str), datetime.now().isoformat())
+                )
+        except Exception as e:
+            print(f"⚠️ Could not store chunk extraction: {e}")
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_patient_profile_store() -> PatientProfileStore:
+    """Process-wide store instance."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = PatientProfileStore()
+        return _store
@@ -14,6 +14,10 @@ import os
 # Add the project root to the path to import vector store functions
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+from utils.single_flight import single_flight
+from utils.llm_usage import record_usage
+from utils.tracing import traced
+
 def get_vector_store_documents(user_id: str = "default") -> List[Dict]:
     """Get documents from vector store for a specific user."""
     try:
@@ -42,37 +46,80 @@ def get_vector_store_documents(user_id: str = "default") -> List[Dict]:
         print(f"❌ Error getting vector store documents: {e}")
         return []
 
+# Memory extraction is redone once per this many new chat-history entries
+MEMORY_VERSION_STEP = 10
+
+def get_memory_version(user_id: str) -> int:
+    """Coarse version of the user's chat memory; bumps every MEMORY_VERSION_STEP messages."""
+    from rag.qdrant_client import count_conversation_memory
+    return count_conversation_memory(user_id, "chat_history") // MEMORY_VERSION_STEP
+
+@traced("patient_parse")
+@single_flight("parse_patient_documents")
 def parse_patient_documents(user_id: str = "default") -> dict:
-    """Parse patient documents using LLM; also extract from chat memory and merge."""
+    """
+    Parse patient documents using LLM; also extract from chat memory and merge.
+    
+    Results are persisted per user and reused until the document-set fingerprint
+    or memory version changes, so the usual cost is one store read.
+    """
     try:
-        # 1) Documents
-        from rag.ingest_user_docs import get_full_document_content
-        all_content = get_full_document_content(user_id)
-        doc_info = {}
-        if all_content.strip():
-            print(f"🔍 Processing {len(all_content)} characters of document content")
-            print(f"🔍 Document content preview: {all_content[:200]}...")
-            doc_info = extract_patient_info_with_llm(all_content) or {}
+        from rag.ingest_user_docs import get_document_fingerprint
+        from utils.patient_profile_store import get_patient_profile_store
+        store = get_patient_profile_store()
+        
+        doc_fingerprint = get_document_fingerprint(user_id)
+        stored = store.get(user_id)
+        if doc_fingerprint is None:
+            # Document store unreadable: the last good profile beats re-extracting from no chunks
+            if stored:
+                print(f"⚠️ Document store unavailable, using stored patient profile for {user_id}")
+                return _with_current_age(stored["profile"])
+            print(f"⚠️ Document store unavailable, no stored patient profile for {user_id}")
+            return {}
+        if doc_fingerprint == "" and stored and stored["doc_fingerprint"]:
+            # Deletions reset the stored fingerprint, so this is a missing collection, not a removed document set
+            print(f"⚠️ No documents found for {user_id} but a stored extraction exists - keeping it")
+            doc_fingerprint = stored["doc_fingerprint"]
+        memory_version = get_memory_version(user_id)
+        
+        docs_current = bool(stored) and stored["doc_fingerprint"] == doc_fingerprint
+        memory_current = bool(stored) and stored["memory_version"] == memory_version
+        if docs_current and memory_current:
+            print(f"💾 Using stored patient profile for {user_id}")
+            return _with_current_age(stored["profile"])
+
+        # 1) Documents (only re-extracted when the document set changed; unchanged chunks hit the chunk cache)
+        content_length = 0
+        if docs_current:
+            doc_info = stored["doc_info"]
+            content_length = (stored["profile"].get("document_sources") or [{}])[0].get("content_length", 0)
         else:
-            print(f"⚠️ No document content found for user: {user_id}")
+            from rag.ingest_user_docs import get_document_chunks
+            chunks = get_document_chunks(user_id)
+            content_length = sum(len(c["content"]) for c in chunks)
+            doc_info = {}
+            if chunks:
+                print(f"🔍 Processing {content_length} characters of document content in {len(chunks)} chunks")
+                doc_info = extract_patient_info_map_reduce(chunks)
+            else:
+                print(f"⚠️ No document content found for user: {user_id}")
 
-        # 2) Conversation memory
-        mem_info = extract_patient_info_from_memory(user_id) or {}
+        # 2) Conversation memory (only re-extracted when the memory version moved)
+        mem_info = stored["mem_info"] if memory_current else (extract_patient_info_from_memory(user_id) or {})
 
         # 3) Merge (docs preferred, fill with memory; lists are unioned)
         patient_info = merge_patient_info(doc_info, mem_info)
 
         # 4) Calculate current age
-        if patient_info.get("date_of_birth"):
-            current_age = calculate_current_age(patient_info["date_of_birth"])
-            if current_age is not None:
-                patient_info["age"] = patient_info.get("age") or current_age
-                patient_info["current_age"] = current_age
+        patient_info = _with_current_age(patient_info)
 
         # 5) Metadata
-        patient_info["document_sources"] = [{"user_id": user_id, "content_length": len(all_content or "")}]
+        patient_info["document_sources"] = [{"user_id": user_id, "content_length": content_length}]
         patient_info["last_updated"] = datetime.now().isoformat()
 
+        store.put(user_id, doc_fingerprint, memory_version, doc_info, mem_info, patient_info)
+
         print(f"✅ Successfully parsed patient documents for {user_id}")
         print(f"🔍 Final patient info: {patient_info}")
         return patient_info
@@ -81,6 +128,61 @@ def parse_patient_documents(user_id: str = "default") -> dict:
         import traceback; traceback.print_exc()
         return {}
 
+def _with_current_age(patient_info: dict) -> dict:
+    """Fill age/current_age from date_of_birth (recomputed on read so stored profiles don't go stale)."""
+    if patient_info.get("date_of_birth"):
+        current_age = calculate_current_age(patient_info["date_of_birth"])
+        if current_age is not None:
+            patient_info["age"] = patient_info.get("age") or current_age
+            patient_info["current_age"] = current_age
+    return patient_info
+
+# Largest slice of text sent to the model in one extraction call
+EXTRACTION_WINDOW_CHARS = 6000
+
+def extract_patient_info_map_reduce(chunks: List[Dict], max_workers: int = 4) -> dict:
+    """
+    Extract patient info from every document chunk concurrently and merge the results.
+    
+    Map: each chunk is split into EXTRACTION_WINDOW_CHARS windows and each window is
+    extracted on its own, so nothing past the first few thousand characters is lost.
+    Results are cached by content hash, so a new upload only pays for its own windows.
+    Reduce: window results are merged in document order with merge_patient_info.
+    """
+    import hashlib
+    from concurrent.futures import ThreadPoolExecutor
+    from functools import reduce
+    from utils.patient_profile_store import get_patient_profile_store
+
+    windows = []
+    for chunk in chunks:
+        content = chunk.get("content", "")
+        for start in range(0, len(content), EXTRACTION_WINDOW_CHARS):
+            text = f"--- Document: {chunk.get('filename', 'Unknown')} ---\n{content[start:start + EXTRACTION_WINDOW_CHARS]}"
+            windows.append((hashlib.sha256(text.encode("utf-8")).hexdigest(), text))
+    if not windows:
+        return {}
+
+    store = get_patient_profile_store()
+    cached = store.get_chunk_extractions(h for h, _ in windows)
+    pending = {h: text for h, text in windows if h not in cached}
+    print(f"🔍 Patient extraction: {len(windows)} windows, {len(windows) - len(pending)} cached, {len(pending)} to extract")
+
+    def extract(item):
+        content_hash, text = item
+        info = extract_patient_info_with_llm(text) or {}
+        # Empty results may be transient failures - leave them uncached so they are retried
+        if info:
+            store.put_chunk_extraction(content_hash, info)
+        return content_hash, info
+
+    results = dict(cached)
+    if pending:
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(pending)), thread_name_prefix="patient-extract") as pool:
+            results.update(pool.map(extract, pending.items()))
+
+    return reduce(merge_patient_info, (results.get(h) or {} for h, _ in windows), {})
+
 def extract_patient_info_from_memory(user_id: str) -> dict:
     """Derive patient info from conversation memory."""
     try:
@@ -92,11 +194,10 @@ def extract_patient_info_from_memory(user_id: str) -> dict:
             memory_type="chat_history",
             limit=30
         )
+        from rag.memory_schema import read_memory
         texts = []
         for r in results or []:
-            p = r.get("payload", {}) or {}
-            data = p.get("data", {}) or {}
-            c = data.get("content") or ""
+            c = read_memory(r.get("payload"))["text"]
             if c:
                 texts.append(c)
         if not texts:
@@ -174,74 +275,75 @@ def merge_patient_info(primary: dict, secondary: dict) -> dict:
 
     return merged
 
+PATIENT_EXTRACTION_SCHEMA = r"""
+    {
+        "name": "Full patient name",
+        "date_of_birth": "MM/DD/YYYY format if found",
+        "age": null,
+        "gender": "Male/Female/Other if mentioned",
+        "parents": {
+            "mother": "Mother's name if mentioned",
+            "father": "Father's name if mentioned",
+            "guardians": ["list", "of", "other", "guardians"]
+        },
+        "siblings": ["list", "of", "siblings", "if", "mentioned"],
+        "family_structure": "Description of family structure if mentioned",
+        "school": "School name if mentioned",
+        "grade_level": "Grade or educational level",
+        "iep_status": "IEP status if mentioned",
+        "educational_needs": ["list", "of", "educational", "needs"],
+        "teachers": ["list", "of", "teachers", "or", "educators"],
+        "address": "Address if mentioned",
+        "insurance": "Insurance information if mentioned",
+        "contact_info": {
+            "phone": "Phone number if mentioned",
+            "email": "Email if mentioned"
+        },
+        "diagnosis": "Primary diagnosis",
+        "medications": ["list", "of", "medications"],
+        "providers": ["list", "of", "healthcare", "providers"],
+        "medical_history": ["list", "of", "relevant", "medical", "history"],
+        "evaluation_dates": ["list", "of", "evaluation", "dates"],
+        "assessment_scores": {
+            "Mullen Scales of Early Learning": null,
+            "ADOS-2": null,
+            "CSBS": null
+        },
+        "key_findings": ["list", "of", "key", "clinical", "findings"],
+        "recommendations": ["list", "of", "recommendations"],
+        "treatment_goals": ["list", "of", "treatment", "goals"],
+        "progress_areas": ["list", "of", "areas", "showing", "progress"],
+        "challenges": ["list", "of", "current", "challenges"],
+        "therapists": ["list", "of", "therapists", "or", "specialists"],
+        "services": ["list", "of", "services", "or", "interventions"],
+        "resources": ["list", "of", "recommended", "resources"]
+    }
+""".strip()
+
+@single_flight("extract_patient_info_llm")
 def extract_patient_info_with_llm(document_content: str) -> dict:
     """Use LLM to intelligently extract comprehensive patient information from documents."""
     try:
-        import streamlit as st
+        from utils.lazy_services import get_openai_api_key, get_openai_base_url
         
-        # Get API key from Streamlit secrets
-        api_key = st.secrets.get("OPENAI_API_KEY")
+        # Get API key from Streamlit secrets (or the environment)
+        api_key = get_openai_api_key()
         if not api_key:
-            print("❌ No OpenAI API key found in Streamlit secrets")
+            print("❌ No OpenAI API key found in Streamlit secrets or environment")
             return {}
         
         from openai import OpenAI
-        client = OpenAI(api_key=api_key)
+        client = OpenAI(api_key=api_key, base_url=get_openai_base_url())
         
         print(f"🔍 Sending {len(document_content)} characters to LLM for patient info extraction")
         
         # Create a comprehensive prompt for LLM extraction
-        schema = r"""
-        {
-            "name": "Full patient name",
-            "date_of_birth": "MM/DD/YYYY format if found",
-            "age": null,
-            "gender": "Male/Female/Other if mentioned",
-            "parents": {
-                "mother": "Mother's name if mentioned",
-                "father": "Father's name if mentioned",
-                "guardians": ["list", "of", "other", "guardians"]
-            },
-            "siblings": ["list", "of", "siblings", "if", "mentioned"],
-            "family_structure": "Description of family structure if mentioned",
-            "school": "School name if mentioned",
-            "grade_level": "Grade or educational level",
-            "iep_status": "IEP status if mentioned",
-            "educational_needs": ["list", "of", "educational", "needs"],
-            "teachers": ["list", "of", "teachers", "or", "educators"],
-            "address": "Address if mentioned",
-            "insurance": "Insurance information if mentioned",
-            "contact_info": {
-                "phone": "Phone number if mentioned",
-                "email": "Email if mentioned"
-            },
-            "diagnosis": "Primary diagnosis",
-            "medications": ["list", "of", "medications"],
-            "providers": ["list", "of", "healthcare", "providers"],
-            "medical_history": ["list", "of", "relevant", "medical", "history"],
-            "evaluation_dates": ["list", "of", "evaluation", "dates"],
-            "assessment_scores": {
-                "Mullen Scales of Early Learning": null,
-                "ADOS-2": null,
-                "CSBS": null
-            },
-            "key_findings": ["list", "of", "key", "clinical", "findings"],
-            "recommendations": ["list", "of", "recommendations"],
-            "treatment_goals": ["list", "of", "treatment", "goals"],
-            "progress_areas": ["list", "of", "areas", "showing", "progress"],
-            "challenges": ["list", "of", "current", "challenges"],
-            "therapists": ["list", "of", "therapists", "or", "specialists"],
-            "services": ["list", "of", "services", "or", "interventions"],
-            "resources": ["list", "of", "recommended", "resources"]
-        }
-        """.strip()
-
         prompt = (
             "You are a medical document analysis expert. Extract comprehensive patient information from the following medical documents.\n\n"
             "Please extract and return ONLY a valid JSON object with the following structure (include all fields, use null for missing information):\n\n"
-            f"{schema}\n\n"
+            f"{PATIENT_EXTRACTION_SCHEMA}\n\n"
             "Document content:\n"
-            f"{document_content[:6000]}\n\n"
+            f"{document_content[:EXTRACTION_WINDOW_CHARS]}\n\n"
             "Return ONLY the JSON object, no other text or explanation."
         )
 
@@ -254,6 +356,7 @@ def extract_patient_info_with_llm(document_content: str) -> dict:
             temperature=0.1,
             max_tokens=2000
         )
+        record_usage("patient_extraction", getattr(response, "usage", None))
         
         # Parse the JSON response
         content = response.choices[0].message.content or ""
@@ -0,0 +1,117 @@
+"""
+Single-Flight Call Deduplication
+Collapses identical concurrent calls (same operation and arguments) into one execution whose result is shared.
+"""
+
+import copy
+import functools
+import hashlib
+import json
+import threading
+from typing import Any, Callable, Dict
+
+
+class _Call:
+    __slots__ = ("event", "result", "error", "waiters")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Keyed in-flight registry: the first caller executes, concurrent duplicates wait and share.
+
+    Callers mutate what they get back (synthesis dicts, patient info), so each
+    waiter receives its own deep copy of a snapshot taken before the leader returns.
+    """
+
+    def __init__(self):
+        self._calls: Dict[str, _Call] = {}
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, int]] = {}
+
+    def do(self, key: str, fn: Callable[[], Any], operation: str = "default") -> Any:
+        """Run fn() unless an identical call is already in flight, in which case wait for its result."""
+        with self._lock:
+            stats = self._stats.setdefault(operation, {"calls": 0, "executions": 0, "collapsed": 0})
+            stats["calls"] += 1
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+                stats["executions"] += 1
+            else:
+                stats["collapsed"] += 1
+                call.waiters += 1
+
+        if not leader:
+            print(f"🔗 Joined in-flight {operation} call")
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return _copy_result(call.result)
+
+        result = None
+        try:
+            result = fn()
+            return result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+                waiters = call.waiters
+            # Snapshot before the leader's caller can touch the result; no one can join after the pop
+            if waiters and call.error is None:
+                call.result = _copy_result(result)
+            call.event.set()
+
+    def get_stats(self) -> Dict[str, Dict]:
+        """Per-operation calls/executions/collapsed counters plus totals."""
+        with self._lock:
+            stats = {op: dict(s) for op, s in self._stats.items()}
+        totals = {"calls": 0, "executions": 0, "collapsed": 0}
+        for s in stats.values():
+            for k in totals:
+                totals[k] += s[k]
+            s["collapse_rate"] = s["collapsed"] / s["calls"] if s["calls"] else 0.0
+        totals["collapse_rate"] = totals["collapsed"] / totals["calls"] if totals["calls"] else 0.0
+        stats["total"] = totals
+        return stats
+
+
+def _copy_result(result: Any) -> Any:
+    try:
+        return copy.deepcopy(result)
+    except Exception as e:
+        print(f"⚠️ Single-flight result could not be copied, sharing it: {e}")
+        return result
+
+
+_group = SingleFlight()
+
+
+def make_key(operation: str, args: tuple, kwargs: dict) -> str:
+    """Stable key for an operation and its arguments (objects fall back to repr)."""
+    payload = json.dumps([args, kwargs], sort_keys=True, default=repr)
+    return f"{operation}:{hashlib.sha256(payload.encode('utf-8')).hexdigest()}"
+
+
+def single_flight(operation: str):
+    """Decorator: identical concurrent calls to the wrapped function run once and share the result."""
+    def decorator(fn: Callable) -> Callable:
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            return _group.do(make_key(operation, args, kwargs), lambda: fn(*args, **kwargs), operation)
+        return wrapper
+    return decorator
+
+
+def get_single_flight_stats() -> Dict[str, Dict]:
+    return _group.get_stats()
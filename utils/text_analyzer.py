@@ -0,0 +1,243 @@
+"""
+Text Analyzer for Autism Support App
+Single-pass keyword and fact annotation of messages: one Aho-Corasick automaton over every keyword set plus precompiled regexes.
+"""
+
+import functools
+import re
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Sequence
+
+# ---- keyword sets (matched as lowercase substrings, like the `keyword in text` checks they replace)
+
+KEYWORD_SETS = {
+    # Insight extraction
+    "topic": [
+        "screening", "diagnosis", "therapy", "education", "behavior",
+        "communication", "social skills", "sensory issues", "medication",
+        "IEP", "school", "family support", "resources", "treatment"
+    ],
+    "concern_indicator": [
+        "worried", "concerned", "struggling", "difficult", "challenging",
+        "problem", "issue", "trouble", "hard", "frustrated", "overwhelmed"
+    ],
+    "strategy_indicator": [
+        "worked", "helped", "effective", "successful", "improved",
+        "better", "strategy", "technique", "approach", "method"
+    ],
+    "progress": ["improved", "better", "progress", "milestone"],
+    "goal": ["goal", "target", "aim", "objective"],
+    "style_preference": ["detailed", "simple", "step-by-step", "overview"],
+    "format_preference": ["list", "explanation", "example", "resource"],
+
+    # Conversation memory and remembered facts
+    "child_mention": ["child", "son", "daughter"],
+    "user_concern": ["worried", "concerned", "struggling", "difficulty", "problem"],
+    "diagnosis_yes": ["diagnosed with autism", "has autism", "autism diagnosis", "confirmed autism"],
+    "diagnosis_no": ["not diagnosed", "no diagnosis", "haven't been diagnosed", "waiting for diagnosis"],
+    "concern:speech": ["speech", "talking", "speaking", "language", "words", "communication"],
+    "concern:social": ["social", "friends", "playing", "interaction", "eye contact"],
+    "concern:behavior": ["behavior", "meltdown", "tantrums", "repetitive", "stimming"],
+    "concern:development": ["development", "milestones", "delayed", "behind"],
+
+    # Safety terms that short-circuit routing (none configured yet)
+    "safety": []
+}
+
+CONCERN_CATEGORIES = ["speech", "social", "behavior", "development"]
+
+PATTERN_GROUPS = {
+    "age": [
+        r'(?:he\'s|she\'s|child is|kid is|my child is)\s*(\d+)\s*(?:years?\s*old)?',
+        r'(\d+)\s*(?:year|yr)s?\s*old',
+        r'age\s*(?:is\s*)?(\d+)',
+        r'(\d+)\s*(?:years?\s*)?(?:old|of\s*age)'
+    ],
+    "child_name": [
+        r'(?:my\s+(?:son|daughter|child)\s+)(\w+)',
+        r'(?:his|her)\s+name\s+is\s+(\w+)',
+        r'(\w+)\s+(?:is\s+my\s+(?:son|daughter|child))',
+        r'(?:called|named)\s+(\w+)'
+    ],
+    # Narrower forms used for the running conversation memory
+    "stated_age": [r'(\d+)\s*(?:year|yr)s?\s*old'],
+    "my_child_name": [r'(?:my\s+(?:son|daughter|child)\s+)(\w+)']
+}
+
+_SENTENCE_SPLIT = re.compile(r'[.!?]')
+
+
+class KeywordAutomaton:
+    """Aho-Corasick automaton over lowercase keywords; find() reports every keyword in a text in one pass."""
+
+    def __init__(self, keywords: Iterable[str]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[str]] = [[]]
+
+        for keyword in OrderedDict.fromkeys(k.lower() for k in keywords if k):
+            state = 0
+            for ch in keyword:
+                nxt = self._goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                    self._goto[state][ch] = nxt
+                state = nxt
+            self._out[state].append(keyword)
+
+        # Breadth-first failure links; each state inherits its fallback's outputs
+        frontier = list(self._goto[0].values())
+        while frontier:
+            next_frontier = []
+            for state in frontier:
+                for ch, nxt in self._goto[state].items():
+                    fallback = self._fail[state]
+                    while fallback and ch not in self._goto[fallback]:
+                        fallback = self._fail[fallback]
+                    self._fail[nxt] = self._goto[fallback].get(ch, 0)
+                    self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+                    next_frontier.append(nxt)
+            frontier = next_frontier
+
+    def find(self, text: str) -> Dict[str, int]:
+        """{keyword: start offset of its first occurrence} for keywords found in text (already lowercased)."""
+        goto, fail, out = self._goto, self._fail, self._out
+        found: Dict[str, int] = {}
+        state = 0
+        for i, ch in enumerate(text):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            for keyword in out[state]:
+                if keyword not in found:
+                    found[keyword] = i - len(keyword) + 1
+        return found
+
+
+class TextAnnotation:
+    """Result of analyzing one message; keyword lookups are precomputed, regexes and sentences run on first use."""
+
+    def __init__(self, text: str, keywords: Dict[str, int], analyzer: "TextAnalyzer"):
+        self.text = text
+        self.lower = text.lower()
+        self.keywords = keywords
+        self._analyzer = analyzer
+        self._sentences = None
+        self._groups: Dict[str, Optional[str]] = {}
+
+    def found(self, set_name: str) -> List[str]:
+        """Keywords of set_name present in the text, as declared (e.g. "IEP") and in the set's order."""
+        return [k for k in self._analyzer.keyword_sets.get(set_name, []) if k.lower() in self.keywords]
+
+    def has(self, set_name: str) -> bool:
+        return any(k.lower() in self.keywords for k in self._analyzer.keyword_sets.get(set_name, []))
+
+    @property
+    def sentences(self) -> List[str]:
+        if self._sentences is None:
+            self._sentences = _SENTENCE_SPLIT.split(self.lower)
+        return self._sentences
+
+    def sentence_with(self, keyword: str) -> Optional[str]:
+        """First sentence (lowercased, stripped) containing keyword."""
+        return next((s.strip() for s in self.sentences if keyword in s), None)
+
+    def first_group(self, group: str) -> Optional[str]:
+        """Capture group 1 of the first pattern in group that matches the lowercased text."""
+        if group not in self._groups:
+            value = None
+            for pattern in self._analyzer.patterns.get(group, []):
+                match = pattern.search(self.lower)
+                if match:
+                    value = match.group(1)
+                    break
+            self._groups[group] = value
+        return self._groups[group]
+
+
+class TextAnalyzer:
+    """Compiles keyword sets and regex groups once; analyze() annotates a text in a single scan."""
+
+    def __init__(self, keyword_sets: Dict[str, List[str]] = None, pattern_groups: Dict[str, List[str]] = None):
+        keyword_sets = KEYWORD_SETS if keyword_sets is None else keyword_sets
+        pattern_groups = PATTERN_GROUPS if pattern_groups is None else pattern_groups
+        # Declared spelling is kept for reporting; later duplicates differing only in case are dropped
+        self.keyword_sets = {}
+        for name, keywords in keyword_sets.items():
+            unique = OrderedDict()
+            for k in keywords:
+                if k:
+                    unique.setdefault(k.lower(), k)
+            self.keyword_sets[name] = list(unique.values())
+        self.patterns = {name: [re.compile(p) for p in patterns] for name, patterns in pattern_groups.items()}
+        self.automaton = KeywordAutomaton(k.lower() for keywords in self.keyword_sets.values() for k in keywords)
+
+    def analyze(self, text: str) -> TextAnnotation:
+        text = text or ""
+        return TextAnnotation(text, self.automaton.find(text.lower()), self)
+
+
+_analyzer = None
+_analyzer_lock = threading.Lock()
+_recent: "OrderedDict[str, TextAnnotation]" = OrderedDict()
+_RECENT_MAX = 256
+
+
+def get_text_analyzer() -> TextAnalyzer:
+    """Process-wide analyzer over KEYWORD_SETS and PATTERN_GROUPS."""
+    global _analyzer
+    with _analyzer_lock:
+        if _analyzer is None:
+            _analyzer = TextAnalyzer()
+        return _analyzer
+
+
+def analyze(text: str) -> TextAnnotation:
+    """
+    Annotation for text from the shared analyzer. Recent results are reused, so
+    the router, conversation manager and insight extractor scan a message once.
+    """
+    text = text or ""
+    with _analyzer_lock:
+        annotation = _recent.get(text)
+        if annotation is not None:
+            _recent.move_to_end(text)
+            return annotation
+
+    annotation = get_text_analyzer().analyze(text)
+    with _analyzer_lock:
+        _recent[text] = annotation
+        if len(_recent) > _RECENT_MAX:
+            _recent.popitem(last=False)
+    return annotation
+
+
+def age_band(age: int) -> str:
+    """Map an age in years to the profile's child_age band."""
+    if age <= 3:
+        return "0-3"
+    if age <= 5:
+        return "3-5"
+    if age <= 12:
+        return "6-12"
+    if age <= 17:
+        return "13-17"
+    return "18+"
+
+
+@functools.lru_cache(maxsize=256)
+def _automaton_for(keywords: tuple) -> KeywordAutomaton:
+    return KeywordAutomaton(keywords)
+
+
+def match_keywords(text_lower: str, keywords: Sequence[str]) -> List[str]:
+    """Items of a dynamic keyword list (e.g. route keywords) found in text_lower, in list order; automata are cached per list."""
+    keywords = tuple(k for k in keywords if isinstance(k, str) and k)
+    if not keywords:
+        return []
+    found = _automaton_for(tuple(k.lower() for k in keywords)).find(text_lower)
+    return [k for k in keywords if k.lower() in found]
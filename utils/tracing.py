@@ -0,0 +1,247 @@
+"""
+Turn Tracing for Autism Support App
+Context-managed spans around the stages of a turn, per-stage latency percentiles and a per-turn waterfall.
+
+Spans opened while a trace is active (see start_trace) are added to that turn's
+waterfall; every span, traced or not, feeds the in-process stage histograms.
+Set TRACE_EXPORT_PATH to write the histograms as JSON after each turn, or
+TRACE_METRICS_PORT to serve them as Prometheus text on /metrics.
+"""
+
+import contextvars
+import functools
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+# Most recent durations kept per stage for the percentiles
+SAMPLES_PER_STAGE = int(os.getenv("TRACE_SAMPLES_PER_STAGE", "2048"))
+QUANTILES = (0.5, 0.95, 0.99)
+EXPORT_PATH = os.getenv("TRACE_EXPORT_PATH", "")
+
+_current_trace: "contextvars.ContextVar[Optional[Trace]]" = contextvars.ContextVar("trace", default=None)
+_current_depth: "contextvars.ContextVar[int]" = contextvars.ContextVar("trace_depth", default=0)
+
+
+def _reset(var: contextvars.ContextVar, token, default):
+    """Reset var; a generator closed from another context can't use its token, so fall back to the default."""
+    try:
+        var.reset(token)
+    except ValueError:
+        var.set(default)
+
+
+class LatencyHistogram:
+    """Count, total and a window of the most recent durations for one stage."""
+
+    def __init__(self, max_samples: int = SAMPLES_PER_STAGE):
+        self.samples = deque(maxlen=max_samples)
+        self.count = 0
+        self.total = 0.0
+        self.errors = 0
+
+    def observe(self, seconds: float, error: bool = False):
+        self.samples.append(seconds)
+        self.count += 1
+        self.total += seconds
+        self.errors += 1 if error else 0
+
+    def summary(self) -> Dict:
+        ordered = sorted(self.samples)
+        summary = {"count": self.count, "errors": self.errors, "sum": self.total}
+        for q in QUANTILES:
+            # Nearest-rank percentile over the sample window
+            summary[f"p{int(q * 100)}"] = ordered[min(int(q * len(ordered)), len(ordered) - 1)] if ordered else 0.0
+        return summary
+
+
+_histograms: Dict[str, LatencyHistogram] = {}
+_histograms_lock = threading.Lock()
+
+
+def record_latency(stage: str, seconds: float, error: bool = False):
+    """Add one duration to stage's histogram."""
+    with _histograms_lock:
+        histogram = _histograms.get(stage)
+        if histogram is None:
+            histogram = _histograms[stage] = LatencyHistogram()
+        histogram.observe(seconds, error)
+
+
+class Trace:
+    """Spans recorded during one turn; spans from context-gathering threads are added under a lock."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.started = time.perf_counter()
+        self.duration: Optional[float] = None
+        self.spans: List[Dict] = []
+        self._lock = threading.Lock()
+
+    def add(self, name: str, start: float, seconds: float, depth: int, status: str, attrs: Dict):
+        with self._lock:
+            self.spans.append({
+                "name": name,
+                "start_ms": (start - self.started) * 1000,
+                "duration_ms": seconds * 1000,
+                "depth": depth,
+                "status": status,
+                **attrs
+            })
+
+    def waterfall(self) -> List[Dict]:
+        """The turn itself followed by its spans in start order (times in ms from the start of the turn)."""
+        total = self.duration if self.duration is not None else time.perf_counter() - self.started
+        with self._lock:
+            spans = sorted(self.spans, key=lambda s: s["start_ms"])
+        return [{"name": self.name, "start_ms": 0.0, "duration_ms": total * 1000, "depth": 0, "status": "ok"}] + spans
+
+
+@contextmanager
+def span(name: str, **attrs):
+    """Time a stage; attrs (e.g. collection=...) are shown in the waterfall but don't split the histogram."""
+    trace = _current_trace.get()
+    depth = _current_depth.get() + 1
+    token = _current_depth.set(depth)
+    start = time.perf_counter()
+    status = "ok"
+    try:
+        yield
+    except Exception:
+        status = "error"
+        raise
+    finally:
+        seconds = time.perf_counter() - start
+        _reset(_current_depth, token, 0)
+        record_latency(name, seconds, error=status == "error")
+        if trace is not None:
+            trace.add(name, start, seconds, depth, status, attrs)
+
+
+def traced(name: str):
+    """Decorator form of span for plain (non-generator) functions."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+@contextmanager
+def start_trace(name: str = "turn"):
+    """Make a new Trace current for the enclosed block; yields it so the caller can read its waterfall."""
+    trace = Trace(name)
+    trace_token = _current_trace.set(trace)
+    depth_token = _current_depth.set(0)
+    try:
+        yield trace
+    finally:
+        trace.duration = time.perf_counter() - trace.started
+        _reset(_current_depth, depth_token, 0)
+        _reset(_current_trace, trace_token, None)
+        record_latency(name, trace.duration)
+        if EXPORT_PATH:
+            export_latency_stats(EXPORT_PATH)
+
+
+def format_trace_waterfall(waterfall: List[Dict], width: int = 32) -> str:
+    """Render a waterfall as fixed-width text: one bar per span, offset and scaled to the turn's duration."""
+    if not waterfall:
+        return ""
+    total = max(waterfall[0]["duration_ms"], 1e-6)
+    label_width = max(2 * s["depth"] + len(s["name"]) for s in waterfall)
+    lines = []
+    for s in waterfall:
+        offset = min(int(s["start_ms"] / total * width), width - 1)
+        length = max(1, min(round(s["duration_ms"] / total * width), width - offset))
+        label = ("  " * s["depth"] + s["name"]).ljust(label_width)
+        flag = " ✗" if s.get("status") == "error" else ""
+        lines.append(f"{label} |{' ' * offset}{'█' * length}{' ' * (width - offset - length)}| {s['duration_ms']:8.1f} ms{flag}")
+    return "\n".join(lines)
+
+
+def run_in_context(fn):
+    """Wrap fn so it runs in a copy of the caller's context (current trace and depth) on another thread."""
+    context = contextvars.copy_context()
+    return lambda *args, **kwargs: context.run(fn, *args, **kwargs)
+
+
+def get_latency_stats() -> Dict[str, Dict]:
+    """Per-stage {count, errors, sum, p50, p95, p99} in seconds."""
+    with _histograms_lock:
+        return {stage: h.summary() for stage, h in sorted(_histograms.items())}
+
+
+def reset_latency_stats():
+    with _histograms_lock:
+        _histograms.clear()
+
+
+def export_latency_stats(path: str) -> bool:
+    """Write get_latency_stats() to path as JSON (atomically)."""
+    try:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump({"updated": time.time(), "stages": get_latency_stats()}, f, indent=2)
+        os.replace(path + ".tmp", path)
+        return True
+    except Exception as e:
+        print(f"⚠️ Could not export latency stats to {path}: {e}")
+        return False
+
+
+def prometheus_text() -> str:
+    """Stage latencies in the Prometheus text exposition format (one summary metric)."""
+    lines = [
+        "# HELP autism_support_stage_seconds Latency of each stage of a conversation turn.",
+        "# TYPE autism_support_stage_seconds summary"
+    ]
+    for stage, s in get_latency_stats().items():
+        for q in QUANTILES:
+            lines.append(f'autism_support_stage_seconds{{stage="{stage}",quantile="{q}"}} {s[f"p{int(q * 100)}"]:.6f}')
+        lines.append(f'autism_support_stage_seconds_sum{{stage="{stage}"}} {s["sum"]:.6f}')
+        lines.append(f'autism_support_stage_seconds_count{{stage="{stage}"}} {s["count"]}')
+    return "\n".join(lines) + "\n"
+
+
+def start_metrics_server(port: int = None) -> Optional[threading.Thread]:
+    """Serve prometheus_text() on http://0.0.0.0:port/metrics from a daemon thread (TRACE_METRICS_PORT; 0 disables)."""
+    if port is None:
+        port = int(os.getenv("TRACE_METRICS_PORT", "0"))
+    if port <= 0:
+        return None
+
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = prometheus_text().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    try:
+        server = ThreadingHTTPServer(("0.0.0.0", port), MetricsHandler)
+    except OSError as e:
+        print(f"⚠️ Could not start metrics server on port {port}: {e}")
+        return None
+    thread = threading.Thread(target=server.serve_forever, name="trace-metrics", daemon=True)
+    thread.start()
+    print(f"📈 Serving stage latencies on :{port}/metrics")
+    return thread